@@ -0,0 +1,135 @@
+import os
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+# Third-party analytics/marketing hosts the scraper never needs
+DEFAULT_BLOCKED_DOMAINS = [
+    "doubleclick.net",
+    "googletagmanager.com",
+    "google-analytics.com",
+    "googleadservices.com",
+    "facebook.net",
+    "facebook.com",
+    "adobedtm.com",
+    "demdex.net",
+    "omtrdc.net",
+    "everesttech.net",
+    "bing.com",
+    "hotjar.com",
+    "optimizely.com",
+    "tealiumiq.com",
+    "qualtrics.com",
+    "linkedin.com",
+]
+
+@dataclass
+class BrowserProfile:
+    """Launch options and request blocking for a scraper run"""
+    name: str = "headed"
+    headless: bool = False
+    viewport: Dict[str, int] = field(default_factory=lambda: {"width": 1920, "height": 1040})
+    slow_mo: int = 0
+    blocked_types: Tuple[str, ...] = ()
+    blocked_domains: Tuple[str, ...] = ()
+    args: Tuple[str, ...] = ()
+
+    def launch_kwargs(self) -> Dict:
+        """Keyword arguments for chromium.launch_persistent_context"""
+        kwargs = {
+            "headless": self.headless,
+            "slow_mo": self.slow_mo,
+            "viewport": self.viewport,
+            "accept_downloads": True,
+        }
+        if self.args:
+            kwargs["args"] = list(self.args)
+        return kwargs
+
+HEADED_PROFILE = BrowserProfile()
+
+LEAN_PROFILE = BrowserProfile(
+    name="lean",
+    headless=True,
+    viewport={"width": 1280, "height": 800},
+    blocked_types=("image", "media", "font"),
+    blocked_domains=tuple(DEFAULT_BLOCKED_DOMAINS),
+    args=("--disable-extensions", "--disable-background-networking", "--mute-audio"),
+)
+
+def get_browser_profile(name: Optional[str] = None) -> BrowserProfile:
+    """Profile by name ('headed' or 'lean'), defaulting to the browser_profile env var"""
+    name = (name or os.getenv("browser_profile", "headed")).lower()
+    profile = LEAN_PROFILE if name == "lean" else HEADED_PROFILE
+    slow_mo = os.getenv("slow_mo")
+    if slow_mo:
+        profile = BrowserProfile(**{**profile.__dict__, "slow_mo": int(slow_mo)})
+    return profile
+
+class ResourceBlocker:
+    """Context-wide page.route blocklist with per-run counts of what it blocked"""
+
+    def __init__(self, blocked_types: Tuple[str, ...] = (), blocked_domains: Tuple[str, ...] = ()):
+        self.blocked_types = set(blocked_types)
+        self.blocked_domains = tuple(d.lower() for d in blocked_domains)
+        self.enabled = True
+        self.blocked = Counter()
+        self.blocked_hosts = Counter()
+        self.allowed = 0
+        self.allowed_bytes = 0
+        self._context = None
+
+    @classmethod
+    def from_profile(cls, profile: BrowserProfile) -> "ResourceBlocker":
+        return cls(profile.blocked_types, profile.blocked_domains)
+
+    def _is_blocked(self, resource_type: str, url: str) -> bool:
+        if resource_type in self.blocked_types:
+            return True
+        host = (urlparse(url).hostname or "").lower()
+        return any(host == d or host.endswith("." + d) for d in self.blocked_domains)
+
+    async def _handle(self, route, request):
+        if self.enabled and self._is_blocked(request.resource_type, request.url):
+            self.blocked[request.resource_type] += 1
+            self.blocked_hosts[urlparse(request.url).hostname or ""] += 1
+            await route.abort()
+            return
+        self.allowed += 1
+        await route.fallback()
+
+    def _on_response(self, response):
+        try:
+            self.allowed_bytes += int(response.headers.get("content-length", 0))
+        except (TypeError, ValueError):
+            pass
+
+    async def attach(self, context):
+        """Install the blocklist on every page of a browser context"""
+        if not self.blocked_types and not self.blocked_domains:
+            return
+        self._context = context
+        await context.route("**/*", self._handle)
+        context.on("response", self._on_response)
+
+    @contextmanager
+    def paused(self):
+        """Let everything through, e.g. while the image-matched login form renders"""
+        previous = self.enabled
+        self.enabled = False
+        try:
+            yield
+        finally:
+            self.enabled = previous
+
+    def report(self) -> List[str]:
+        """Blocked request counts by type and host, plus the bytes that were loaded"""
+        total = sum(self.blocked.values())
+        lines = [f"🚫 Blocked {total} requests, allowed {self.allowed} ({self.allowed_bytes / 1024:.0f} KiB loaded)"]
+        for resource_type, count in self.blocked.most_common():
+            lines.append(f"  {resource_type}: {count}")
+        for host, count in self.blocked_hosts.most_common(10):
+            lines.append(f"  {host}: {count}")
+        return lines
@@ -0,0 +1,93 @@
+import csv
+import datetime
+import os
+from typing import Dict, List, Optional, Tuple
+
+from download_index import format_download_name
+
+# Column layout of a Chase business activity export
+CHASE_COLUMNS = ["Details", "Posting Date", "Description", "Amount", "Type", "Balance", "Check or Slip #"]
+
+def iter_months(start_month: int, start_year: int, end_month: int, end_year: int):
+    """Yield (year, month) for every month in an inclusive range"""
+    year, month = start_year, start_month
+    while (year, month) <= (end_year, end_month):
+        yield year, month
+        month += 1
+        if month > 12:
+            month = 1
+            year += 1
+
+def month_file_path(folder: str, name: str, month: int, year: int) -> str:
+    """Per-month file written by csv_d.execute_download: NAME__MM_YYYY.csv"""
+    return os.path.join(folder, format_download_name(name, month, year))
+
+def parse_posting_date(value: str) -> Optional[datetime.date]:
+    value = value.strip()
+    for fmt in ('%m/%d/%Y', '%Y-%m-%d', '%m/%d/%y'):
+        try:
+            return datetime.datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def split_by_month(source_path: str, dest_folder: str, name: str,
+                   start_month: int, start_year: int, end_month: int, end_year: int,
+                   date_column: str = "Posting Date") -> Dict[Tuple[int, int], Tuple[str, int]]:
+    """
+    Stream a multi-month CSV into one NAME__MM_YYYY.csv per month of the range.
+    Months without activity still get a header-only file.
+    Returns {(year, month): (path, row_count)}.
+    """
+    months = list(iter_months(start_month, start_year, end_month, end_year))
+    os.makedirs(dest_folder, exist_ok=True)
+
+    files = {}
+    writers = {}
+    counts = {key: 0 for key in months}
+    header: List[str] = CHASE_COLUMNS
+    skipped = 0
+
+    try:
+        if os.path.exists(source_path) and os.path.getsize(source_path) > 0:
+            with open(source_path, 'r', newline='', encoding='utf-8-sig') as src:
+                reader = csv.reader(src)
+                header = next(reader, None) or CHASE_COLUMNS
+                try:
+                    date_index = header.index(date_column)
+                except ValueError:
+                    raise ValueError(f"Column '{date_column}' not found in {source_path}: {header}")
+
+                for row in reader:
+                    if not row or date_index >= len(row):
+                        continue
+                    posted = parse_posting_date(row[date_index])
+                    key = (posted.year, posted.month) if posted else None
+                    if key not in counts:
+                        skipped += 1
+                        continue
+
+                    # Files are opened lazily so only months with rows are written here
+                    if key not in writers:
+                        path = month_file_path(dest_folder, name, key[1], key[0])
+                        files[key] = open(path, 'w', newline='', encoding='utf-8')
+                        writers[key] = csv.writer(files[key])
+                        writers[key].writerow(header)
+                    writers[key].writerow(row)
+                    counts[key] += 1
+    finally:
+        for f in files.values():
+            f.close()
+
+    # Header-only files for months with no activity
+    results = {}
+    for year, month in months:
+        path = month_file_path(dest_folder, name, month, year)
+        if counts[(year, month)] == 0:
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerow(header)
+        results[(year, month)] = (path, counts[(year, month)])
+
+    if skipped:
+        print(f"Skipped {skipped} rows outside {start_month:02d}/{start_year}-{end_month:02d}/{end_year} in {os.path.basename(source_path)}")
+    return results
@@ -0,0 +1,162 @@
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Canonical per-month download: NAME__MM_YYYY.csv, as csv_d.execute_download writes it
+DOWNLOAD_PATTERN = re.compile(r'^(?P<account>.+)__(?P<month>\d{1,2})_(?P<year>\d{4})\.csv$', re.IGNORECASE)
+# Older files and file_match used NAME__YYYY_MM.csv, still read but never written
+LEGACY_PATTERN = re.compile(r'^(?P<account>.+)__(?P<year>\d{4})_(?P<month>\d{1,2})\.csv$', re.IGNORECASE)
+
+# A directory modified this recently may change again within the same mtime tick, so it is rescanned
+RACY_SECONDS = 2.0
+
+@dataclass(frozen=True)
+class DownloadName:
+    """Account and month encoded in a download's file name"""
+    account: str
+    year: int
+    month: int
+    legacy: bool = False
+
+    @property
+    def key(self) -> Tuple[str, int, int]:
+        return (self.account, self.year, self.month)
+
+def format_download_name(account: str, month: int, year: int) -> str:
+    """File name of an account-month download: NAME__MM_YYYY.csv"""
+    return f"{account}__{int(month):02d}_{int(year)}.csv"
+
+def parse_download_name(filename: str) -> Optional[DownloadName]:
+    """Account and month of a NAME__MM_YYYY.csv (or legacy NAME__YYYY_MM.csv) file, None for anything else"""
+    filename = os.path.basename(filename)
+    for pattern, legacy in ((DOWNLOAD_PATTERN, False), (LEGACY_PATTERN, True)):
+        match = pattern.match(filename)
+        if match and 1 <= int(match['month']) <= 12:
+            return DownloadName(match['account'], int(match['year']), int(match['month']), legacy)
+    return None
+
+class DownloadIndex:
+    """
+    In-memory index of a downloads folder keyed by (account, year, month). The folder is
+    only listed again when its mtime changes, and then only new names are parsed, so
+    lookups between downloads cost a stat at most.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = os.path.abspath(folder)
+        self._lock = threading.Lock()
+        self._names: Dict[str, Optional[DownloadName]] = {}
+        # (year, month) -> {account: path}
+        self._months: Dict[Tuple[int, int], Dict[str, str]] = {}
+        self._mtime: Optional[int] = None
+        self._racy = False
+        self.stats = {'scans': 0, 'parsed': 0, 'added': 0}
+
+    def refresh(self, force: bool = False) -> bool:
+        """Pick up files added or removed since the last scan, returns whether the folder was listed"""
+        try:
+            mtime = os.stat(self.folder).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        with self._lock:
+            if not force and not self._racy and mtime == self._mtime:
+                return False
+            names = set()
+            if mtime is not None:
+                with os.scandir(self.folder) as entries:
+                    names = {entry.name for entry in entries if entry.is_file()}
+            for name in set(self._names) - names:
+                self._drop(name)
+            for name in names - set(self._names):
+                self._add(name)
+            self._mtime = mtime
+            self._racy = mtime is not None and time.time() - mtime / 1e9 < RACY_SECONDS
+            self.stats['scans'] += 1
+        return True
+
+    def _add(self, name: str):
+        parsed = parse_download_name(name)
+        self.stats['parsed'] += 1
+        self._names[name] = parsed
+        if parsed is None:
+            return
+        month = self._months.setdefault((parsed.year, parsed.month), {})
+        existing = month.get(parsed.account)
+        # When both spellings exist the canonical one wins
+        if existing is None or parse_download_name(existing).legacy:
+            month[parsed.account] = os.path.join(self.folder, name)
+
+    def _drop(self, name: str):
+        parsed = self._names.pop(name)
+        if parsed is None:
+            return
+        month = self._months.get((parsed.year, parsed.month), {})
+        if month.get(parsed.account) == os.path.join(self.folder, name):
+            del month[parsed.account]
+            # The other spelling of the same account-month, if there is one, takes its place
+            for other, other_parsed in self._names.items():
+                if other_parsed is not None and other_parsed.key == parsed.key:
+                    month[parsed.account] = os.path.join(self.folder, other)
+                    break
+
+    def add(self, file_path: str):
+        """Record a file the caller just wrote, without waiting for the next scan"""
+        name = os.path.basename(file_path)
+        with self._lock:
+            if name not in self._names:
+                self._add(name)
+                self.stats['added'] += 1
+
+    def get(self, account: str, year: int, month: int) -> Optional[str]:
+        self.refresh()
+        with self._lock:
+            return self._months.get((int(year), int(month)), {}).get(account)
+
+    def files_for(self, year: int, month: int) -> List[str]:
+        """Paths of every account's download for a month, sorted by account"""
+        self.refresh()
+        with self._lock:
+            month_files = self._months.get((int(year), int(month)), {})
+            return [month_files[account] for account in sorted(month_files)]
+
+    def accounts_for(self, year: int, month: int) -> Set[str]:
+        self.refresh()
+        with self._lock:
+            return set(self._months.get((int(year), int(month)), {}))
+
+    def missing(self, accounts: Iterable[str], year: int, month: int) -> Set[str]:
+        """Which of the accounts have no download for a month"""
+        return set(accounts) - self.accounts_for(year, month)
+
+    def months(self) -> Dict[Tuple[int, int], List[str]]:
+        """Every (year, month) with downloads, mapped to their paths"""
+        self.refresh()
+        with self._lock:
+            return {key: [files[account] for account in sorted(files)]
+                    for key, files in sorted(self._months.items()) if files}
+
+    def accounts(self) -> Set[str]:
+        """Every account with at least one download"""
+        self.refresh()
+        with self._lock:
+            return {account for files in self._months.values() for account in files}
+
+    def unrecognized(self) -> List[str]:
+        """Names in the folder that aren't downloads (other files, range downloads mid-split)"""
+        self.refresh()
+        with self._lock:
+            return sorted(name for name, parsed in self._names.items() if parsed is None)
+
+_indexes: Dict[str, DownloadIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_download_index(folder: str = "downloads") -> DownloadIndex:
+    """Shared index per downloads folder"""
+    folder = os.path.abspath(folder)
+    with _indexes_lock:
+        if folder not in _indexes:
+            _indexes[folder] = DownloadIndex(folder)
+        return _indexes[folder]
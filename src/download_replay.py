@@ -0,0 +1,236 @@
+import csv
+import datetime
+import hashlib
+import io
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+# Date layouts the bank might use in a download request
+DATE_FORMATS = ['%m/%d/%Y', '%Y-%m-%d', '%Y%m%d', '%m-%d-%Y']
+
+# Headers the APIRequestContext sets itself or that would be wrong on a replay
+SKIP_HEADERS = {'cookie', 'content-length', 'host', 'connection', 'accept-encoding'}
+
+_TOKEN = re.compile(r'<<(start|end|num|name)\|([^|>]*)\|(q?)>>')
+
+@dataclass
+class RequestTemplate:
+    """A recorded download request with account and date values replaced by tokens"""
+    url: str
+    method: str
+    headers: Dict[str, str]
+    body: Optional[str]
+    generic: bool = False
+    recorded_at: float = field(default_factory=time.time)
+
+def _looks_like_download(headers: Dict[str, str]) -> bool:
+    disposition = headers.get('content-disposition', '').lower()
+    content_type = headers.get('content-type', '').lower()
+    return 'attachment' in disposition or 'csv' in content_type or 'octet-stream' in content_type
+
+def _tokenize(text: Optional[str], values: Dict[str, object]) -> Optional[str]:
+    """Replace every known value (plain or URL-encoded) with a replay token"""
+    if text is None:
+        return None
+    for kind in ('start', 'end'):
+        date = values[kind]
+        for fmt in DATE_FORMATS:
+            plain = date.strftime(fmt)
+            encoded = quote(plain, safe='')
+            if encoded != plain:
+                text = text.replace(encoded, f"<<{kind}|{fmt}|q>>")
+            text = text.replace(plain, f"<<{kind}|{fmt}|>>")
+    for kind in ('num', 'name'):
+        value = str(values[kind])
+        if not value:
+            continue
+        # Only whole values: a last-4 inside a longer ID, timestamp or amount is not the account
+        encoded = quote(value, safe='')
+        if encoded != value:
+            text = _replace_whole(text, encoded, f"<<{kind}||q>>")
+        text = _replace_whole(text, value, f"<<{kind}||>>")
+    return text
+
+def _replace_whole(text: str, value: str, token: str) -> str:
+    return re.sub(rf'(?<![0-9A-Za-z]){re.escape(value)}(?![0-9A-Za-z])', lambda _: token, text)
+
+def _has_account_token(template: "RequestTemplate") -> bool:
+    text = template.url + (template.body or '')
+    return '<<num|' in text or '<<name|' in text
+
+def _data_rows(body: bytes) -> List[List[str]]:
+    """Parsed CSV rows after the header, empty when the body isn't text"""
+    try:
+        rows = list(csv.reader(io.StringIO(body.decode('utf-8-sig'))))
+    except (UnicodeDecodeError, csv.Error):
+        return []
+    return [row for row in rows[1:] if any(cell.strip() for cell in row)]
+
+def _account_column_mismatch(body: bytes, num) -> Optional[str]:
+    """A value in the CSV's account column that isn't this account, None when all match or there is no such column"""
+    try:
+        rows = list(csv.reader(io.StringIO(body.decode('utf-8-sig'))))
+    except (UnicodeDecodeError, csv.Error):
+        return None
+    if not rows:
+        return None
+    columns = [i for i, name in enumerate(rows[0]) if 'account' in name.lower()]
+    for row in rows[1:]:
+        for i in columns:
+            value = re.sub(r'\D', '', row[i]) if i < len(row) else ''
+            if value and not value.endswith(str(num)):
+                return row[i]
+    return None
+
+def _render(text: Optional[str], values: Dict[str, object]) -> Optional[str]:
+    if text is None:
+        return None
+
+    def sub(match):
+        kind, fmt, encode = match.groups()
+        value = values[kind].strftime(fmt) if fmt else str(values[kind])
+        return quote(value, safe='') if encode else value
+    return _TOKEN.sub(sub, text)
+
+class DownloadReplay:
+    """
+    Records the HTTP request behind a UI download and replays it through the
+    context's APIRequestContext for other months. A template is per account
+    until a second account's UI download produces the same template, only then
+    is it replayed for accounts that have none of their own.
+    """
+
+    def __init__(self):
+        # Keyed by account number; '*' holds a template confirmed to work for any account
+        self.templates: Dict[str, RequestTemplate] = {}
+        # (start, end, sha1 of a file with data rows) -> account it was downloaded for
+        self._downloads: Dict[Tuple[datetime.date, datetime.date, str], str] = {}
+        self.stats = {'replayed': 0, 'replay_failed': 0, 'recorded': 0, 'rejected': 0}
+
+    def has_template(self, num) -> bool:
+        return str(num) in self.templates or '*' in self.templates
+
+    def forget(self, num):
+        """Drop the template that just failed so the next attempt records a fresh one"""
+        if self.templates.pop(str(num), None) is None:
+            self.templates.pop('*', None)
+
+    @asynccontextmanager
+    async def recording(self, page):
+        """Intercept requests while a UI download runs and collect any that return a file"""
+        captured: List[Dict] = []
+
+        async def handler(route, request):
+            # fallback() hands the request on to context-level routes such as the resource blocker
+            if request.resource_type in ('image', 'font', 'stylesheet', 'media'):
+                await route.fallback()
+                return
+            try:
+                response = await route.fetch()
+            except Exception:
+                await route.fallback()
+                return
+            if _looks_like_download(response.headers):
+                try:
+                    digest = hashlib.sha1(await response.body()).hexdigest()
+                except Exception:
+                    digest = None
+                captured.append({
+                    'url': request.url,
+                    'method': request.method,
+                    'headers': await request.all_headers(),
+                    'body': request.post_data,
+                    'digest': digest,
+                })
+            await route.fulfill(response=response)
+
+        await page.route("**/*", handler)
+        try:
+            yield captured
+        finally:
+            try:
+                await page.unroute("**/*", handler)
+            except Exception:
+                pass
+
+    def learn(self, captured: List[Dict], name, num, start: datetime.date, end: datetime.date) -> bool:
+        """Turn the last captured download request into a replay template"""
+        if not captured:
+            return False
+        request = captured[-1]
+        values = {'start': start, 'end': end, 'num': num, 'name': name}
+        url = _tokenize(request['url'], values)
+        body = _tokenize(request['body'], values)
+        headers = {k: v for k, v in request['headers'].items()
+                   if k.lower() not in SKIP_HEADERS and not k.startswith(':')}
+
+        template = RequestTemplate(url, request['method'], headers, body)
+        # Generic only once another account's own download tokenized to the very same request;
+        # a token on its own may be a coincidental match while the real account ID stays hard-coded
+        template.generic = _has_account_token(template) and any(
+            other_num != str(num) and other_num != '*' and _has_account_token(other)
+            and (other.url, other.method, other.body) == (url, template.method, body)
+            for other_num, other in self.templates.items()
+        )
+        self.templates[str(num)] = template
+        if template.generic:
+            self.templates['*'] = template
+        if request.get('digest'):
+            self._downloads[(start, end, request['digest'])] = str(num)
+        self.stats['recorded'] += 1
+        print(f"📼 Recorded download request for {name} ({'any account' if template.generic else 'this account only'})")
+        return True
+
+    def _check_body(self, body: bytes, num, start: datetime.date, end: datetime.date):
+        """Raise when a replayed file is recognizably another account's"""
+        other = _account_column_mismatch(body, num)
+        if other:
+            raise RuntimeError(f"file is for account {other}, not {num}")
+        if _data_rows(body):
+            key = (start, end, hashlib.sha1(body).hexdigest())
+            owner = self._downloads.setdefault(key, str(num))
+            if owner != str(num):
+                raise RuntimeError(f"file is identical to account {owner}'s download")
+
+    async def replay(self, page, name, num, start: datetime.date, end: datetime.date, dest_path: str) -> bool:
+        """Fetch the file directly and write it to dest_path, returns False on any failure"""
+        template = self.templates.get(str(num)) or self.templates.get('*')
+        if template is None:
+            return False
+
+        values = {'start': start, 'end': end, 'num': num, 'name': name}
+        try:
+            response = await page.request.fetch(
+                _render(template.url, values),
+                method=template.method,
+                headers=template.headers,
+                data=_render(template.body, values),
+            )
+            body = await response.body()
+            content_type = response.headers.get('content-type', '').lower()
+            if not response.ok or 'html' in content_type or body.lstrip()[:1] == b'<':
+                raise RuntimeError(f"HTTP {response.status} ({content_type or 'no content type'})")
+            try:
+                self._check_body(body, num, start, end)
+            except RuntimeError:
+                self.stats['rejected'] += 1
+                raise
+
+            # Write next to the target and swap in so a failed replay never leaves a partial CSV
+            os.makedirs(os.path.dirname(dest_path) or '.', exist_ok=True)
+            tmp_path = dest_path + ".part"
+            with open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, dest_path)
+            self.stats['replayed'] += 1
+            return True
+        except Exception as e:
+            print(f"Replay failed for {name}: {e}")
+            self.stats['replay_failed'] += 1
+            self.forget(num)
+            return False
@@ -0,0 +1,99 @@
+import threading
+from concurrent.futures import Future
+from typing import List, Tuple
+
+from drive_client import http_status
+from drive_throttle import get_scheduler, is_idempotent, is_rate_limited, is_retryable, retry_after
+
+# Drive rejects batches with more than 100 calls
+MAX_BATCH_SIZE = 100
+
+class DriveBatch:
+    """
+    Collects independent Drive metadata requests and sends them as multipart
+    HTTP batches. Each add() returns a Future that gets its own sub-response.
+    Media uploads can't go in a batch, only metadata calls.
+    """
+
+    def __init__(self, service, max_size: int = MAX_BATCH_SIZE):
+        self.service = service
+        self.max_size = max(1, min(int(max_size), MAX_BATCH_SIZE))
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[object, Future]] = []
+        self.stats = {'requests': 0, 'round_trips': 0, 'errors': 0}
+
+    def add(self, request) -> Future:
+        """Queue a request built with service.files()...(...) without calling execute()"""
+        future = Future()
+        with self._lock:
+            self._pending.append((request, future))
+            full = len(self._pending) >= self.max_size
+        if full:
+            self.flush()
+        return future
+
+    def flush(self):
+        """Send everything queued so far, max_size requests per round trip"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        # Every call in a batch counts against the quota, so a batch never exceeds one second of budget
+        bucket = get_scheduler().bucket
+        size = max(1, min(self.max_size, int(bucket.capacity), int(bucket.rate)))
+        for start in range(0, len(pending), size):
+            self._send(pending[start:start + size])
+
+    def _send(self, chunk: List[Tuple[object, Future]]):
+        # Calls inside a batch fail one by one, so rate limits and 5xx are retried per call
+        scheduler = get_scheduler()
+        attempt = 0
+        while chunk:
+            entries = {}
+            retry = []
+            server_delay = 0.0
+
+            def callback(request_id, response, exception):
+                nonlocal server_delay
+                request, future = entries[request_id]
+                if exception is None:
+                    future.set_result(response)
+                    return
+                status = http_status(exception)
+                content = getattr(exception, 'content', None)
+                # A create that hit a 5xx may already exist, so only rate limits are retried for it
+                repeatable = is_idempotent(request.method, request.uri) or is_rate_limited(status, content)
+                if status is not None and is_retryable(status, content) and repeatable and attempt < scheduler.max_retries:
+                    scheduler.note_error('batch.item', status, content)
+                    server_delay = max(server_delay, retry_after(exception.resp) or 0.0)
+                    retry.append((request, future))
+                    return
+                self.stats['errors'] += 1
+                future.set_exception(exception)
+
+            batch = self.service.new_batch_http_request(callback=callback)
+            for i, (request, future) in enumerate(chunk):
+                entries[str(i)] = (request, future)
+                batch.add(request, request_id=str(i))
+
+            try:
+                batch.execute()
+            except Exception as e:
+                # The whole round trip failed, so every caller in it gets the error
+                for request, future in entries.values():
+                    if not future.done():
+                        future.set_exception(e)
+                retry = []
+            finally:
+                self.stats['requests'] += len(chunk)
+                self.stats['round_trips'] += 1
+
+            if retry:
+                self.stats['retried'] = self.stats.get('retried', 0) + len(retry)
+                scheduler.wait_before_retry(attempt, server_delay)
+                attempt += 1
+            chunk = retry
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
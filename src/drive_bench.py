@@ -0,0 +1,215 @@
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List
+
+import drive_cache
+import drive_sync
+import drive_throttle
+import resumable_upload
+from download_index import format_download_name
+from drive_cache import FolderCache
+from drive_session import DriveSession
+from drive_sync import HashCache
+from drive_throttle import RequestScheduler
+from fake_drive import FakeCredentials, FakeDrive
+from google_conn import build_service, get_folder, get_nested_folder_id, set_drive_mirror
+from google_drive_gui import GoogleDriveGUIWrapper
+from resumable_upload import UploadSessionStore
+from upload_outbox import UploadOutbox
+
+DEFAULT_SCALES = [10, 100, 1000]
+ROOT_NAME = "P&L Reports"
+
+class BenchEnv:
+    """A FakeDrive plus throwaway caches, so a run never touches the real ones"""
+
+    def __init__(self, latency: float, error_rate: float, rate_limit, seed: int, qps=None):
+        self.drive = FakeDrive(latency=latency, error_rate=error_rate, rate_limit=rate_limit, seed=seed).install()
+        # Short backoff so injected errors don't dominate the timings
+        self.scheduler = drive_throttle._scheduler = RequestScheduler(qps=qps, base_delay=0.05, seed=seed)
+        self.dir = tempfile.mkdtemp(prefix="drive_bench_")
+        drive_cache._folder_cache = FolderCache(os.path.join(self.dir, "folders.json"))
+        drive_sync._hash_cache = HashCache(os.path.join(self.dir, "hashes.json"))
+        resumable_upload._session_store = UploadSessionStore(os.path.join(self.dir, "sessions.json"))
+        set_drive_mirror(None)
+        self.root_id = self.drive.add_folder(ROOT_NAME)
+
+    def wrapper(self, workers: int) -> GoogleDriveGUIWrapper:
+        wrapper = GoogleDriveGUIWrapper(console_print=lambda message: None, upload_workers=workers)
+        wrapper.session = DriveSession(creds_loader=FakeCredentials, logger=lambda message: None,
+                                       token_remover=lambda: None)
+        wrapper.outbox = UploadOutbox(os.path.join(self.dir, "outbox.sqlite3"))
+        return wrapper
+
+    def local_files(self, count: int, month: str, year: int, size_kb: int) -> str:
+        """count account downloads for a month, in a fresh folder"""
+        folder = tempfile.mkdtemp(dir=self.dir)
+        row = b"2025-01-01,Deposit,100.00\n"
+        body = row * max(1, size_kb * 1024 // len(row))
+        for i in range(count):
+            with open(os.path.join(folder, format_download_name(f"PROPERTY {i:04d}", month, year)), 'wb') as f:
+                f.write(f"account,{i}\n".encode('utf-8') + body)
+        return folder
+
+    def close(self):
+        FakeDrive.uninstall()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+def _wait(start: Callable[[Callable], None], timeout: float = 3600):
+    """Run a wrapper operation (which reports through a callback) and block until it finishes"""
+    done = threading.Event()
+    box = {}
+
+    def callback(*result):
+        box['result'] = result
+        done.set()
+
+    start(callback)
+    if not done.wait(timeout):
+        raise TimeoutError("Benchmark operation did not finish")
+    return box['result']
+
+def _measure(env: BenchEnv, name: str, scale: int, run: Callable[[], int]) -> Dict:
+    """Time one run, run returns how many of its operations failed"""
+    env.drive.reset_stats()
+    env.scheduler.reset_stats()
+    start = time.perf_counter()
+    failed = run()
+    seconds = time.perf_counter() - start
+    stats = env.drive.stats
+    calls = sum(v for k, v in stats.items() if k.startswith(('files.', 'changes.', 'upload.', 'about.')))
+    return {'name': name, 'scale': scale, 'seconds': seconds,
+            'http': int(stats.get('http_requests', 0)), 'calls': int(calls),
+            'errors': int(stats.get('errors_injected', 0) + stats.get('errors_rate_limited', 0)),
+            'retries': int(env.scheduler.totals()['retries']), 'failed': failed}
+
+def bench_navigation(env: BenchEnv, scale: int) -> List[Dict]:
+    """Resolve a 3-level path under a root holding `scale` sibling folders, cold then warm"""
+    year_id = env.drive.add_folder("2025 PnL", env.root_id)
+    for i in range(scale):
+        env.drive.add_folder(f"Property {i:04d}", year_id)
+    env.drive.make_path(["Property 0000", "January"], year_id)
+    service = build_service(FakeCredentials())
+    path = ["2025 PnL", "Property 0000", "January"]
+
+    def resolve():
+        try:
+            root = get_folder(service, ROOT_NAME, silent=True)
+            return 0 if get_nested_folder_id(service, path, root, silent=True) else 1
+        except Exception:
+            return 1
+
+    drive_cache.get_folder_cache().clear()
+    cold = _measure(env, "get_nested_folder_id (cold)", scale, resolve)
+    warm = _measure(env, "get_nested_folder_id (warm)", scale, resolve)
+    return [cold, warm]
+
+def bench_upload_files(env: BenchEnv, scale: int, workers: int, size_kb: int) -> List[Dict]:
+    folder = env.local_files(scale, "01", 2025, size_kb)
+    destination = env.drive.make_path(["2025 PnL", "upload_files", str(scale)], env.root_id)
+    paths = [os.path.join(folder, name) for name in sorted(os.listdir(folder))]
+    wrapper = env.wrapper(workers)
+
+    def run():
+        results = _wait(lambda cb: wrapper.upload_files(paths, destination, cb))[0]
+        return len(paths) - sum(results)
+
+    result = _measure(env, f"upload_files ({workers} workers)", scale, run)
+    wrapper.get_uploader().shutdown()
+    return [result]
+
+def bench_batch_upload(env: BenchEnv, scale: int, workers: int, size_kb: int) -> List[Dict]:
+    """First sync uploads everything, the second finds every file unchanged"""
+    folder = env.local_files(scale, "02", 2025, size_kb)
+    destination = env.drive.make_path(["2025 PnL", "batch_upload", str(scale)], env.root_id)
+    wrapper = env.wrapper(workers)
+
+    def run():
+        results = _wait(lambda cb: wrapper.batch_upload_by_pattern(folder, "02", 2025, destination, cb))[0]
+        return results.count(False)
+
+    first = _measure(env, "batch_upload_by_pattern (new)", scale, run)
+    again = _measure(env, "batch_upload_by_pattern (unchanged)", scale, run)
+    wrapper.get_uploader().shutdown()
+    return [first, again]
+
+def bench_pipeline(env: BenchEnv, scale: int, workers: int, size_kb: int, scrape_delay: float) -> List[Dict]:
+    """
+    A simulated scrape (scrape_delay seconds per account) followed by an upload by month,
+    against the same scrape streaming each file to Drive as it lands
+    """
+    source = env.local_files(scale, "01", 2025, size_kb)
+    names = sorted(os.listdir(source))
+    wrapper = env.wrapper(workers)
+
+    def scrape(month: str, on_file=None) -> str:
+        folder = tempfile.mkdtemp(dir=env.dir)
+        for i, name in enumerate(names):
+            time.sleep(scrape_delay)
+            path = os.path.join(folder, format_download_name(f"PROPERTY {i:04d}", month, 2025))
+            shutil.copyfile(os.path.join(source, name), path)
+            if on_file:
+                on_file(path)
+        return folder
+
+    def serial():
+        folder = scrape("03")
+        results = _wait(lambda cb: wrapper.upload_by_month(folder, ROOT_NAME, 2025, cb))[0]
+        return scale - sum(results)
+
+    def streamed():
+        pipeline = wrapper.start_upload_pipeline(ROOT_NAME)
+        scrape("04", pipeline.submit)
+        return scale - sum(pipeline.close().values())
+
+    first = _measure(env, "scrape then upload_by_month", scale, serial)
+    again = _measure(env, "scrape with UploadPipeline", scale, streamed)
+    wrapper.get_uploader().shutdown()
+    return [first, again]
+
+def format_results(results: List[Dict]) -> List[str]:
+    lines = [f"{'scenario':<40} {'files':>6} {'seconds':>9} {'http':>6} {'calls':>6} {'errors':>6} "
+             f"{'retries':>7} {'failed':>6}"]
+    for r in results:
+        lines.append(f"{r['name']:<40} {r['scale']:>6} {r['seconds']:>9.3f} {r['http']:>6} "
+                     f"{r['calls']:>6} {r['errors']:>6} {r['retries']:>7} {r['failed']:>6}")
+    return lines
+
+def run_benchmarks(scales: List[int], latency: float = 0.05, error_rate: float = 0.0, rate_limit=None,
+                   workers: int = 4, size_kb: int = 4, seed: int = 0, qps=None, scrape_delay: float = 0.05) -> List[Dict]:
+    results = []
+    for scale in scales:
+        for bench in (bench_navigation, bench_upload_files, bench_batch_upload, bench_pipeline):
+            env = BenchEnv(latency, error_rate, rate_limit, seed, qps)
+            try:
+                if bench is bench_navigation:
+                    results.extend(bench(env, scale))
+                elif bench is bench_pipeline:
+                    results.extend(bench(env, scale, workers, size_kb, scrape_delay))
+                else:
+                    results.extend(bench(env, scale, workers, size_kb))
+            finally:
+                env.close()
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the Drive helpers against an in-process fake Drive")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="file counts to run")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every HTTP round trip")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="chance a call fails with 503")
+    parser.add_argument("--rate-limit", type=float, default=None, help="calls per second before 429s")
+    parser.add_argument("--qps", type=float, default=None, help="client-side request budget (default: drive_qps)")
+    parser.add_argument("--workers", type=int, default=4, help="parallel upload workers")
+    parser.add_argument("--size-kb", type=int, default=4, help="size of each generated file")
+    parser.add_argument("--scrape-delay", type=float, default=0.05, help="seconds per simulated account download")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.scales, args.latency, args.error_rate, args.rate_limit,
+                             args.workers, args.size_kb, args.seed, args.qps, args.scrape_delay)
+    for line in format_results(results):
+        print(line)
@@ -0,0 +1,109 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Parent key for folders looked up by name anywhere in Drive
+ANY_PARENT = "*"
+
+def get_folder_cache_path() -> str:
+    """Default location of the persisted folder ID cache"""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "drive_folders.json")
+
+class FolderCache:
+    """Folder IDs keyed by (parent ID, name), persisted to disk with a time-to-live"""
+
+    def __init__(self, path: Optional[str] = None, ttl: float = 24 * 3600):
+        self.path = path or get_folder_cache_path()
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict] = self._load()
+        self.stats = {'hits': 0, 'stale': 0, 'misses': 0, 'invalidated': 0}
+
+    @staticmethod
+    def _key(parent_id: Optional[str], name: str) -> str:
+        return f"{parent_id or ANY_PARENT}/{name}"
+
+    def _load(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading folder cache: {e}")
+            return {}
+
+    def save(self):
+        """Write the cache atomically so a crash never leaves a half-written file"""
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(self.entries, f, indent=2)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                print(f"Error saving folder cache: {e}")
+
+    def lookup(self, parent_id: Optional[str], name: str) -> Optional[Tuple[str, bool]]:
+        """(folder_id, fresh) for a cached folder, or None. Stale entries are still returned."""
+        with self._lock:
+            entry = self.entries.get(self._key(parent_id, name))
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            fresh = time.time() - entry['cached_at'] < self.ttl
+            self.stats['hits' if fresh else 'stale'] += 1
+            return entry['id'], fresh
+
+    def put(self, parent_id: Optional[str], name: str, folder_id: str, save: bool = True):
+        with self._lock:
+            self.entries[self._key(parent_id, name)] = {
+                'id': folder_id,
+                'parent': parent_id or ANY_PARENT,
+                'cached_at': time.time(),
+            }
+        if save:
+            self.save()
+
+    def invalidate(self, parent_id: Optional[str], name: str, save: bool = True):
+        with self._lock:
+            removed = self.entries.pop(self._key(parent_id, name), None)
+            if removed is not None:
+                self.stats['invalidated'] += 1
+        if removed is not None and save:
+            self.save()
+
+    def invalidate_id(self, folder_id: str):
+        """Drop a folder that was deleted or trashed, and everything cached below it"""
+        with self._lock:
+            doomed = {folder_id}
+            removed = 0
+            changed = True
+            while changed:
+                changed = False
+                for key, entry in list(self.entries.items()):
+                    if entry['id'] in doomed or entry['parent'] in doomed:
+                        doomed.add(entry['id'])
+                        del self.entries[key]
+                        removed += 1
+                        changed = True
+            self.stats['invalidated'] += removed
+        if removed:
+            self.save()
+
+    def clear(self):
+        with self._lock:
+            self.entries = {}
+        self.save()
+
+_folder_cache: Optional[FolderCache] = None
+
+def get_folder_cache() -> FolderCache:
+    """Process-wide folder cache shared by every Drive helper"""
+    global _folder_cache
+    if _folder_cache is None:
+        _folder_cache = FolderCache()
+    return _folder_cache
@@ -0,0 +1,135 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from drive_throttle import ThrottledHttp, get_scheduler
+
+# googleapiclient and google.auth are imported on first use, not here: importing them
+# costs more than everything else the GUI loads, and most launches never touch Drive
+
+DISCOVERY_URL = "https://www.googleapis.com/discovery/v1/apis/drive/v3/rest"
+
+# Seconds spent in each stage the first time it ran in this process
+startup_timings: Dict[str, float] = {}
+_process_start = time.perf_counter()
+
+_discovery_doc: Optional[Dict] = None
+_discovery_lock = threading.Lock()
+
+# Optional factory for the HTTP transport of every new service, e.g. a FakeDrive for local runs
+_http_factory: Optional[Callable] = None
+
+def set_http_factory(factory: Optional[Callable]):
+    global _http_factory
+    _http_factory = factory
+
+@contextmanager
+def timed(stage: str):
+    """Record how long a stage took, only the first (cold) run counts"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings.setdefault(stage, time.perf_counter() - start)
+
+def get_discovery_path() -> str:
+    """Default location of the cached Drive v3 discovery document"""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "drive_v3_discovery.json")
+
+def _load_cached_doc(path: str, version: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"Error loading discovery cache: {e}")
+        return None
+    # A doc saved by another client library version may not match what it expects
+    return data['doc'] if data.get('library_version') == version else None
+
+def _save_cached_doc(path: str, version: str, doc: Dict):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'library_version': version, 'doc': doc}, f)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Error saving discovery cache: {e}")
+
+def get_discovery_doc(path: Optional[str] = None) -> Dict:
+    """
+    Parsed Drive v3 discovery document, loaded once per process. Comes from the local
+    cache, else the copy bundled with the client library, else the discovery service.
+    """
+    global _discovery_doc
+    with _discovery_lock:
+        if _discovery_doc is not None:
+            return _discovery_doc
+        path = path or get_discovery_path()
+        with timed('import'):
+            import googleapiclient
+            from googleapiclient.discovery_cache import get_static_doc
+        version = getattr(googleapiclient, '__version__', '')
+
+        with timed('discovery'):
+            doc = _load_cached_doc(path, version)
+            if doc is None:
+                content = get_static_doc('drive', 'v3')
+                if content is None:
+                    import httplib2
+                    resp, content = httplib2.Http().request(DISCOVERY_URL)
+                    if int(resp.status) != 200:
+                        raise RuntimeError(f"Could not fetch the Drive discovery document (HTTP {resp.status})")
+                doc = json.loads(content)
+                _save_cached_doc(path, version, doc)
+        _discovery_doc = doc
+        return doc
+
+def build_drive(creds):
+    """Drive v3 service from the shared discovery document, no per-build download or parsing, behind the request scheduler"""
+    doc = get_discovery_doc()
+    from googleapiclient.discovery import build_from_document
+    with timed('build'):
+        if _http_factory is not None:
+            http = _http_factory()
+        else:
+            import google_auth_httplib2
+            from googleapiclient.http import build_http
+            http = google_auth_httplib2.AuthorizedHttp(creds, http=build_http())
+        # Every request from every service shares one quota budget and retry policy
+        return build_from_document(doc, http=ThrottledHttp(http, get_scheduler()))
+
+def http_status(error) -> Optional[int]:
+    """HTTP status of a googleapiclient HttpError, None for anything else"""
+    # If the error module isn't loaded yet, no HttpError can have been raised
+    errors = sys.modules.get('googleapiclient.errors')
+    if errors is not None and isinstance(error, errors.HttpError):
+        return error.resp.status
+    return None
+
+def startup_report() -> List[str]:
+    """Readable breakdown of the cold start of the Drive client"""
+    labels = [
+        ('import', "client library import"),
+        ('credentials', "credentials"),
+        ('discovery', "discovery document"),
+        ('build', "service build"),
+        ('first_call', "first API call"),
+    ]
+    lines = ["⏱️ Drive cold start:"]
+    for key, label in labels:
+        if key in startup_timings:
+            lines.append(f"  {label}: {startup_timings[key] * 1000:.0f} ms")
+    if 'ready' in startup_timings:
+        lines.append(f"  first result {startup_timings['ready']:.2f} s after launch")
+    return lines
+
+def mark_first_result():
+    """Note when the first Drive call finished, measured from process start"""
+    startup_timings.setdefault('ready', time.perf_counter() - _process_start)
@@ -0,0 +1,249 @@
+import datetime
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+from google_conn import FOLDER_MIME, iter_folder_pages, resolve_folder
+
+# Everything the mirror keeps per item
+MIRROR_FIELDS = "id, name, mimeType, parents, md5Checksum, size, modifiedTime, createdTime, appProperties"
+
+# Parents per listing query while seeding, keeps the query string well under Drive's limit
+SEED_PARENTS_PER_QUERY = 40
+
+def _timestamp(value: Optional[str]) -> float:
+    """Epoch seconds for a Drive RFC 3339 time, 0 when missing"""
+    if not value:
+        return 0.0
+    parsed = datetime.datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S")
+    return parsed.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+def get_mirror_path() -> str:
+    """Default location of the persisted Drive mirror"""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "drive_mirror.json")
+
+class DriveMirror:
+    """
+    Local copy of one Drive subtree (IDs, names, parents, md5, modifiedTime).
+    Seeded once with a breadth-first listing, then kept current from changes.list
+    starting at a saved page token, so lookups never need the API.
+    """
+
+    def __init__(self, root_name: str = "P&L Reports", path: Optional[str] = None, min_refresh_interval: float = 10.0):
+        self.root_name = root_name
+        self.path = path or get_mirror_path()
+        self.min_refresh_interval = min_refresh_interval
+        self._lock = threading.RLock()
+        self.root_id: Optional[str] = None
+        self.page_token: Optional[str] = None
+        self.synced_at = 0.0
+        self.items: Dict[str, Dict] = {}
+        self.children: Dict[str, Set[str]] = {}
+        self.stats = {'seed_calls': 0, 'refresh_calls': 0, 'changes': 0}
+        self._load()
+
+    # ----- persistence -----
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Error loading Drive mirror: {e}")
+            return
+        # A mirror of another root is useless here, it gets re-seeded
+        if data.get('root_name') != self.root_name:
+            return
+        self.root_id = data.get('root_id')
+        self.page_token = data.get('page_token')
+        self.synced_at = data.get('synced_at', 0.0)
+        self.items = data.get('items', {})
+        self._reindex()
+
+    def save(self):
+        """Write the mirror atomically so a crash never leaves a half-written file"""
+        with self._lock:
+            data = {
+                'root_name': self.root_name,
+                'root_id': self.root_id,
+                'page_token': self.page_token,
+                'synced_at': self.synced_at,
+                'items': self.items,
+            }
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                print(f"Error saving Drive mirror: {e}")
+
+    def _reindex(self):
+        self.children = {}
+        for item_id, item in self.items.items():
+            for parent in item.get('parents', []):
+                self.children.setdefault(parent, set()).add(item_id)
+
+    # ----- updates -----
+
+    @property
+    def ready(self) -> bool:
+        return self.root_id is not None and self.page_token is not None
+
+    def _is_folder_in_tree(self, folder_id: str) -> bool:
+        return folder_id == self.root_id or self.items.get(folder_id, {}).get('mimeType') == FOLDER_MIME
+
+    def _upsert(self, item: Dict):
+        old = self.items.get(item['id'])
+        if old:
+            for parent in old.get('parents', []):
+                self.children.get(parent, set()).discard(item['id'])
+        self.items[item['id']] = {k: v for k, v in item.items() if k != 'trashed'}
+        for parent in item.get('parents', []):
+            self.children.setdefault(parent, set()).add(item['id'])
+
+    def _drop(self, item_id: str):
+        """Remove an item and, for a folder, everything below it"""
+        stack = [item_id]
+        while stack:
+            current = stack.pop()
+            item = self.items.pop(current, None)
+            if item:
+                for parent in item.get('parents', []):
+                    self.children.get(parent, set()).discard(current)
+            stack.extend(self.children.pop(current, set()))
+
+    def _list_into(self, service, folder_ids: List[str]) -> int:
+        """Breadth-first listing of folders into the mirror, returns the API calls used"""
+        calls = 0
+        queue = list(folder_ids)
+        while queue:
+            batch, queue = queue[:SEED_PARENTS_PER_QUERY], queue[SEED_PARENTS_PER_QUERY:]
+            for page in iter_folder_pages(service, batch, fields=MIRROR_FIELDS):
+                calls += 1
+                for item in page:
+                    self._upsert(item)
+                    if item['mimeType'] == FOLDER_MIME:
+                        queue.append(item['id'])
+        return calls
+
+    def seed(self, service) -> int:
+        """Build the mirror from scratch, returns the number of items"""
+        with self._lock:
+            # Take the token first so nothing that changes during the listing is missed
+            token = service.changes().getStartPageToken(supportsAllDrives=True).execute()['startPageToken']
+            root_id = resolve_folder(service, self.root_name, silent=True)
+            if not root_id:
+                raise FileNotFoundError(f"Root folder not found: {self.root_name}")
+
+            self.root_id = root_id
+            self.items = {}
+            self.children = {}
+            self.stats['seed_calls'] += 2 + self._list_into(service, [root_id])
+            self.page_token = token
+            self.synced_at = time.time()
+        self.save()
+        return len(self.items)
+
+    def _apply(self, changes: List[Dict], last_sync: float) -> List[str]:
+        """Apply a page of changes, returns folders that moved in and still need listing"""
+        to_list = []
+        pending = []
+        for change in changes:
+            item = change.get('file')
+            if change.get('removed') or not item or item.get('trashed'):
+                self._drop(change['fileId'])
+            else:
+                pending.append(item)
+
+        # A child can come before its new parent folder, so keep going while anything lands
+        progress = True
+        while pending and progress:
+            progress = False
+            remaining = []
+            for item in sorted(pending, key=lambda i: i['mimeType'] != FOLDER_MIME):
+                if any(self._is_folder_in_tree(p) for p in item.get('parents', [])):
+                    known = item['id'] in self.items
+                    self._upsert(item)
+                    progress = True
+                    # Folders created since the last sync arrive with their children as changes
+                    if item['mimeType'] == FOLDER_MIME and not known and _timestamp(item.get('createdTime')) < last_sync:
+                        to_list.append(item['id'])
+                else:
+                    remaining.append(item)
+            pending = remaining
+
+        # Whatever is left now lives outside the subtree, e.g. moved out of it
+        for item in pending:
+            if item['id'] in self.items:
+                self._drop(item['id'])
+        return to_list
+
+    def refresh(self, service, force: bool = False) -> int:
+        """Pull changes since the saved token (one small call when nothing changed), returns changes seen"""
+        if not self.ready:
+            self.seed(service)
+            return 0
+        with self._lock:
+            if not force and time.time() - self.synced_at < self.min_refresh_interval:
+                return 0
+            seen = 0
+            to_list = []
+            token = self.page_token
+            while token:
+                results = service.changes().list(
+                    pageToken=token,
+                    pageSize=1000,
+                    spaces='drive',
+                    supportsAllDrives=True,
+                    includeItemsFromAllDrives=True,
+                    fields=f"nextPageToken, newStartPageToken, changes(fileId, removed, file({MIRROR_FIELDS}, trashed))",
+                ).execute()
+                self.stats['refresh_calls'] += 1
+                changes = results.get('changes', [])
+                seen += len(changes)
+                to_list.extend(self._apply(changes, self.synced_at))
+                if 'newStartPageToken' in results:
+                    self.page_token = results['newStartPageToken']
+                    break
+                token = results.get('nextPageToken')
+
+            if to_list:
+                self.stats['refresh_calls'] += self._list_into(service, to_list)
+            self.stats['changes'] += seen
+            self.synced_at = time.time()
+        if seen:
+            self.save()
+        return seen
+
+    # ----- local queries -----
+
+    def covers(self, folder_id: Optional[str]) -> bool:
+        """True when the mirror holds the full contents of this folder"""
+        return self.ready and folder_id is not None and self._is_folder_in_tree(folder_id)
+
+    def list_children(self, folder_id: str) -> List[Dict]:
+        """Contents of a folder, folders first then by name, like the browse listing"""
+        with self._lock:
+            items = [self.items[i] for i in self.children.get(folder_id, ())]
+        return sorted(items, key=lambda i: (i['mimeType'] != FOLDER_MIME, i['name'].lower()))
+
+    def find_child(self, parent_id: str, name: str, folders_only: bool = False) -> List[Dict]:
+        with self._lock:
+            return [self.items[i] for i in self.children.get(parent_id, ())
+                    if self.items[i]['name'] == name and (not folders_only or self.items[i]['mimeType'] == FOLDER_MIME)]
+
+    def resolve_path(self, path_parts: List[str]) -> Optional[str]:
+        """Folder ID for a path below the root, or None if the mirror doesn't have it"""
+        current = self.root_id
+        for part in path_parts:
+            matches = self.find_child(current, part, folders_only=True)
+            if not matches:
+                return None
+            current = matches[0]['id']
+        return current
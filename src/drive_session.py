@@ -0,0 +1,156 @@
+import datetime
+import os
+import sys
+import threading
+from typing import Callable, Optional
+
+from drive_client import http_status, mark_first_result, startup_report, startup_timings, timed
+from google_conn import build_service, get_credentials, get_token_path, save_credentials
+
+# Refresh this long before the access token expires
+REFRESH_MARGIN = 300
+
+def is_auth_error(error) -> bool:
+    """True for failures that mean the credentials, not the request, are bad"""
+    # google.auth is imported lazily, if it isn't loaded no RefreshError was raised
+    auth_errors = sys.modules.get('google.auth.exceptions')
+    if auth_errors is not None and isinstance(error, auth_errors.RefreshError):
+        return True
+    return http_status(error) == 401
+
+def forget_token():
+    """Remove the saved token, so the next load runs the login flow"""
+    token_path = get_token_path()
+    if os.path.exists(token_path):
+        os.remove(token_path)
+
+class DriveSession:
+    """
+    Shared Drive credentials with one service per thread. The access token is
+    refreshed in the background before it expires, so calls never need a probe;
+    a call that still fails on auth refreshes the token (or logs in again) and is retried once.
+    """
+
+    def __init__(self, creds_loader: Callable = get_credentials, refresh_margin: float = REFRESH_MARGIN,
+                 logger: Callable[[str], None] = print, token_remover: Callable[[], None] = forget_token):
+        self.creds_loader = creds_loader
+        self.token_remover = token_remover
+        self.refresh_margin = refresh_margin
+        self.logger = logger
+        self._creds = None
+        # Bumped on every reload so threads know to rebuild their service
+        self._generation = 0
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._timer: Optional[threading.Timer] = None
+        self.stats = {'services_built': 0, 'refreshes': 0, 'reloads': 0, 'retries': 0}
+
+    @property
+    def connected(self) -> bool:
+        return self._creds is not None
+
+    def credentials(self):
+        """Credentials shared by every thread, loaded from the token file once"""
+        with self._lock:
+            if self._creds is None:
+                with timed('credentials'):
+                    self._creds = self.creds_loader()
+                self._generation += 1
+                self._schedule_refresh()
+            return self._creds
+
+    def service(self):
+        """Drive service owned by the calling thread"""
+        creds = self.credentials()
+        if getattr(self._local, 'generation', None) != self._generation:
+            self._local.service = build_service(creds)
+            self._local.generation = self._generation
+            self.stats['services_built'] += 1
+        return self._local.service
+
+    def _seconds_left(self) -> Optional[float]:
+        expiry = getattr(self._creds, 'expiry', None)
+        if expiry is None:
+            return None
+        # google-auth keeps expiry as a naive UTC datetime
+        return (expiry - datetime.datetime.utcnow()).total_seconds()
+
+    def _schedule_refresh(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        left = self._seconds_left()
+        if left is None or not getattr(self._creds, 'refresh_token', None):
+            return
+        self._timer = threading.Timer(max(0.0, left - self.refresh_margin), self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            self.logger(f"Background token refresh failed, will retry on next call: {e}")
+
+    def refresh(self):
+        """Refresh the access token in place, every thread's service picks it up"""
+        with self._lock:
+            if self._creds is None:
+                return
+            from google.auth.transport.requests import Request
+            self._creds.refresh(Request())
+            save_credentials(self._creds, silent=True)
+            self.stats['refreshes'] += 1
+            # Every thread rebuilds its service on its next call
+            self._generation += 1
+            self._schedule_refresh()
+
+    def reload(self, reauthenticate: bool = False):
+        """
+        Drop the credentials and load them again. With reauthenticate the saved token
+        is removed first: it can still look valid locally after the server rejected it.
+        """
+        with self._lock:
+            self._creds = None
+            self.stats['reloads'] += 1
+            if reauthenticate:
+                self.token_remover()
+        return self.credentials()
+
+    def recover(self):
+        """After a rejected call: refresh the access token, log in again only if that fails"""
+        with self._lock:
+            if getattr(self._creds, 'refresh_token', None):
+                try:
+                    self.refresh()
+                    return
+                except Exception as e:
+                    self.logger(f"Token refresh failed ({e}), logging in again")
+        self.reload(reauthenticate=True)
+
+    def call(self, func: Callable, *args, **kwargs):
+        """Run func(service, *args, **kwargs), reloading credentials and retrying once on an auth failure"""
+        try:
+            if 'first_call' in startup_timings:
+                return func(self.service(), *args, **kwargs)
+            service = self.service()
+            with timed('first_call'):
+                result = func(service, *args, **kwargs)
+            mark_first_result()
+            for line in startup_report():
+                self.logger(line)
+            return result
+        except Exception as e:
+            if not is_auth_error(e):
+                raise
+            self.logger(f"Drive credentials rejected ({e}), refreshing and retrying once")
+            self.stats['retries'] += 1
+            self.recover()
+            return func(self.service(), *args, **kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._creds = None
+            self._generation += 1
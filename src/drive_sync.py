@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from google_conn import FOLDER_MIME, get_drive_mirror, iter_folder_pages, update_file, upload_file
+
+def get_hash_cache_path() -> str:
+    """Default location of the persisted local file hashes"""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "file_hashes.json")
+
+class HashCache:
+    """md5 of local files keyed by path, reused while the file's mtime and size are unchanged"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_hash_cache_path()
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict] = self._load()
+        self.stats = {'hits': 0, 'hashed': 0}
+        self._dirty = False
+
+    def _load(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading hash cache: {e}")
+            return {}
+
+    def save(self):
+        """Write the cache atomically, only if something new was hashed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(self.entries, f, indent=2)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except Exception as e:
+                print(f"Error saving hash cache: {e}")
+
+    def md5(self, file_path: str) -> str:
+        key = os.path.abspath(file_path)
+        stat = os.stat(key)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+                self.stats['hits'] += 1
+                return entry['md5']
+
+        digest = hashlib.md5()
+        with open(key, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+
+        with self._lock:
+            self.entries[key] = {'mtime': stat.st_mtime, 'size': stat.st_size, 'md5': digest.hexdigest()}
+            self.stats['hashed'] += 1
+            self._dirty = True
+        return digest.hexdigest()
+
+_hash_cache: Optional[HashCache] = None
+
+def get_hash_cache() -> HashCache:
+    global _hash_cache
+    if _hash_cache is None:
+        _hash_cache = HashCache()
+    return _hash_cache
+
+@dataclass
+class SyncOp:
+    """One planned action for a local file"""
+    action: str  # 'upload', 'update' or 'skip'
+    path: str
+    reason: str
+    file_id: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+@dataclass
+class SyncPlan:
+    """What a sync would do to bring a Drive folder in line with local files"""
+    folder_id: str
+    ops: List[SyncOp] = field(default_factory=list)
+    list_calls: int = 0
+
+    def of(self, action: str) -> List[SyncOp]:
+        return [op for op in self.ops if op.action == action]
+
+    def report(self, limit: int = 20) -> List[str]:
+        """Readable summary of the planned operations"""
+        uploads, updates, skips = self.of('upload'), self.of('update'), self.of('skip')
+        lines = [f"🔁 Sync plan: {len(uploads)} new, {len(updates)} changed, {len(skips)} unchanged "
+                 f"({self.list_calls} list call{'s' if self.list_calls != 1 else ''})"]
+        for op in (uploads + updates)[:limit]:
+            icon = "➕" if op.action == 'upload' else "✏️"
+            lines.append(f"  {icon} {op.name} ({op.reason})")
+        if len(uploads) + len(updates) > limit:
+            lines.append(f"  ... and {len(uploads) + len(updates) - limit} more")
+        return lines
+
+def list_remote_files(service, folder_id):
+    """Every non-folder file in a folder keyed by name, plus the number of list calls it took (0 from the mirror)"""
+    remote: Dict[str, List[Dict]] = {}
+    mirror = get_drive_mirror()
+    if mirror is not None and mirror.covers(folder_id):
+        for item in mirror.list_children(folder_id):
+            if item['mimeType'] != FOLDER_MIME:
+                remote.setdefault(item['name'], []).append(item)
+        return remote, 0
+
+    calls = 0
+    for page in iter_folder_pages(service, folder_id, fields="id, name, size, md5Checksum, modifiedTime",
+                                  query=f"mimeType != '{FOLDER_MIME}'"):
+        calls += 1
+        for item in page:
+            remote.setdefault(item['name'], []).append(item)
+    return remote, calls
+
+def plan_sync(service, file_paths: List[str], folder_id: str, hashes: Optional[HashCache] = None) -> SyncPlan:
+    """Compare local files against the folder's name/size/md5 in one listing pass"""
+    hashes = hashes or get_hash_cache()
+    remote, calls = list_remote_files(service, folder_id)
+    plan = SyncPlan(folder_id, list_calls=calls)
+
+    for path in file_paths:
+        candidates = remote.get(os.path.basename(path), [])
+        if not candidates:
+            plan.ops.append(SyncOp('upload', path, "not in Drive"))
+            continue
+
+        size = os.path.getsize(path)
+        # Size is free to compare, only hash when some remote copy could match
+        if any(int(c.get('size', -1)) == size for c in candidates):
+            md5 = hashes.md5(path)
+            same = next((c for c in candidates if c.get('md5Checksum') == md5), None)
+            if same:
+                plan.ops.append(SyncOp('skip', path, "identical", same['id']))
+                continue
+
+        # Overwrite the newest copy with the same name, keeping its ID and links
+        target = max(candidates, key=lambda c: c.get('modifiedTime', ''))
+        if not target.get('md5Checksum'):
+            plan.ops.append(SyncOp('skip', path, "Drive copy is a Google-native file", target['id']))
+            continue
+        plan.ops.append(SyncOp('update', path, "content changed", target['id']))
+
+    hashes.save()
+    return plan
+
+def apply_sync(service, plan: SyncPlan, uploader=None, progress=print) -> List[bool]:
+    """
+    Run the uploads and updates in a plan. With a ParallelUploader they run
+    concurrently, otherwise one after another on the given service.
+    Returns one success flag per upload/update operation.
+    """
+    ops = plan.of('upload') + plan.of('update')
+    if uploader is not None:
+        futures = [
+            uploader.submit(op.path, plan.folder_id) if op.action == 'upload' else uploader.submit_update(op.path, op.file_id)
+            for op in ops
+        ]
+        results = []
+        for op, future in zip(ops, futures):
+            result = future.result()
+            if progress:
+                progress(f"{'✓' if result.ok else '✗'} {op.action} {op.name}" + ("" if result.ok else f": {result.error}"))
+            results.append(result.ok)
+        return results
+
+    results = []
+    for op in ops:
+        try:
+            if op.action == 'upload':
+                upload_file(service, op.path, plan.folder_id, silent=True)
+            else:
+                update_file(service, op.file_id, op.path, silent=True)
+            if progress:
+                progress(f"✓ {op.action} {op.name}")
+            results.append(True)
+        except Exception as e:
+            if progress:
+                progress(f"✗ {op.action} {op.name}: {e}")
+            results.append(False)
+    return results
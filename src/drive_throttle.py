@@ -0,0 +1,287 @@
+import os
+import random
+import re
+import threading
+import time
+import urllib.parse
+from typing import Callable, Dict, List, Optional
+
+# Drive allows 12,000 queries per minute per user, stay a little under it
+DEFAULT_QPS = 180.0
+DEFAULT_MAX_RETRIES = 5
+
+# Statuses worth another attempt; 403 only when Drive says it is a rate limit
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+def get_drive_qps() -> float:
+    """Request budget per second from the drive_qps env var"""
+    try:
+        return max(0.1, float(os.getenv("drive_qps", DEFAULT_QPS)))
+    except ValueError:
+        return DEFAULT_QPS
+
+def get_max_retries() -> int:
+    try:
+        return max(0, int(os.getenv("drive_max_retries", DEFAULT_MAX_RETRIES)))
+    except ValueError:
+        return DEFAULT_MAX_RETRIES
+
+def endpoint_name(method: str, uri: str) -> str:
+    """Short API method name for a request URI, e.g. files.list or upload.chunk"""
+    parsed = urllib.parse.urlparse(uri)
+    path = parsed.path
+    if path.startswith('/batch/'):
+        return 'batch'
+    if path.startswith('/upload/'):
+        if 'upload_id=' in parsed.query:
+            return 'upload.chunk'
+        return 'upload.create' if method == 'POST' else 'upload.update'
+    parts = path.split('/drive/v3/', 1)[-1].split('/')
+    if parts[0] == 'files':
+        if len(parts) == 1:
+            return 'files.list' if method == 'GET' else 'files.create'
+        return {'GET': 'files.get', 'PATCH': 'files.update', 'DELETE': 'files.delete'}.get(method, f"files.{method.lower()}")
+    if parts[0] == 'changes':
+        return 'changes.getStartPageToken' if len(parts) > 1 else 'changes.list'
+    return f"{parts[0]}.{method.lower()}"
+
+def is_rate_limited(status: int, content) -> bool:
+    """429, or a 403 whose reason is one of Drive's rate limits"""
+    if status == 429:
+        return True
+    if status != 403 or not content:
+        return False
+    text = content.decode('utf-8', 'replace') if isinstance(content, bytes) else str(content)
+    return any(reason in text for reason in RATE_LIMIT_REASONS)
+
+def is_retryable(status: int, content=None) -> bool:
+    return status in RETRYABLE_STATUSES or is_rate_limited(status, content)
+
+def is_idempotent(method: str, uri: str, body=None) -> bool:
+    """
+    Whether sending the request twice does no more than sending it once. A 5xx on a
+    create can arrive after Drive made the file, so repeating it makes a duplicate.
+    """
+    if method != 'POST':
+        return True
+    endpoint = endpoint_name(method, uri)
+    if endpoint == 'upload.create':
+        # Starting a resumable session creates nothing until the content is sent
+        return 'uploadType=resumable' in urllib.parse.urlparse(uri).query
+    if endpoint == 'batch':
+        # A batch is as safe as its calls, which are written out as "METHOD uri" lines
+        text = body.decode('utf-8', 'replace') if isinstance(body, bytes) else str(body or '')
+        return re.search(r'^POST ', text, re.MULTILINE) is None
+    return False
+
+def retry_after(resp) -> Optional[float]:
+    """Seconds from a Retry-After header (the delta-seconds form)"""
+    value = resp.get('retry-after') if hasattr(resp, 'get') else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. The refill rate backs off when Drive reports a rate
+    limit and creeps back up on success, so throughput settles just under the quota.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, sleep: Callable[[float], None] = time.sleep):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = max(1.0, burst if burst is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._slowed_at = 0.0
+        self._raised_at = 0.0
+        self._lock = threading.Lock()
+        self._sleep = sleep
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1) -> float:
+        """Block until the tokens are available, returns the seconds spent waiting"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                # A request bigger than the bucket (a large batch) goes once it is full and leaves it in debt
+                elif self._tokens >= min(tokens, self.capacity):
+                    self._tokens -= tokens
+                    return waited
+                else:
+                    wait = (min(tokens, self.capacity) - self._tokens) / self.rate
+            self._sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float):
+        """Hold every caller for a while, e.g. for a Retry-After"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def slow_down(self):
+        with self._lock:
+            # A burst of rejections is one signal, not one per request in flight
+            now = time.monotonic()
+            if now - self._slowed_at < 1.0:
+                return
+            self._slowed_at = now
+            self._raised_at = now
+            self.rate = max(self.max_rate * 0.05, self.rate * 0.5)
+            # Saved-up tokens would just be another burst at the old rate
+            self._tokens = min(self._tokens, self.rate)
+
+    def speed_up(self):
+        """Recover by a small step per second of success, not per request, to avoid re-triggering the limit"""
+        with self._lock:
+            if self.rate >= self.max_rate:
+                return
+            now = time.monotonic()
+            if now - self._raised_at >= 1.0:
+                self._raised_at = now
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+class RequestScheduler:
+    """
+    Every Drive HTTP request goes through here: a shared token bucket, exponential
+    backoff with full jitter for 429/5xx/rate-limit 403s, Retry-After when Drive
+    sends one, and per-endpoint counters.
+    """
+
+    def __init__(self, qps: Optional[float] = None, burst: Optional[float] = None,
+                 max_retries: Optional[int] = None, base_delay: float = 1.0, max_delay: float = 32.0,
+                 sleep: Callable[[float], None] = time.sleep, seed: Optional[int] = None):
+        self.bucket = TokenBucket(qps or get_drive_qps(), burst, sleep)
+        self.max_retries = get_max_retries() if max_retries is None else max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict] = {}
+
+    def backoff(self, attempt: int, server_delay: Optional[float] = None) -> float:
+        """Full-jitter exponential delay for a retry, never shorter than what the server asked for"""
+        delay = self._random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        return max(delay, server_delay or 0.0)
+
+    def wait_before_retry(self, attempt: int, server_delay: Optional[float] = None):
+        """Sleep out the backoff for a retry, holding everyone else too if the server asked for a pause"""
+        if server_delay:
+            self.bucket.pause(server_delay)
+        self._sleep(self.backoff(attempt, server_delay))
+
+    def _record(self, endpoint: str, status: Optional[int] = None, waited: float = 0.0, retried: bool = False):
+        with self._lock:
+            entry = self.stats.setdefault(endpoint, {'calls': 0, 'retries': 0, 'waited': 0.0, 'errors': {}})
+            if retried:
+                entry['retries'] += 1
+            else:
+                entry['calls'] += 1
+            entry['waited'] += waited
+            if status is not None and status >= 400:
+                entry['errors'][status] = entry['errors'].get(status, 0) + 1
+
+    def note_error(self, endpoint: str, status: int, content=None):
+        """Feed back an error seen outside request(), e.g. one part of a batch"""
+        self._record(endpoint, status, retried=True)
+        if is_rate_limited(status, content):
+            self.bucket.slow_down()
+
+    def request(self, http, uri, method='GET', body=None, headers=None, cost: float = 1, **kwargs):
+        """Send a request through the bucket, retrying transient failures with backoff"""
+        endpoint = endpoint_name(method, uri)
+        # A stream body (a resumable chunk) can't be re-sent here, the upload retries it itself
+        replayable = body is None or isinstance(body, (str, bytes))
+        # Creates are only repeated when Drive refused them outright (a rate limit), never after a 5xx
+        idempotent = is_idempotent(method, uri, body)
+        attempt = 0
+        while True:
+            waited = self.bucket.acquire(cost)
+            resp, content = http.request(uri, method, body=body, headers=headers, **kwargs)
+            status = int(resp.status)
+            self._record(endpoint, status, waited, retried=attempt > 0)
+
+            if not is_retryable(status, content):
+                self.bucket.speed_up()
+                return resp, content
+            if is_rate_limited(status, content):
+                self.bucket.slow_down()
+            if not replayable or attempt >= self.max_retries:
+                return resp, content
+            if not idempotent and not is_rate_limited(status, content):
+                return resp, content
+
+            self.wait_before_retry(attempt, retry_after(resp))
+            attempt += 1
+
+    def totals(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'calls': sum(e['calls'] for e in self.stats.values()),
+                'retries': sum(e['retries'] for e in self.stats.values()),
+                'waited': sum(e['waited'] for e in self.stats.values()),
+                'errors': sum(sum(e['errors'].values()) for e in self.stats.values()),
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {}
+
+    def summary(self, since: Optional[Dict[str, float]] = None) -> Optional[str]:
+        """One line when anything was throttled or retried (since an earlier totals() snapshot), else None"""
+        totals = self.totals()
+        if since:
+            totals = {key: value - since.get(key, 0) for key, value in totals.items()}
+        if not totals['retries'] and totals['waited'] < 0.5:
+            return None
+        return (f"🚦 Drive quota: {totals['calls']:.0f} calls, {totals['retries']:.0f} retries, "
+                f"{totals['waited']:.1f}s throttled, now at {self.bucket.rate:.0f}/{self.bucket.max_rate:.0f} req/s")
+
+    def report(self) -> List[str]:
+        """Per-endpoint calls, retries, throttled time and error statuses"""
+        lines = [f"🚦 Drive requests (limit {self.bucket.max_rate:.0f}/s, now {self.bucket.rate:.0f}/s):"]
+        with self._lock:
+            for endpoint, entry in sorted(self.stats.items()):
+                errors = ", ".join(f"{status}×{count}" for status, count in sorted(entry['errors'].items()))
+                lines.append(f"  {endpoint}: {entry['calls']} calls, {entry['retries']} retries, "
+                             f"{entry['waited']:.1f}s throttled" + (f", errors {errors}" if errors else ""))
+        if len(lines) == 1:
+            lines.append("  no requests yet")
+        return lines
+
+class ThrottledHttp:
+    """Transport wrapper that sends every request through a RequestScheduler"""
+
+    def __init__(self, http, scheduler: RequestScheduler):
+        self.http = http
+        self.scheduler = scheduler
+
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        cost = 1
+        if '/batch/' in uri and isinstance(body, str):
+            # Drive charges every call in a batch against the quota
+            cost = max(1, body.count('Content-ID:'))
+        return self.scheduler.request(self.http, uri, method, body=body, headers=headers, cost=cost, **kwargs)
+
+    def __getattr__(self, name):
+        # credentials, timeout, redirect_codes... as the wrapped transport has them
+        return getattr(self.http, name)
+
+_scheduler: Optional[RequestScheduler] = None
+
+def get_scheduler() -> RequestScheduler:
+    """Process-wide scheduler shared by every Drive service and upload worker"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RequestScheduler()
+    return _scheduler
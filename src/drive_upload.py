@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from google_conn import build_service, find_by_app_properties, update_file, upload_file
+
+# Drive throttles bursts of writes per user, a few uploads at a time is the sweet spot
+DEFAULT_UPLOAD_WORKERS = 4
+MAX_UPLOAD_WORKERS = 16
+
+def get_upload_workers() -> int:
+    """Concurrency cap from the upload_workers env var"""
+    try:
+        workers = int(os.getenv("upload_workers", DEFAULT_UPLOAD_WORKERS))
+    except ValueError:
+        workers = DEFAULT_UPLOAD_WORKERS
+    return max(1, min(workers, MAX_UPLOAD_WORKERS))
+
+@dataclass
+class UploadResult:
+    """Outcome of one file upload"""
+    path: str
+    folder_id: Optional[str]
+    file_id: Optional[str] = None
+    size: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+    # True when the file was already in Drive and nothing was sent
+    existing: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+class ParallelUploader:
+    """
+    Bounded pool of upload threads. Each worker builds its own Drive service from
+    the shared credentials, since one service's httplib2 transport can't be shared.
+    With a DriveSession the workers take their services from it instead, so a token
+    refresh or a new login reaches them and a rejected call is retried once.
+    """
+
+    def __init__(self, creds=None, max_workers: Optional[int] = None, session=None):
+        self.creds = creds
+        self.session = session
+        self.max_workers = max_workers or get_upload_workers()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="drive-upload")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.stats = {'files': 0, 'failed': 0, 'bytes': 0, 'busy_seconds': 0.0}
+        self._first_start: Optional[float] = None
+        self._last_end: Optional[float] = None
+
+    def _service(self):
+        if self.session is not None:
+            return self.session.service()
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = self._local.service = build_service(self.creds)
+        return service
+
+    def _call(self, func: Callable, *args, **kwargs):
+        if self.session is not None:
+            return self.session.call(func, *args, **kwargs)
+        return func(self._service(), *args, **kwargs)
+
+    def _upload(self, file_path: str, folder_id: Optional[str], file_id: Optional[str] = None,
+                app_properties: Optional[Dict[str, str]] = None, dedupe: bool = False) -> UploadResult:
+        result = UploadResult(file_path, folder_id, file_id)
+        start = time.perf_counter()
+        with self._lock:
+            if self._first_start is None:
+                self._first_start = start
+        try:
+            result.size = os.path.getsize(file_path)
+            existing = None
+            if dedupe and app_properties:
+                matches = self._call(find_by_app_properties, folder_id, app_properties, fields="files(id)")
+                existing = matches[0]['id'] if matches else None
+            if existing:
+                result.file_id = existing
+                result.existing = True
+            elif file_id:
+                self._call(update_file, file_id, file_path, silent=True)
+            else:
+                result.file_id = self._call(upload_file, file_path, folder_id, silent=True,
+                                            app_properties=app_properties)
+        except Exception as e:
+            result.error = str(e)
+        result.seconds = time.perf_counter() - start
+
+        with self._lock:
+            self._last_end = time.perf_counter()
+            if not result.ok:
+                self.stats['failed'] += 1
+            elif not result.existing:
+                self.stats['files'] += 1
+                self.stats['bytes'] += result.size
+            self.stats['busy_seconds'] += result.seconds
+        return result
+
+    def submit(self, file_path: str, folder_id: str, app_properties: Optional[Dict[str, str]] = None,
+               dedupe: bool = False) -> Future:
+        """
+        Queue one upload, the future resolves to an UploadResult (never raises).
+        With dedupe, a file in the folder already tagged with app_properties is
+        returned instead of uploading a second copy.
+        """
+        return self._pool.submit(self._upload, file_path, folder_id, None, app_properties, dedupe)
+
+    def submit_update(self, file_path: str, file_id: str) -> Future:
+        """Queue a content update of an existing Drive file"""
+        return self._pool.submit(self._upload, file_path, None, file_id)
+
+    def upload_many(self, file_paths: List[str], folder_id: str,
+                    progress: Optional[Callable[[UploadResult], None]] = None) -> List[UploadResult]:
+        """Upload files concurrently, returns results in the order of file_paths"""
+        futures = [self.submit(path, folder_id) for path in file_paths]
+        if progress:
+            for future in futures:
+                future.add_done_callback(lambda f: progress(f.result()))
+        return [future.result() for future in futures]
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {'files': 0, 'failed': 0, 'bytes': 0, 'busy_seconds': 0.0}
+            self._first_start = None
+            self._last_end = None
+
+    def wall_seconds(self) -> float:
+        if self._first_start is None or self._last_end is None:
+            return 0.0
+        return self._last_end - self._first_start
+
+    def report(self) -> str:
+        """Aggregate throughput since the uploader was created or last reset"""
+        wall = self.wall_seconds() or 1e-9
+        mib = self.stats['bytes'] / (1024 * 1024)
+        speedup = self.stats['busy_seconds'] / wall
+        return (f"📈 {self.stats['files']} uploaded, {self.stats['failed']} failed, {mib:.2f} MiB in {wall:.1f}s "
+                f"({self.stats['files'] / wall:.1f} files/s, {mib / wall:.2f} MiB/s, "
+                f"{self.max_workers} workers, {speedup:.1f}x vs sequential)")
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
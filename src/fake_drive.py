@@ -0,0 +1,733 @@
+import datetime
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+from email.parser import FeedParser
+from typing import Callable, Dict, List, Optional, Tuple
+
+import drive_client
+from drive_client import get_discovery_doc
+
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+
+DEFAULT_LIST_FIELDS = "kind, nextPageToken, incompleteSearch, files(kind, id, name, mimeType)"
+DEFAULT_FILE_FIELDS = "kind, id, name, mimeType"
+
+class FakeDriveError(Exception):
+    """A Drive API error response: HTTP status, error reason and message"""
+
+    def __init__(self, status: int, reason: str, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+        self.message = message
+        self.headers = headers or {}
+
+    def body(self) -> Dict:
+        return {'error': {'code': self.status, 'message': self.message,
+                          'errors': [{'domain': 'global', 'reason': self.reason, 'message': self.message}]}}
+
+def _now() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+# ----- fields projection -----
+
+def _parse_fields(spec: str) -> Dict[str, Optional[Dict]]:
+    """'nextPageToken, files(id, name)' -> {'nextPageToken': None, 'files': {'id': None, 'name': None}}"""
+    tree: Dict[str, Optional[Dict]] = {}
+    pos = 0
+
+    def parse_level(end_char: Optional[str]) -> Dict[str, Optional[Dict]]:
+        nonlocal pos
+        level: Dict[str, Optional[Dict]] = {}
+        name = ''
+        while pos < len(spec):
+            char = spec[pos]
+            pos += 1
+            if char == '(':
+                level[name.strip()] = parse_level(')')
+                name = ''
+            elif char == ',':
+                if name.strip():
+                    level[name.strip()] = None
+                name = ''
+            elif char == end_char:
+                break
+            else:
+                name += char
+        if name.strip():
+            level[name.strip()] = None
+        return level
+
+    tree = parse_level(None)
+    # 'a/b' is shorthand for 'a(b)'
+    for key in [k for k in tree if '/' in k]:
+        head, rest = key.split('/', 1)
+        tree.setdefault(head, {})
+        if tree[head] is not None:
+            tree[head].update(_parse_fields(rest))
+        del tree[key]
+    return tree
+
+def _project(value, tree: Optional[Dict]):
+    if tree is None or '*' in tree:
+        return value
+    if isinstance(value, list):
+        return [_project(v, tree) for v in value]
+    if isinstance(value, dict):
+        return {k: _project(value[k], sub) for k, sub in tree.items() if k in value}
+    return value
+
+# ----- query language -----
+
+_TOKEN = re.compile(r"\s*(?:(?P<str>'(?:[^'\\]|\\.)*')|(?P<op><=|>=|!=|=|<|>)|(?P<punct>[(){}])|(?P<word>[A-Za-z_][\w.]*))")
+
+def _tokenize(query: str) -> List[Tuple[str, str]]:
+    tokens = []
+    pos = 0
+    query = query.strip()
+    while pos < len(query):
+        match = _TOKEN.match(query, pos)
+        if not match or match.end() == pos:
+            raise FakeDriveError(400, 'invalid', f"Invalid Value: bad query near '{query[pos:pos + 20]}'")
+        pos = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == 'str':
+            text = re.sub(r"\\(.)", r"\1", text[1:-1])
+        tokens.append((kind, text))
+    return tokens
+
+class _QueryParser:
+    """Recursive descent over the Drive query grammar, builds a predicate on file resources"""
+
+    FIELDS = {'name', 'mimeType', 'trashed', 'modifiedTime', 'createdTime', 'fullText', 'starred'}
+
+    def __init__(self, query: str):
+        self.tokens = _tokenize(query)
+        self.pos = 0
+
+    def parse(self) -> Callable[[Dict], bool]:
+        predicate = self._or()
+        if self.pos != len(self.tokens):
+            raise FakeDriveError(400, 'invalid', f"Invalid Value: unexpected '{self.tokens[self.pos][1]}'")
+        return predicate
+
+    def _peek(self) -> Tuple[str, str]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else ('end', '')
+
+    def _take(self, text: Optional[str] = None) -> Tuple[str, str]:
+        token = self._peek()
+        if token[0] == 'end' or (text is not None and token[1].lower() != text.lower()):
+            raise FakeDriveError(400, 'invalid', f"Invalid Value: expected '{text}' in query")
+        self.pos += 1
+        return token
+
+    def _or(self):
+        terms = [self._and()]
+        while self._peek()[1].lower() == 'or':
+            self._take()
+            terms.append(self._and())
+        return terms[0] if len(terms) == 1 else (lambda f, ts=terms: any(t(f) for t in ts))
+
+    def _and(self):
+        terms = [self._unary()]
+        while self._peek()[1].lower() == 'and':
+            self._take()
+            terms.append(self._unary())
+        return terms[0] if len(terms) == 1 else (lambda f, ts=terms: all(t(f) for t in ts))
+
+    def _unary(self):
+        kind, text = self._peek()
+        if text.lower() == 'not':
+            self._take()
+            inner = self._unary()
+            return lambda f: not inner(f)
+        if text == '(':
+            self._take()
+            inner = self._or()
+            self._take(')')
+            return inner
+        return self._comparison()
+
+    def _value(self):
+        kind, text = self._take()
+        if kind == 'str':
+            return text
+        if text.lower() in ('true', 'false'):
+            return text.lower() == 'true'
+        raise FakeDriveError(400, 'invalid', f"Invalid Value: expected a value, got '{text}'")
+
+    def _comparison(self):
+        kind, text = self._peek()
+        # 'value' in parents
+        if kind == 'str':
+            value = self._value()
+            self._take('in')
+            field = self._take()[1]
+            if field not in ('parents', 'owners', 'writers', 'readers'):
+                raise FakeDriveError(400, 'invalid', f"Invalid Value: '{field}' can't be used with 'in'")
+            return lambda f: value in f.get(field, [])
+
+        field = self._take()[1]
+        if field in ('appProperties', 'properties'):
+            self._take('has')
+            self._take('{')
+            self._take('key')
+            self._take('=')
+            key = self._value()
+            self._take('and')
+            self._take('value')
+            self._take('=')
+            value = self._value()
+            self._take('}')
+            return lambda f: f.get(field, {}).get(key) == value
+        if field not in self.FIELDS:
+            raise FakeDriveError(400, 'invalid', f"Invalid Value: unknown query field '{field}'")
+        if field == 'fullText':
+            field = 'name'
+
+        op = self._take()[1]
+        value = self._value()
+        if op == 'contains':
+            return lambda f: str(value).lower() in str(f.get(field, '')).lower()
+        compare = {
+            '=': lambda a, b: a == b,
+            '!=': lambda a, b: a != b,
+            '<': lambda a, b: a < b,
+            '<=': lambda a, b: a <= b,
+            '>': lambda a, b: a > b,
+            '>=': lambda a, b: a >= b,
+        }.get(op)
+        if compare is None:
+            raise FakeDriveError(400, 'invalid', f"Invalid Value: unknown operator '{op}'")
+        default = False if field in ('trashed', 'starred') else ''
+        return lambda f: compare(f.get(field, default), value)
+
+def compile_query(query: Optional[str]) -> Callable[[Dict], bool]:
+    """Predicate for a Drive 'q' string (the subset of the grammar the app uses)"""
+    if not query or not query.strip():
+        return lambda f: True
+    return _QueryParser(query).parse()
+
+def _sort_key(order_by: Optional[str]):
+    if not order_by:
+        return None
+    keys = []
+    for part in order_by.split(','):
+        words = part.strip().split()
+        if not words:
+            continue
+        keys.append((words[0], len(words) > 1 and words[1].lower() == 'desc'))
+
+    def key(item):
+        values = []
+        for name, desc in keys:
+            if name == 'folder':
+                value = 0 if item['mimeType'] == FOLDER_MIME else 1
+            elif name in ('name', 'name_natural'):
+                value = item['name'].lower()
+            else:
+                value = item.get(name, '')
+            values.append(_Reversed(value) if desc else value)
+        return values
+    return key
+
+class _Reversed:
+    """Sort key wrapper for descending fields"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return self.value > other.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+# ----- the fake service -----
+
+class FakeDrive:
+    """
+    In-memory stand-in for the part of Drive v3 the app uses: files list/get/create/
+    update/delete with 'q' queries, parents, trashed and pagination, changes,
+    multipart and resumable uploads, and batch requests. Talk to it through real
+    googleapiclient services built on FakeHttp, so client code runs unchanged.
+
+    latency is added to every HTTP round trip, upload_bandwidth (bytes/s) to request
+    bodies. error_rate is the chance a call fails with 503, rate_limit the calls per
+    second allowed before 429s. Everything random comes from seed.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, rate_limit: Optional[float] = None,
+                 upload_bandwidth: Optional[float] = None, seed: Optional[int] = None, keep_content: bool = False):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.upload_bandwidth = upload_bandwidth
+        self.keep_content = keep_content
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self.files: Dict[str, Dict] = {}
+        self.content: Dict[str, bytes] = {}
+        self.change_log: List[Dict] = []
+        self.upload_sessions: Dict[str, Dict] = {}
+        self._injected: List[Tuple[int, str]] = []
+        self._recent_calls: List[float] = []
+        self.stats: Dict[str, float] = {}
+        self.root_id = 'root'
+        self.files['root'] = {'id': 'root', 'name': 'My Drive', 'mimeType': FOLDER_MIME, 'parents': [],
+                              'trashed': False, 'createdTime': _now(), 'modifiedTime': _now()}
+
+    # ----- setup helpers -----
+
+    def _new_id(self) -> str:
+        return f"fake{next(self._ids):07d}{uuid.uuid4().hex[:8]}"
+
+    def add_folder(self, name: str, parent_id: str = 'root') -> str:
+        return self._create({'name': name, 'mimeType': FOLDER_MIME, 'parents': [parent_id]})['id']
+
+    def add_file(self, name: str, parent_id: str = 'root', content: bytes = b'', mime_type: str = 'text/csv') -> str:
+        return self._create({'name': name, 'mimeType': mime_type, 'parents': [parent_id]}, content)['id']
+
+    def make_path(self, path_parts: List[str], parent_id: str = 'root') -> str:
+        """Create (or reuse) nested folders, returns the ID of the last one"""
+        current = parent_id
+        for part in path_parts:
+            existing = self.children(current, part, folders_only=True)
+            current = existing[0]['id'] if existing else self.add_folder(part, current)
+        return current
+
+    def children(self, parent_id: str, name: Optional[str] = None, folders_only: bool = False) -> List[Dict]:
+        with self._lock:
+            return [f for f in self.files.values()
+                    if parent_id in f['parents'] and not f['trashed']
+                    and (name is None or f['name'] == name)
+                    and (not folders_only or f['mimeType'] == FOLDER_MIME)]
+
+    def inject(self, status: int, count: int = 1, reason: Optional[str] = None):
+        """Make the next count calls fail with this status"""
+        reason = reason or {403: 'userRateLimitExceeded', 404: 'notFound', 429: 'rateLimitExceeded',
+                            500: 'internalError', 503: 'backendError'}.get(status, 'error')
+        with self._lock:
+            self._injected.extend([(status, reason)] * count)
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {}
+
+    def _count(self, key: str, amount: float = 1):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + amount
+
+    def service(self):
+        """googleapiclient Drive service wired to this fake"""
+        from googleapiclient.discovery import build_from_document
+        return build_from_document(get_discovery_doc(), http=FakeHttp(self))
+
+    def install(self):
+        """Make every service the app builds (sessions, upload workers) talk to this fake"""
+        drive_client.set_http_factory(lambda: FakeHttp(self))
+        return self
+
+    @staticmethod
+    def uninstall():
+        drive_client.set_http_factory(None)
+
+    # ----- failure injection -----
+
+    def _check_faults(self):
+        """Raise the error a real Drive might return for this call, if any"""
+        with self._lock:
+            if self._injected:
+                status, reason = self._injected.pop(0)
+                self._count('errors_injected')
+                raise FakeDriveError(status, reason, f"Injected {status} {reason}",
+                                     {'retry-after': '1'} if status in (403, 429) else None)
+            if self.rate_limit:
+                now = time.monotonic()
+                self._recent_calls = [t for t in self._recent_calls if now - t < 1.0]
+                if len(self._recent_calls) >= self.rate_limit:
+                    self._count('errors_rate_limited')
+                    raise FakeDriveError(429, 'rateLimitExceeded', "Rate Limit Exceeded", {'retry-after': '1'})
+                self._recent_calls.append(now)
+            if self.error_rate and self._random.random() < self.error_rate:
+                self._count('errors_injected')
+                raise FakeDriveError(503, 'backendError', "Backend Error")
+
+    # ----- file operations -----
+
+    def _get(self, file_id: str) -> Dict:
+        item = self.files.get(file_id)
+        if item is None:
+            raise FakeDriveError(404, 'notFound', f"File not found: {file_id}.")
+        return item
+
+    def _record_change(self, file_id: str, removed: bool = False):
+        self.change_log.append({'fileId': file_id, 'removed': removed, 'time': _now()})
+
+    def _set_content(self, item: Dict, content: bytes):
+        item['size'] = str(len(content))
+        item['md5Checksum'] = hashlib.md5(content).hexdigest()
+        if self.keep_content:
+            self.content[item['id']] = content
+
+    def _create(self, body: Dict, content: Optional[bytes] = None, mime_type: Optional[str] = None) -> Dict:
+        with self._lock:
+            parents = body.get('parents') or ['root']
+            for parent in parents:
+                if parent not in self.files or self.files[parent]['mimeType'] != FOLDER_MIME:
+                    raise FakeDriveError(404, 'notFound', f"File not found: {parent}.")
+            now = _now()
+            item = {
+                'kind': 'drive#file',
+                'id': self._new_id(),
+                'name': body.get('name', 'Untitled'),
+                'mimeType': body.get('mimeType') or mime_type or 'application/octet-stream',
+                'parents': list(parents),
+                'trashed': False,
+                'createdTime': now,
+                'modifiedTime': now,
+            }
+            if body.get('appProperties'):
+                item['appProperties'] = {k: v for k, v in body['appProperties'].items() if v is not None}
+            if item['mimeType'] != FOLDER_MIME:
+                self._set_content(item, content or b'')
+            self.files[item['id']] = item
+            self._record_change(item['id'])
+            return item
+
+    def _update(self, file_id: str, body: Optional[Dict], params: Dict[str, str], content: Optional[bytes] = None) -> Dict:
+        with self._lock:
+            item = self._get(file_id)
+            body = body or {}
+            for key in ('name', 'mimeType', 'trashed', 'starred'):
+                if key in body:
+                    item[key] = body[key]
+            if 'appProperties' in body:
+                props = dict(item.get('appProperties', {}))
+                for key, value in body['appProperties'].items():
+                    if value is None:
+                        props.pop(key, None)
+                    else:
+                        props[key] = value
+                item['appProperties'] = props
+            for parent in filter(None, params.get('removeParents', '').split(',')):
+                if parent in item['parents']:
+                    item['parents'].remove(parent)
+            for parent in filter(None, params.get('addParents', '').split(',')):
+                self._get(parent)
+                if parent not in item['parents']:
+                    item['parents'].append(parent)
+            if content is not None:
+                self._set_content(item, content)
+            item['modifiedTime'] = _now()
+            self._record_change(file_id)
+            return item
+
+    def _delete(self, file_id: str):
+        with self._lock:
+            self._get(file_id)
+            stack = [file_id]
+            while stack:
+                current = stack.pop()
+                self.files.pop(current, None)
+                self.content.pop(current, None)
+                self._record_change(current, removed=True)
+                stack.extend(f['id'] for f in self.files.values() if current in f['parents'])
+
+    def _list(self, params: Dict[str, str]) -> Dict:
+        predicate = compile_query(params.get('q'))
+        page_size = max(1, min(int(params.get('pageSize', 100)), 1000))
+        offset = int(params.get('pageToken') or 0)
+        with self._lock:
+            matches = [f for f in self.files.values() if f['id'] != 'root' and predicate(f)]
+        key = _sort_key(params.get('orderBy'))
+        if key:
+            matches.sort(key=key)
+        page = matches[offset:offset + page_size]
+        result = {'kind': 'drive#fileList', 'incompleteSearch': False, 'files': page}
+        if offset + page_size < len(matches):
+            result['nextPageToken'] = str(offset + page_size)
+        return result
+
+    def _changes(self, params: Dict[str, str]) -> Dict:
+        start = int(params['pageToken'])
+        page_size = max(1, min(int(params.get('pageSize', 100)), 1000))
+        with self._lock:
+            entries = self.change_log[start:start + page_size]
+            changes = []
+            for entry in entries:
+                change = {'kind': 'drive#change', 'changeType': 'file', 'fileId': entry['fileId'],
+                          'removed': entry['removed'], 'time': entry['time']}
+                if not entry['removed'] and entry['fileId'] in self.files:
+                    change['file'] = self.files[entry['fileId']]
+                elif not entry['removed']:
+                    change['removed'] = True
+                changes.append(change)
+            result = {'kind': 'drive#changeList', 'changes': changes}
+            if start + page_size < len(self.change_log):
+                result['nextPageToken'] = str(start + page_size)
+            else:
+                result['newStartPageToken'] = str(len(self.change_log))
+            return result
+
+    # ----- HTTP routing -----
+
+    def handle(self, uri: str, method: str, body, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """Serve one HTTP request, returns (status, headers, content)"""
+        parsed = urllib.parse.urlparse(uri)
+        params = dict(urllib.parse.parse_qsl(parsed.query))
+        path = parsed.path
+        try:
+            if path.startswith('/batch/'):
+                return self._batch(body, headers)
+            self._check_faults()
+            status, result, extra = self._route(method, path, params, body, headers)
+        except FakeDriveError as e:
+            return e.status, dict(e.headers, **{'content-type': 'application/json'}), json.dumps(e.body()).encode('utf-8')
+        if result is None:
+            return status, extra, b''
+        return status, dict(extra, **{'content-type': 'application/json'}), json.dumps(result).encode('utf-8')
+
+    def _route(self, method: str, path: str, params: Dict[str, str], body, headers: Dict[str, str]):
+        fields = params.get('fields')
+        if path.startswith('/upload/drive/v3/files'):
+            return self._upload(method, path, params, body, headers)
+        if path == '/drive/v3/files' and method == 'GET':
+            self._count('files.list')
+            return 200, _project(self._list(params), _parse_fields(fields or DEFAULT_LIST_FIELDS)), {}
+        if path == '/drive/v3/files' and method == 'POST':
+            self._count('files.create')
+            item = self._create(self._json(body))
+            return 200, _project(item, _parse_fields(fields or DEFAULT_FILE_FIELDS)), {}
+        if path == '/drive/v3/changes/startPageToken':
+            self._count('changes.getStartPageToken')
+            with self._lock:
+                return 200, {'kind': 'drive#startPageToken', 'startPageToken': str(len(self.change_log))}, {}
+        if path == '/drive/v3/changes':
+            self._count('changes.list')
+            return 200, _project(self._changes(params), _parse_fields(fields) if fields else None), {}
+        if path == '/drive/v3/about':
+            self._count('about.get')
+            return 200, _project({'kind': 'drive#about', 'user': {'displayName': 'Fake User'}},
+                                 _parse_fields(fields) if fields else None), {}
+        match = re.fullmatch(r'/drive/v3/files/([^/]+)', path)
+        if match:
+            file_id = urllib.parse.unquote(match.group(1))
+            if method == 'GET':
+                self._count('files.get')
+                with self._lock:
+                    item = dict(self._get(file_id))
+                return 200, _project(item, _parse_fields(fields or DEFAULT_FILE_FIELDS)), {}
+            if method == 'PATCH':
+                self._count('files.update')
+                item = self._update(file_id, self._json(body), params)
+                return 200, _project(item, _parse_fields(fields or DEFAULT_FILE_FIELDS)), {}
+            if method == 'DELETE':
+                self._count('files.delete')
+                self._delete(file_id)
+                return 204, None, {}
+        raise FakeDriveError(404, 'notFound', f"Not found: {method} {path}")
+
+    @staticmethod
+    def _json(body) -> Dict:
+        if not body:
+            return {}
+        return json.loads(body.decode('utf-8') if isinstance(body, bytes) else body)
+
+    def _throttle_body(self, size: int):
+        if self.upload_bandwidth and size:
+            time.sleep(size / self.upload_bandwidth)
+        self._count('bytes_uploaded', size)
+
+    def _upload(self, method: str, path: str, params: Dict[str, str], body, headers: Dict[str, str]):
+        upload_type = params.get('uploadType')
+        fields = _parse_fields(params.get('fields') or DEFAULT_FILE_FIELDS)
+        match = re.fullmatch(r'/upload/drive/v3/files(?:/([^/]+))?', path)
+        file_id = urllib.parse.unquote(match.group(1)) if match and match.group(1) else None
+        if hasattr(body, 'read'):
+            # Resumable chunks arrive as a stream slice of the file
+            body = body.read()
+        data = body.encode('utf-8') if isinstance(body, str) else (body or b'')
+
+        if upload_type == 'resumable' and 'upload_id' in params:
+            return self._resumable_chunk(params['upload_id'], data, headers, fields)
+
+        if upload_type == 'resumable':
+            self._count('upload.resumable')
+            with self._lock:
+                if file_id:
+                    self._get(file_id)
+                else:
+                    for parent in self._json(data).get('parents') or ['root']:
+                        self._get(parent)
+                upload_id = uuid.uuid4().hex
+                self.upload_sessions[upload_id] = {
+                    'file_id': file_id,
+                    'metadata': self._json(data),
+                    'mime_type': headers.get('x-upload-content-type'),
+                    'size': int(headers['x-upload-content-length']) if headers.get('x-upload-content-length') else None,
+                    'data': bytearray(),
+                }
+            location = f"https://www.googleapis.com{path}?uploadType=resumable&upload_id={upload_id}"
+            return 200, None, {'location': location}
+
+        if upload_type == 'multipart':
+            self._count('upload.multipart')
+            metadata, content, mime_type = self._split_multipart(data, headers.get('content-type', ''))
+        elif upload_type == 'media':
+            self._count('upload.media')
+            metadata, content, mime_type = {}, data, headers.get('content-type')
+        else:
+            raise FakeDriveError(400, 'badRequest', f"Unsupported uploadType: {upload_type}")
+        self._throttle_body(len(content))
+        if file_id:
+            item = self._update(file_id, metadata, params, content)
+        else:
+            item = self._create(metadata, content, mime_type)
+        return 200, _project(item, fields), {}
+
+    @staticmethod
+    def _split_multipart(data: bytes, content_type: str) -> Tuple[Dict, bytes, Optional[str]]:
+        """Metadata, media bytes and media type of a multipart/related upload body"""
+        match = re.search(r'boundary="?([^";]+)"?', content_type)
+        if not match:
+            raise FakeDriveError(400, 'badRequest', "Multipart body without boundary")
+        delimiter = b'--' + match.group(1).encode('utf-8')
+        parts = []
+        for chunk in data.split(delimiter)[1:]:
+            if chunk.startswith(b'--'):
+                break
+            chunk = chunk[2:] if chunk.startswith(b'\r\n') else chunk[1:] if chunk.startswith(b'\n') else chunk
+            # The line break before the next delimiter belongs to the delimiter
+            chunk = chunk[:-2] if chunk.endswith(b'\r\n') else chunk[:-1] if chunk.endswith(b'\n') else chunk
+            crlf, lf = chunk.find(b'\r\n\r\n'), chunk.find(b'\n\n')
+            if crlf != -1 and (lf == -1 or crlf < lf):
+                head, payload = chunk[:crlf], chunk[crlf + 4:]
+            else:
+                head, payload = chunk[:lf], chunk[lf + 2:]
+            part_headers = {}
+            for line in head.decode('utf-8').splitlines():
+                if ':' in line:
+                    key, value = line.split(':', 1)
+                    part_headers[key.strip().lower()] = value.strip()
+            parts.append((part_headers, payload))
+        if len(parts) != 2:
+            raise FakeDriveError(400, 'badRequest', "Multipart upload needs metadata and media parts")
+        return json.loads(parts[0][1].decode('utf-8')), parts[1][1], parts[1][0].get('content-type')
+
+    def _resumable_chunk(self, upload_id: str, data: bytes, headers: Dict[str, str], fields):
+        self._count('upload.chunk')
+        with self._lock:
+            session = self.upload_sessions.get(upload_id)
+        if session is None:
+            raise FakeDriveError(404, 'notFound', "Upload session not found or expired")
+
+        content_range = headers.get('content-range', '')
+        match = re.fullmatch(r'bytes (\*|(\d+)-(\d+))/(\*|\d+)', content_range.strip())
+        if not match:
+            raise FakeDriveError(400, 'badRequest', f"Bad Content-Range: {content_range}")
+        total = None if match.group(4) == '*' else int(match.group(4))
+        if match.group(1) != '*':
+            start = int(match.group(2))
+            with self._lock:
+                received = len(session['data'])
+                if start > received:
+                    raise FakeDriveError(400, 'badRequest', f"Chunk starts at {start}, only {received} bytes received")
+                # Bytes already committed are ignored, like a retried chunk on the real service
+                session['data'][start:] = b''
+                session['data'].extend(data)
+            self._throttle_body(len(data))
+
+        with self._lock:
+            received = len(session['data'])
+            if total is None or received < total:
+                result_headers = {'range': f"bytes=0-{received - 1}"} if received else {}
+                return 308, None, result_headers
+            del self.upload_sessions[upload_id]
+        content = bytes(session['data'])
+        if session['file_id']:
+            item = self._update(session['file_id'], session['metadata'], {}, content)
+        else:
+            item = self._create(session['metadata'], content, session['mime_type'])
+        return 200, _project(item, fields), {}
+
+    def _batch(self, body, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """Serve a multipart/mixed batch, each part gets its own status like on the real service"""
+        self._count('batch')
+        text = body.decode('utf-8') if isinstance(body, bytes) else body
+        parser = FeedParser()
+        parser.feed(f"content-type: {headers.get('content-type', '')}\r\n\r\n" + text)
+        message = parser.close()
+        if not message.is_multipart():
+            return 400, {'content-type': 'application/json'}, b'{"error": {"code": 400, "message": "Bad batch"}}'
+        parts = message.get_payload()
+        if len(parts) > 100:
+            error = FakeDriveError(400, 'batchSizeTooLarge', "A batch can hold at most 100 calls")
+            return 400, {'content-type': 'application/json'}, json.dumps(error.body()).encode('utf-8')
+
+        boundary = f"batch_{uuid.uuid4().hex}"
+        out = []
+        for part in parts:
+            content_id = part['Content-ID'] or ''
+            request_line, _, rest = part.get_payload().partition('\n')
+            method, target, _ = request_line.strip().split(' ', 2)
+            sub_headers = {}
+            head, _, sub_body = rest.replace('\r\n', '\n').partition('\n\n')
+            for line in head.splitlines():
+                if ':' in line:
+                    key, value = line.split(':', 1)
+                    sub_headers[key.strip().lower()] = value.strip()
+            status, resp_headers, content = self.handle('https://www.googleapis.com' + target, method,
+                                                        sub_body or None, sub_headers)
+            reason = 'OK' if status < 300 else 'Error'
+            header_lines = ''.join(f"{k}: {v}\r\n" for k, v in resp_headers.items())
+            out.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id[1:-1]}>\r\n\r\n"
+                f"HTTP/1.1 {status} {reason}\r\n{header_lines}\r\n{content.decode('utf-8')}\r\n"
+            )
+        out.append(f"--{boundary}--\r\n")
+        return 200, {'content-type': f'multipart/mixed; boundary={boundary}'}, ''.join(out).encode('utf-8')
+
+class FakeHttp:
+    """httplib2.Http look-alike that answers from a FakeDrive, one per service like the real transport"""
+
+    def __init__(self, drive: FakeDrive):
+        self.drive = drive
+
+    def request(self, uri, method='GET', body=None, headers=None, redirections=5, connection_type=None):
+        import httplib2
+        if self.drive.latency:
+            time.sleep(self.drive.latency)
+        self.drive._count('http_requests')
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        status, resp_headers, content = self.drive.handle(uri, method, body, headers)
+        response = httplib2.Response(dict(resp_headers, status=str(status)))
+        response.reason = 'OK' if status < 300 else 'Error'
+        return response, content
+
+class FakeCredentials:
+    """Always-valid credentials for a session that talks to a FakeDrive"""
+    valid = True
+    expired = False
+    expiry = None
+    refresh_token = None
+    token = 'fake-token'
+
+    def refresh(self, request):
+        pass
+
+    def apply(self, headers, token=None):
+        headers['authorization'] = f"Bearer {self.token}"
+
+    def before_request(self, request, method, url, headers):
+        self.apply(headers)
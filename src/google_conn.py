@@ -1,13 +1,17 @@
 from __future__ import print_function
 from dotenv import load_dotenv
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from drive_batch import DriveBatch
+from drive_cache import get_folder_cache
+from download_index import get_download_index
+from drive_client import build_drive, http_status, startup_report
+from drive_throttle import get_scheduler
+from resumable_upload import RESUMABLE_THRESHOLD, resumable_upload
 
 import ast
+import calendar
 import os
 import pickle
+import threading
 
 SCOPES = ['https://www.googleapis.com/auth/drive']
 
@@ -32,7 +36,8 @@ def get_client_secrets_path():
     """Get the client secrets file path"""
     return os.path.join(get_creds_path(), 'auto_files_cred.json')
 
-def authenticate_drive():
+def get_credentials():
+    """Load, refresh or create the OAuth credentials, saving them to the token file"""
     creds = None
     token_path = get_token_path()
     
@@ -53,6 +58,7 @@ def authenticate_drive():
     # Check if we need to authenticate
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
+            from google.auth.transport.requests import Request
             try:
                 creds.refresh(Request())
                 print("Token refreshed successfully")
@@ -66,96 +72,464 @@ def authenticate_drive():
             if not os.path.exists(client_secrets_path):
                 raise FileNotFoundError(f"Client secrets file not found: {client_secrets_path}")
             
+            from google_auth_oauthlib.flow import InstalledAppFlow
             flow = InstalledAppFlow.from_client_secrets_file(client_secrets_path, SCOPES)
             creds = flow.run_local_server(port=0)
             print("New authentication completed")
         
         # Save the credentials
-        try:
-            os.makedirs(os.path.dirname(token_path), exist_ok=True)
-            with open(token_path, 'wb') as token:
-                pickle.dump(creds, token)
-            print(f"Token saved to: {token_path}")
-        except Exception as e:
-            print(f"Error saving token: {e}")
+        save_credentials(creds)
     
-    service = build('drive', 'v3', credentials=creds)
-    return service
+    return creds
 
-def get_folder(service, folder_name, silent=False):
-    query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
-    # results = service.files().list(q=query, fields="files(id, name)").execute()
-    results = service.files().list(
+def save_credentials(creds, silent=False):
+    """Write credentials to the token file so the next start can skip the login flow"""
+    token_path = get_token_path()
+    try:
+        os.makedirs(os.path.dirname(token_path), exist_ok=True)
+        with open(token_path, 'wb') as token:
+            pickle.dump(creds, token)
+        if not silent:
+            print(f"Token saved to: {token_path}")
+    except Exception as e:
+        print(f"Error saving token: {e}")
+
+def build_service(creds):
+    """Drive service with its own HTTP transport (httplib2 is not thread-safe, so one per thread)"""
+    return build_drive(creds)
+
+def authenticate_drive():
+    return build_service(get_credentials())
+
+def is_missing_error(error):
+    """True when the API reports the file as gone (deleted, or no longer visible to us)"""
+    return http_status(error) == 404
+
+def forget_folder(folder_id):
+    """Drop a folder that turned out to be deleted or trashed from the folder cache"""
+    get_folder_cache().invalidate_id(folder_id)
+
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+
+# Optional DriveMirror that answers lookups locally, registered by whoever keeps it refreshed
+_drive_mirror = None
+
+def set_drive_mirror(mirror):
+    global _drive_mirror
+    _drive_mirror = mirror
+
+def get_drive_mirror():
+    """The registered mirror, or None when lookups must go to the API"""
+    return _drive_mirror
+
+def _quote(value):
+    """Escape a value for use inside a single-quoted Drive query string"""
+    return str(value).replace('\\', '\\\\').replace("'", "\\'")
+
+def _folder_lookup(service, folder_name, parent_id=None):
+    """Unexecuted files().list request for a folder by name"""
+    query = f"name='{_quote(folder_name)}' and mimeType='{FOLDER_MIME}' and trashed=false"
+    if parent_id:
+        query += f" and '{parent_id}' in parents"
+    return service.files().list(
         q=query,
+        spaces='drive',
         supportsAllDrives=True,
         includeItemsFromAllDrives=True,
-        fields="nextPageToken, files(id, name, mimeType, parents)"
-    ).execute()
-    items = results.get('files', [])
+        fields="files(id, name)",
+        pageSize=2
+    )
 
-    if not items:
-        if not silent:
-            print(f'No folder found with name: {folder_name}')
-        return None
+# Default per-item projection for folder listings, callers ask for more only when they use it
+LIST_FIELDS = "id, name, mimeType"
+
+def iter_folder_pages(service, folder_id, fields=LIST_FIELDS, query=None, page_size=1000,
+                      first_page_size=None, order_by=None):
+    """
+    Yield the items of a folder one page at a time, following nextPageToken lazily.
+    A small first_page_size gets something on screen quickly before the big pages.
+    folder_id may also be a list, to list the children of several folders in one query.
+    """
+    if isinstance(folder_id, (list, tuple)):
+        q = "(" + " or ".join(f"'{f}' in parents" for f in folder_id) + ") and trashed=false"
     else:
-        if not silent:
-            print(f'Found folder: {items[0]["name"]} with ID: {items[0]["id"]}')
-        return items[0]["id"] 
+        q = f"'{folder_id}' in parents and trashed=false"
+    if query:
+        q += f" and {query}"
+    kwargs = {'orderBy': order_by} if order_by else {}
 
-def get_subfolder_id(service, folder_name, parent_id, silent=False):
-    query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false and '{parent_id}' in parents"
+    page_token = None
+    size = first_page_size or page_size
+    while True:
+        try:
+            results = service.files().list(
+                q=q,
+                pageSize=size,
+                pageToken=page_token,
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True,
+                fields=f"nextPageToken, files({fields})",
+                **kwargs
+            ).execute()
+        except Exception as e:
+            if is_missing_error(e) and isinstance(folder_id, str):
+                forget_folder(folder_id)
+            raise
+        yield results.get('files', [])
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            return
+        size = page_size
+
+def iter_folder(service, folder_id, fields=LIST_FIELDS, query=None, page_size=1000, order_by=None):
+    """Yield every item in a folder, fetching pages only as the caller consumes them"""
+    for page in iter_folder_pages(service, folder_id, fields, query, page_size, order_by=order_by):
+        yield from page
+
+def _mirror_folder(folder_name, parent_id=None):
+    """Folder ID from the mirror, None when it doesn't know"""
+    # The mirror is trusted when it has the folder, a miss may just mean it is behind
+    mirror = _drive_mirror
+    if mirror is None or not mirror.ready:
+        return None
+    if parent_id is None and folder_name == mirror.root_name:
+        return mirror.root_id
+    if mirror.covers(parent_id):
+        matches = mirror.find_child(parent_id, folder_name, folders_only=True)
+        if matches:
+            return matches[0]['id']
+    return None
+
+def resolve_folder(service, folder_name, parent_id=None, silent=False):
+    """
+    Folder ID for a name under parent_id (or anywhere when parent_id is None).
+    Fresh cache entries cost no API call. Expired ones are looked up again, but are
+    still used if the lookup fails for any reason other than the parent being gone.
+    """
+    mirrored = _mirror_folder(folder_name, parent_id)
+    if mirrored:
+        return mirrored
+
+    cache = get_folder_cache()
+    cached = cache.lookup(parent_id, folder_name)
+    if cached and cached[1]:
+        return cached[0]
+
+    try:
+        results = _folder_lookup(service, folder_name, parent_id).execute()
+    except Exception as e:
+        if is_missing_error(e) and parent_id:
+            forget_folder(parent_id)
+            raise
+        if cached:
+            if not silent:
+                print(f'Lookup failed for {folder_name}, using cached ID {cached[0]}: {e}')
+            return cached[0]
+        raise
+
+    folders = results.get('files', [])
+    if not folders:
+        # Renamed, moved or trashed since it was cached
+        if cached:
+            cache.invalidate(parent_id, folder_name)
+        return None
+    if len(folders) > 1 and not silent:
+        print(f'Multiple folders found with name: {folder_name} in parent ID: {parent_id}')
+    cache.put(parent_id, folder_name, folders[0]['id'])
+    return folders[0]['id']
+
+def resolve_folders(service, folder_names, parent_id=None):
+    """
+    Folder IDs for several sibling names at once. Cached names cost nothing and the
+    rest are looked up in one batch round trip. Returns {name: folder_id or None}.
+    """
+    cache = get_folder_cache()
+    found = {}
+    lookups = {}
+    with DriveBatch(service) as batch:
+        for name in folder_names:
+            cached = cache.lookup(parent_id, name)
+            if cached and cached[1]:
+                found[name] = cached[0]
+            else:
+                lookups[name] = (batch.add(_folder_lookup(service, name, parent_id)), cached)
+
+    for name, (future, cached) in lookups.items():
+        try:
+            folders = future.result().get('files', [])
+        except Exception as e:
+            # Same stale-on-error rule as resolve_folder
+            found[name] = cached[0] if cached and not is_missing_error(e) else None
+            continue
+        if folders:
+            cache.put(parent_id, name, folders[0]['id'], save=False)
+            found[name] = folders[0]['id']
+        else:
+            if cached:
+                cache.invalidate(parent_id, name, save=False)
+            found[name] = None
+    if lookups:
+        cache.save()
+    return found
+
+def create_folders(service, folder_names, parent_id):
+    """Create several folders under one parent in a single batch, returns {name: folder_id or None}"""
+    cache = get_folder_cache()
+    with DriveBatch(service) as batch:
+        futures = {
+            name: batch.add(service.files().create(
+                body={'name': name, 'mimeType': FOLDER_MIME, 'parents': [parent_id]},
+                fields='id',
+                supportsAllDrives=True
+            ))
+            for name in folder_names
+        }
+
+    created = {}
+    for name, future in futures.items():
+        try:
+            created[name] = future.result()['id']
+            cache.put(parent_id, name, created[name], save=False)
+        except Exception as e:
+            print(f'Error creating folder {name}: {e}')
+            created[name] = None
+    cache.save()
+    return created
+
+# One provisioning pass at a time, so two threads never create the same folder twice
+_ensure_lock = threading.Lock()
+
+def ensure_paths(service, paths, root_id, silent=False):
+    """
+    Folder IDs for several paths (lists of names) under root_id, creating whatever is
+    missing. Works level by level: each level costs at most one batch of lookups and
+    one batch of creates, and no lookup at all for cached folders or children of a
+    folder created in this pass. Returns {tuple(path): folder_id or None}.
+    """
+    paths = [tuple(path) for path in paths]
+    cache = get_folder_cache()
+    ids = {(): root_id}
+    # Prefixes created in this pass, nothing can be under them yet
+    created = set()
+
+    with _ensure_lock:
+        for level in range(1, max((len(path) for path in paths), default=0) + 1):
+            prefixes = sorted({path[:level] for path in paths if len(path) >= level})
+            missing = []
+            lookups = {}
+            with DriveBatch(service) as batch:
+                for prefix in prefixes:
+                    parent_id = ids.get(prefix[:-1])
+                    if parent_id is None:
+                        continue
+                    if prefix[:-1] in created:
+                        missing.append(prefix)
+                        continue
+                    found = _mirror_folder(prefix[-1], parent_id)
+                    cached = cache.lookup(parent_id, prefix[-1])
+                    if found or (cached and cached[1]):
+                        ids[prefix] = found or cached[0]
+                        continue
+                    lookups[prefix] = batch.add(_folder_lookup(service, prefix[-1], parent_id))
+
+            for prefix, future in lookups.items():
+                parent_id = ids[prefix[:-1]]
+                try:
+                    folders = future.result().get('files', [])
+                except Exception as e:
+                    if not is_missing_error(e):
+                        raise
+                    # The parent went away since it was cached, its whole subtree is skipped
+                    forget_folder(parent_id)
+                    continue
+                if folders:
+                    ids[prefix] = folders[0]['id']
+                    cache.put(parent_id, prefix[-1], folders[0]['id'], save=False)
+                else:
+                    cache.invalidate(parent_id, prefix[-1], save=False)
+                    missing.append(prefix)
+
+            if not missing:
+                continue
+            with DriveBatch(service) as batch:
+                futures = {
+                    prefix: batch.add(service.files().create(
+                        body={'name': prefix[-1], 'mimeType': FOLDER_MIME, 'parents': [ids[prefix[:-1]]]},
+                        fields='id',
+                        supportsAllDrives=True
+                    ))
+                    for prefix in missing
+                }
+            for prefix, future in futures.items():
+                try:
+                    ids[prefix] = future.result()['id']
+                except Exception as e:
+                    print(f"Error creating folder {'/'.join(prefix)}: {e}")
+                    continue
+                created.add(prefix)
+                cache.put(ids[prefix[:-1]], prefix[-1], ids[prefix], save=False)
+                if not silent:
+                    print(f"Created folder: {'/'.join(prefix)} with ID: {ids[prefix]}")
+        cache.save()
+    return {path: ids.get(path) for path in paths}
+
+def ensure_path(service, path_parts, root_id, silent=False):
+    """Like get_nested_folder_id, but creates missing folders instead of returning None"""
+    return ensure_paths(service, [path_parts], root_id, silent)[tuple(path_parts)]
+
+def month_folder_path(month, year):
+    """Drive path of a month under the P&L root, e.g. ['2025 PnL', 'January']"""
+    return [f"{year} PnL", calendar.month_name[int(month)]]
+
+def ensure_month_folders(service, root_id, months, silent=False):
+    """
+    Month folders for (month, year) pairs, created where missing in one pass.
+    Once the year folder is cached, a full year's tree is one lookup and at most one
+    create round trip, nothing when it already exists. Returns {(month, year): folder_id or None}.
+    """
+    months = [(int(month), int(year)) for month, year in months]
+    ids = ensure_paths(service, [month_folder_path(month, year) for month, year in months], root_id, silent)
+    return {(month, year): ids[tuple(month_folder_path(month, year))] for month, year in months}
+
+def group_by_month(folder_path):
+    """Paths of the downloads in a folder, keyed by (month, year)"""
+    return {(month, year): paths for (year, month), paths in get_download_index(folder_path).months().items()}
+
+def find_files(service, folder_id, file_names,
+               fields="files(id, name, size, md5Checksum, modifiedTime, appProperties)"):
+    """Existence check for many file names in one folder, one batch round trip per 100 names"""
+    if _drive_mirror is not None and _drive_mirror.covers(folder_id):
+        return {name: _drive_mirror.find_child(folder_id, name) for name in file_names}
+
+    with DriveBatch(service) as batch:
+        futures = {
+            name: batch.add(service.files().list(
+                q=f"name='{_quote(name)}' and '{folder_id}' in parents and trashed=false",
+                spaces='drive',
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True,
+                fields=fields
+            ))
+            for name in file_names
+        }
 
+    found = {}
+    for name, future in futures.items():
+        try:
+            found[name] = future.result().get('files', [])
+        except Exception as e:
+            if is_missing_error(e):
+                forget_folder(folder_id)
+            raise
+    return found
+
+def find_by_app_properties(service, folder_id, properties, fields="files(id, name, md5Checksum, appProperties)"):
+    """Files in a folder tagged with every given appProperties pair"""
+    # The mirror is trusted when it has a match, a miss may just mean it is behind
+    if _drive_mirror is not None and _drive_mirror.covers(folder_id):
+        matches = [item for item in _drive_mirror.list_children(folder_id)
+                   if all(item.get('appProperties', {}).get(k) == v for k, v in properties.items())]
+        if matches:
+            return matches
+
+    clauses = [f"appProperties has {{ key='{_quote(k)}' and value='{_quote(v)}' }}" for k, v in properties.items()]
     results = service.files().list(
-        q=query,
+        q=" and ".join(clauses + [f"'{folder_id}' in parents", "trashed=false"]),
         spaces='drive',
         supportsAllDrives=True,
         includeItemsFromAllDrives=True,
-        fields="nextPageToken, files(id, name, mimeType)"
+        fields=fields,
+        pageSize=10
     ).execute()
+    return results.get('files', [])
 
-    folders = results.get('files', [])
-    if not folders:
+def get_files_metadata(service, file_ids, fields="id, name, parents, trashed, md5Checksum, appProperties"):
+    """files().get for many IDs in one batch, returns {file_id: metadata or None when gone}"""
+    with DriveBatch(service) as batch:
+        futures = {
+            file_id: batch.add(service.files().get(fileId=file_id, fields=fields, supportsAllDrives=True))
+            for file_id in file_ids
+        }
+
+    metadata = {}
+    for file_id, future in futures.items():
+        try:
+            metadata[file_id] = future.result()
+        except Exception as e:
+            if not is_missing_error(e):
+                raise
+            metadata[file_id] = None
+    return metadata
+
+def update_files(service, updates):
+    """
+    Batched metadata updates. updates maps file_id to a dict with any of 'body'
+    (e.g. {'appProperties': {...}}), 'add_parents' and 'remove_parents' (to move).
+    Returns {file_id: updated metadata or the exception it failed with}.
+    """
+    with DriveBatch(service) as batch:
+        futures = {}
+        for file_id, update in updates.items():
+            kwargs = {}
+            if update.get('add_parents'):
+                kwargs['addParents'] = update['add_parents']
+            if update.get('remove_parents'):
+                kwargs['removeParents'] = update['remove_parents']
+            futures[file_id] = batch.add(service.files().update(
+                fileId=file_id,
+                body=update.get('body', {}),
+                fields='id, name, parents, appProperties',
+                supportsAllDrives=True,
+                **kwargs
+            ))
+
+    results = {}
+    for file_id, future in futures.items():
+        try:
+            results[file_id] = future.result()
+        except Exception as e:
+            results[file_id] = e
+    return results
+
+def get_folder(service, folder_name, silent=False):
+    folder_id = resolve_folder(service, folder_name, silent=silent)
+
+    if not folder_id:
         if not silent:
-            print(f'No subfolder found with name: {folder_name} in parent ID: {parent_id}')
+            print(f'No folder found with name: {folder_name}')
         return None
-    elif len(folders) > 1:
+    else:
         if not silent:
-            print(f'Multiple subfolders found with name: {folder_name} in parent ID: {parent_id}')
-    
-    folder = folders[0]
+            print(f'Found folder: {folder_name} with ID: {folder_id}')
+        return folder_id
+
+def get_subfolder_id(service, folder_name, parent_id, silent=False):
+    folder_id = resolve_folder(service, folder_name, parent_id, silent=silent)
+    if not folder_id:
+        if not silent:
+            print(f'No subfolder found with name: {folder_name} in parent ID: {parent_id}')
+        return None
+
     if not silent:
-        print(f'Found subfolder: {folder["name"]} with ID: {folder["id"]} in parent ID: {parent_id}')
-    return folder['id']
+        print(f'Found subfolder: {folder_name} with ID: {folder_id} in parent ID: {parent_id}')
+    return folder_id
 
 def get_nested_folder_id(service, path_parts, root_folder_id, silent=False):
     current_folder_id = root_folder_id
 
     for name in path_parts:
-        query = (
-            f"name = '{name}' and '{current_folder_id}' in parents "
-            "and mimeType = 'application/vnd.google-apps.folder' and trashed = false"
-        )
-
-        results = service.files().list(
-            q=query,
-            spaces='drive',
-            supportsAllDrives=True,
-            includeItemsFromAllDrives=True,
-            fields="nextPageToken, files(id, name, mimeType)",
-            pageSize=1
-        ).execute()
-
-        folders = results.get('files', [])
-        if not folders:
+        parent_id = current_folder_id
+        current_folder_id = resolve_folder(service, name, parent_id, silent=silent)
+        if not current_folder_id:
             if not silent:
-                print(f'No folder found with name: {name} in parent ID: {current_folder_id}')
+                print(f'No folder found with name: {name} in parent ID: {parent_id}')
             return None
-        current_folder_id = folders[0]['id']
         if not silent:
-            print(f'Found folder: {folders[0]["name"]} with ID: {current_folder_id} in parent ID: {current_folder_id}')
+            print(f'Found folder: {name} with ID: {current_folder_id} in parent ID: {parent_id}')
     return current_folder_id
 
-def get_folder_path_and_contents(service, root_folder_name, path_parts, silent=False):
+def get_folder_path_and_contents(service, root_folder_name, path_parts, silent=False,
+                                 fields="id, name, mimeType, parents, modifiedTime", _retried=False):
     """
     Get the full path from root to target folder and show target folder contents.
     Returns a tuple of (path_array, target_folder_id, contents)
@@ -176,38 +550,26 @@ def get_folder_path_and_contents(service, root_folder_name, path_parts, silent=F
         for part in path_parts:
             path_array.append(part)
             
-            query = (
-                f"name = '{part}' and '{current_folder_id}' in parents "
-                "and mimeType = 'application/vnd.google-apps.folder' and trashed = false"
-            )
-            
-            results = service.files().list(
-                q=query,
-                spaces='drive',
-                supportsAllDrives=True,
-                includeItemsFromAllDrives=True,
-                fields="nextPageToken, files(id, name, mimeType)",
-                pageSize=1
-            ).execute()
-            
-            folders = results.get('files', [])
-            if not folders:
+            folder_id = resolve_folder(service, part, current_folder_id, silent=True)
+            if not folder_id:
                 if not silent:
                     print(f'Folder not found: {part} in path {"/".join(path_array)}')
                 return path_array, None, None
             
-            current_folder_id = folders[0]['id']
-        
-        # Get contents of target folder
-        contents_result = service.files().list(
-            q=f"'{current_folder_id}' in parents and trashed=false",
-            pageSize=1000,
-            supportsAllDrives=True,
-            includeItemsFromAllDrives=True,
-            fields="nextPageToken, files(id, name, mimeType, parents, modifiedTime)",
-        ).execute()
+            current_folder_id = folder_id
         
-        contents = contents_result.get('files', [])
+        # Get contents of target folder, every page of it
+        try:
+            if _drive_mirror is not None and _drive_mirror.covers(current_folder_id):
+                contents = _drive_mirror.list_children(current_folder_id)
+            else:
+                contents = list(iter_folder(service, current_folder_id, fields=fields))
+        except Exception as e:
+            # A cached folder was deleted since: forget it and resolve the path again once
+            if is_missing_error(e) and not _retried:
+                forget_folder(current_folder_id)
+                return get_folder_path_and_contents(service, root_folder_name, path_parts, silent, fields, _retried=True)
+            raise
         
         # Display the full path and contents (only if not silent)
         if not silent:
@@ -245,114 +607,83 @@ def get_folder_path_and_contents(service, root_folder_name, path_parts, silent=F
             print(f'Error getting folder path and contents: {str(e)}')
         return None, None, None
 
-def upload_file(service, file_path, folder_id):
+def upload_file(service, file_path, folder_id, silent=False, resumable=None, chunk_size=None, app_properties=None):
+    """
+    Upload a file into a folder, returns the new file ID. Large files (or resumable=True)
+    go up in chunks and pick up where they left off if interrupted. app_properties are
+    private key/value tags stored on the new file.
+    """
+    if resumable is None:
+        resumable = os.path.getsize(file_path) >= RESUMABLE_THRESHOLD
+    if resumable:
+        try:
+            file_id = resumable_upload(service, file_path, folder_id, chunk_size,
+                                       progress=None if silent else print, app_properties=app_properties)
+        except Exception as e:
+            if is_missing_error(e):
+                forget_folder(folder_id)
+            raise
+        if not silent:
+            print(f'File ID: {file_id} uploaded to folder ID: {folder_id}')
+        return file_id
+
     file_metadata = {
         'name': os.path.basename(file_path),
         'parents': [folder_id]
     }
+    if app_properties:
+        file_metadata['appProperties'] = app_properties
+    from googleapiclient.http import MediaFileUpload
     media = MediaFileUpload(file_path)
-    file = service.files().create(
-        body=file_metadata,
+    try:
+        file = service.files().create(
+            body=file_metadata,
+            media_body=media,
+            fields='id',
+            supportsAllDrives=True
+            ).execute()
+    except Exception as e:
+        if is_missing_error(e):
+            forget_folder(folder_id)
+        raise
+    if not silent:
+        print(f'File ID: {file.get("id")} uploaded to folder ID: {folder_id}')
+    return file.get("id")
+
+def update_file(service, file_id, file_path, silent=False):
+    """Replace the content of an existing Drive file, keeping its ID, name and parents"""
+    from googleapiclient.http import MediaFileUpload
+    resumable = os.path.getsize(file_path) >= RESUMABLE_THRESHOLD
+    media = MediaFileUpload(file_path, resumable=resumable)
+    file = service.files().update(
+        fileId=file_id,
         media_body=media,
         fields='id',
         supportsAllDrives=True
         ).execute()
-    print(f'File ID: {file.get("id")} uploaded to folder ID: {folder_id}')
-    return
+    if not silent:
+        print(f'File ID: {file.get("id")} updated from {os.path.basename(file_path)}')
+    return file.get("id")
 
 def list_drive_files(service, folder_id):
-    results = service.files().list(
-        q=f"'{folder_id}' in parents and trashed=false",
-        pageSize=1000,
-        supportsAllDrives=True,
-        includeItemsFromAllDrives=True,
-        fields="nextPageToken, files(id, name, mimeType, parents)",
-    ).execute()
-
-    items = results.get('files', [])
-    for item in items:
+    for item in iter_folder(service, folder_id):
         # parent = item.get('parents', ['root'])[0]
         print(f"File ID: {item['id']}, Name: {item['name']}, Type: {item['mimeType']}")
     return
 
 def file_match(folder_path, month, year, debug=False):
-    matched_files = []
-    
-    # Debug: Check if folder exists and what's in it
-    if debug:
-        print(f"DEBUG: Looking in folder: {folder_path}")
-        print(f"DEBUG: Folder exists: {os.path.exists(folder_path)}")
-        if os.path.exists(folder_path):
-            all_files = os.listdir(folder_path)
-            print(f"DEBUG: Found {len(all_files)} total files: {all_files}")
-        print(f"DEBUG: Looking for pattern: *__{year}_{month}.csv")
-    
-    if not os.path.exists(folder_path):
-        if debug:
-            print(f"DEBUG: Folder {folder_path} does not exist!")
-        return matched_files
-    
-    for file in os.listdir(folder_path):
-        try:
-            if debug:
-                print(f"DEBUG: Checking file: {file}")
-            
-            # Skip files that don't match the expected pattern
-            if "__" not in file:
-                if debug:
-                    print(f"DEBUG: Skipping {file} - no '__' found")
-                continue
-                
-            if not file.endswith('.csv'):
-                if debug:
-                    print(f"DEBUG: Skipping {file} - not a .csv file")
-                continue
-            
-            # Split filename and check pattern: ACCOUNT__YEAR_MONTH.csv
-            parts = file.split("__")
-            if len(parts) >= 2:
-                date_part = parts[1][:-4]  # Remove .csv extension
-                if debug:
-                    print(f"DEBUG: File {file} has date part: '{date_part}', looking for: '{year}_{month}'")
-                
-                if date_part == f"{year}_{month}":
-                    matched_files.append(file)
-                    if debug:
-                        print(f"DEBUG: MATCH! Added {file}")
-                else:
-                    if debug:
-                        print(f"DEBUG: No match for {file}")
-            else:
-                if debug:
-                    print(f"DEBUG: Skipping {file} - not enough parts after splitting by '__'")
-        except (IndexError, ValueError) as e:
-            if debug:
-                print(f"DEBUG: Error processing {file}: {e}")
-            continue
-    
+    """Names of the account downloads for a month in folder_path (NAME__MM_YYYY.csv, legacy NAME__YYYY_MM.csv too)"""
+    index = get_download_index(folder_path)
+    matched_files = [os.path.basename(path) for path in index.files_for(year, month)]
     if debug:
+        print(f"DEBUG: Looking in folder: {index.folder}")
+        print(f"DEBUG: Looking for: *__{int(month):02d}_{year}.csv or *__{year}_{month}.csv")
+        print(f"DEBUG: Not download files: {index.unrecognized()}")
         print(f"DEBUG: Final matched files: {matched_files}")
-    
     return matched_files
 
 def file_match_upload(folder_path, destination_id, month, year):
-    matched_files = []
-    for file in os.listdir(folder_path):
-        try:
-            # Skip files that don't match the expected pattern
-            if "__" not in file or not file.endswith('.csv'):
-                continue
-            
-            # Split filename and check pattern: ACCOUNT__YEAR_MONTH.csv
-            parts = file.split("__")
-            if len(parts) >= 2:
-                date_part = parts[1][:-4]  # Remove .csv extension
-                if date_part == f"{year}_{month}":
-                    matched_files.append(file)
-        except (IndexError, ValueError):
-            # Skip files that don't match the expected pattern
-            continue
-    return matched_files
+    return file_match(folder_path, month, year)
 
 if __name__ == '__main__':
     service = authenticate_drive()
@@ -393,5 +724,24 @@ if __name__ == '__main__':
                 target_path = input("Enter target path (e.g., '2025 PnL/January'): ")
                 path_parts = [part.strip() for part in target_path.split('/') if part.strip()]
                 path_array, folder_id, contents = get_folder_path_and_contents(service, root_name, path_parts)
+            case "resumable_upload":
+                file_path = input("Enter file path: ")
+                test_drive_root = get_folder(service, "P&L Reports")
+                destination = get_nested_folder_id(service, ["2025 PnL", "test"], test_drive_root)
+                upload_file(service, file_path, destination, resumable=True)
+            case "ensure":
+                year = int(input("Enter year: "))
+                root = get_folder(service, "P&L Reports")
+                for (month, year), folder_id in ensure_month_folders(service, root, [(m, year) for m in range(1, 13)]).items():
+                    print(f"{calendar.month_name[month]} {year}: {folder_id}")
+            case "clear_cache":
+                get_folder_cache().clear()
+                print("Folder cache cleared")
+            case "startup":
+                for line in startup_report():
+                    print(line)
+            case "quota":
+                for line in get_scheduler().report():
+                    print(line)
             case "exit":
                 status = False
\ No newline at end of file
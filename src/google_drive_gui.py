@@ -4,53 +4,47 @@ from typing import Optional, List, Dict, Callable
 from google_conn import (
     authenticate_drive, get_folder, get_subfolder_id, 
     get_nested_folder_id, upload_file, list_drive_files, 
-    file_match, get_token_path, get_folder_path_and_contents
+    file_match, get_token_path, get_folder_path_and_contents,
+    is_missing_error, forget_folder, find_files, iter_folder_pages, FOLDER_MIME,
+    set_drive_mirror, ensure_month_folders, group_by_month, month_folder_path
 )
+from download_index import get_download_index
+from drive_mirror import DriveMirror
+from drive_session import DriveSession
+from drive_sync import apply_sync, get_hash_cache, plan_sync
+from drive_throttle import get_scheduler
+from drive_upload import ParallelUploader, get_upload_workers
+from upload_outbox import UploadOutbox, drain_outbox
+from upload_pipeline import UploadPipeline
 
 class GoogleDriveGUIWrapper:
     """Simplified wrapper for Google Drive operations with GUI integration"""
     
-    def __init__(self, console_print: Callable[[str], None] = print):
+    def __init__(self, console_print: Callable[[str], None] = print, upload_workers: Optional[int] = None):
         self.console_print = console_print
-        self._service = None
-        self._authenticated_user = None
+        # Credentials and per-thread services shared by every operation and upload worker
+        self.session = DriveSession(logger=console_print)
+        self._uploader = None
+        self.upload_workers = upload_workers or get_upload_workers()
+        self.mirror: Optional[DriveMirror] = None
+        # Uploads are written here before they start and stay until Drive has them
+        self.outbox = UploadOutbox()
+        # Only one outbox drain at a time; connecting from inside a drain would start another
+        self._resuming = False
+        self._resume_lock = threading.Lock()
         
     def get_service(self):
-        """Get Google Drive service with caching to avoid re-authentication"""
-        # Return cached service if available
-        if self._service is not None:
-            try:
-                # Test that the cached service still works
-                about = self._service.about().get(fields='user').execute()
-                return self._service
-            except Exception as e:
-                self.console_print(f"Cached service expired: {str(e)}")
-                self._service = None
-                self._authenticated_user = None
-        
-        # Need to authenticate
+        """
+        Drive service for the calling thread. There is no test call: the session keeps
+        the token fresh and auth problems surface (and are retried) on the real call.
+        """
         try:
-            self.console_print("🔑 Connecting to Google Drive...")
-            service = authenticate_drive()
-            
-            if service is not None:
-                # Test the connection with a simple API call
-                try:
-                    about = service.about().get(fields='user').execute()
-                    user_email = about.get('user', {}).get('emailAddress', 'Unknown')
-                    self.console_print(f"✓ Connected to Google Drive as: {user_email}")
-                    
-                    # Cache the service and user info
-                    self._service = service
-                    self._authenticated_user = user_email
-                    return service
-                except Exception as test_error:
-                    self.console_print(f"✗ Connection test failed: {str(test_error)}")
-                    return None
-            else:
-                self.console_print("✗ authenticate_drive() returned None")
-                return None
-                
+            if not self.session.connected:
+                self.console_print("🔑 Connecting to Google Drive...")
+                self.session.credentials()
+                self.console_print("✓ Connected to Google Drive")
+                self.resume_outbox()
+            return self.session.service()
         except Exception as e:
             self.console_print(f"✗ Failed to connect to Google Drive: {str(e)}")
             return None
@@ -58,9 +52,14 @@ class GoogleDriveGUIWrapper:
     def reset_connection(self):
         """Reset the connection by removing token file and clearing cache"""
         try:
-            # Clear cached service
-            self._service = None
-            self._authenticated_user = None
+            # Clear cached credentials and services
+            self.session.close()
+            if self._uploader is not None:
+                self._uploader.shutdown(wait=False)
+                self._uploader = None
+            # The next account may not see the same tree
+            self.mirror = None
+            set_drive_mirror(None)
             
             # Remove token file
             token_path = get_token_path()
@@ -74,6 +73,76 @@ class GoogleDriveGUIWrapper:
         except Exception as e:
             self.console_print(f"✗ Error resetting connection: {str(e)}")
     
+    def sync_mirror(self, service, root_folder_name: Optional[str] = None, force: bool = False) -> bool:
+        """
+        Bring the local mirror of the root folder up to date (seeding it the first time)
+        and register it so google_conn answers lookups from it. Falls back to the API on errors.
+        """
+        if root_folder_name and (self.mirror is None or self.mirror.root_name != root_folder_name):
+            self.mirror = DriveMirror(root_folder_name)
+        if self.mirror is None:
+            return False
+        try:
+            if not self.mirror.ready:
+                self.console_print(f"🪞 Building local mirror of '{self.mirror.root_name}'...")
+                count = self.session.call(self.mirror.seed)
+                self.console_print(f"🪞 Mirrored {count} items in {self.mirror.stats['seed_calls']} API calls")
+            else:
+                changes = self.session.call(self.mirror.refresh, force=force)
+                if changes:
+                    self.console_print(f"🪞 Mirror updated with {changes} change{'s' if changes != 1 else ''}")
+            set_drive_mirror(self.mirror)
+            return True
+        except Exception as e:
+            self.console_print(f"Mirror unavailable, using Drive directly: {str(e)}")
+            set_drive_mirror(None)
+            return False
+    
+    def resume_outbox(self, callback: Optional[Callable[[Dict], None]] = None):
+        """Send uploads an earlier session left in the outbox, in the background"""
+        pending = self.outbox.counts()['pending']
+        if not pending:
+            return
+        if not self.session.connected and not os.path.exists(get_token_path()):
+            # Don't pop a login window on launch, they go out once Drive is connected
+            self.console_print(f"📮 {pending} upload{'s' if pending != 1 else ''} waiting in the outbox, "
+                               f"they will be sent once Google Drive is connected")
+            return
+        with self._resume_lock:
+            if self._resuming:
+                return
+            self._resuming = True
+        
+        def _resume():
+            try:
+                if not self.get_service():
+                    return
+                self.console_print(f"📮 Sending {pending} upload{'s' if pending != 1 else ''} left over from an earlier session...")
+                results = drain_outbox(self.outbox, self.get_uploader(), progress=self.console_print)
+                if not results:
+                    # Another upload call claimed them first
+                    return
+                sent = sum(1 for r in results.values() if r.ok)
+                if sent == len(results):
+                    self.console_print(f"📮 Outbox drained: {sent} file{'s' if sent != 1 else ''} in Drive")
+                else:
+                    self.console_print(f"⚠️ Outbox: {sent}/{len(results)} sent, the rest will be retried next time")
+                if callback:
+                    callback(results)
+            finally:
+                with self._resume_lock:
+                    self._resuming = False
+        
+        thread = threading.Thread(target=_resume, daemon=True)
+        thread.start()
+    
+    def get_uploader(self) -> ParallelUploader:
+        """Upload pool shared by every upload call, workers keep their services between calls"""
+        if self._uploader is None:
+            # Workers build their services through the session, so a re-login reaches them too
+            self._uploader = ParallelUploader(max_workers=self.upload_workers, session=self.session)
+        return self._uploader
+    
     def search_folder(self, folder_name: str, callback: Optional[Callable[[Optional[str]], None]] = None):
         """Search for a folder by name"""
         def _search():
@@ -86,7 +155,7 @@ class GoogleDriveGUIWrapper:
             
             try:
                 self.console_print(f"🔍 Searching for folder: '{folder_name}'...")
-                folder_id = get_folder(service, folder_name, silent=True)
+                folder_id = self.session.call(get_folder, folder_name, silent=True)
                 
                 if folder_id:
                     self.console_print(f"✓ Found folder: {folder_name}")
@@ -105,8 +174,9 @@ class GoogleDriveGUIWrapper:
         thread = threading.Thread(target=_search, daemon=True)
         thread.start()
     
-    def browse_folder(self, folder_id: str, callback: Optional[Callable[[List[Dict]], None]] = None):
-        """Browse contents of a folder"""
+    def browse_folder(self, folder_id: str, callback: Optional[Callable[[List[Dict]], None]] = None,
+                      on_page: Optional[Callable[[List[Dict]], None]] = None):
+        """Browse contents of a folder, printing each page as it arrives"""
         def _browse():
             service = self.get_service()
             if not service:
@@ -118,39 +188,35 @@ class GoogleDriveGUIWrapper:
             try:
                 self.console_print(f"📂 Browsing folder contents...")
                 
-                # Get folder contents
-                results = service.files().list(
-                    q=f"'{folder_id}' in parents and trashed=false",
-                    pageSize=1000,
-                    supportsAllDrives=True,
-                    includeItemsFromAllDrives=True,
-                    fields="nextPageToken, files(id, name, mimeType, parents, modifiedTime)",
-                ).execute()
-                
-                items = results.get('files', [])
+                # Drive sorts folders first, so pages can be shown as they stream in
+                items = []
+                if self.sync_mirror(service) and self.mirror.covers(folder_id):
+                    pages = [self.mirror.list_children(folder_id)]
+                else:
+                    pages = iter_folder_pages(service, folder_id, fields="id, name, mimeType, modifiedTime",
+                                              first_page_size=100, order_by="folder,name")
+                for page in pages:
+                    items.extend(page)
+                    for item in page:
+                        if item['mimeType'] == FOLDER_MIME:
+                            self.console_print(f"  📁 {item['name']}")
+                        else:
+                            file_type = self._get_file_type_icon(item['mimeType'])
+                            self.console_print(f"  {file_type} {item['name']}")
+                    if on_page:
+                        on_page(page)
                 
                 if not items:
                     self.console_print("📂 Folder is empty")
                 else:
-                    self.console_print(f"📂 Found {len(items)} items:")
-                    
-                    # Separate folders and files
-                    folders = [item for item in items if item['mimeType'] == 'application/vnd.google-apps.folder']
-                    files = [item for item in items if item['mimeType'] != 'application/vnd.google-apps.folder']
-                    
-                    # Display folders first
-                    for folder in folders:
-                        self.console_print(f"  📁 {folder['name']}")
-                    
-                    # Then display files
-                    for file in files:
-                        file_type = self._get_file_type_icon(file['mimeType'])
-                        self.console_print(f"  {file_type} {file['name']}")
+                    self.console_print(f"📂 Found {len(items)} items")
                 
                 if callback:
                     callback(items)
                     
             except Exception as e:
+                if is_missing_error(e):
+                    forget_folder(folder_id)
                 self.console_print(f"✗ Error browsing folder: {str(e)}")
                 if callback:
                     callback([])
@@ -172,9 +238,10 @@ class GoogleDriveGUIWrapper:
             try:
                 self.console_print(f"🧭 Navigating to path...")
                 self.console_print(f"  📁 Root: {root_folder_name}")
+                self.sync_mirror(service, root_folder_name)
                 
                 # Get root folder (silent mode)
-                root_id = get_folder(service, root_folder_name, silent=True)
+                root_id = self.session.call(get_folder, root_folder_name, silent=True)
                 if not root_id:
                     self.console_print(f"✗ Root folder not found: {root_folder_name}")
                     if callback:
@@ -190,7 +257,7 @@ class GoogleDriveGUIWrapper:
                     self.console_print(f"{indent}└── {part}")
                     current_path = f"{current_path}/{part}"
                 
-                final_id = get_nested_folder_id(service, path_parts, root_id, silent=True)
+                final_id = self.session.call(get_nested_folder_id, path_parts, root_id, silent=True)
                 
                 if final_id:
                     self.console_print(f"✓ Successfully navigated to: {current_path}")
@@ -225,25 +292,72 @@ class GoogleDriveGUIWrapper:
             
             self.console_print(f"📤 Uploading {total_files} file{'s' if total_files != 1 else ''}...")
             
-            for i, file_path in enumerate(file_paths, 1):
-                try:
-                    if not os.path.exists(file_path):
-                        self.console_print(f"✗ File not found: {file_path}")
-                        results.append(False)
-                        continue
-                    
-                    filename = os.path.basename(file_path)
-                    self.console_print(f"📤 ({i}/{total_files}) Uploading: {filename}")
-                    
-                    upload_file(service, file_path, destination_folder_id)
-                    
-                    self.console_print(f"✓ Upload complete: {filename}")
+            hashes = get_hash_cache()
+            local_md5 = {p: hashes.md5(p) for p in file_paths if os.path.exists(p)}
+            hashes.save()
+            
+            # One batched lookup for every name instead of a query per file (none with a mirror)
+            self.sync_mirror(service, force=True)
+            identical = set()
+            try:
+                names = [os.path.basename(p) for p in local_md5]
+                existing = self.session.call(find_files, destination_folder_id, names, fields="files(id, md5Checksum)")
+                for file_path, md5 in local_md5.items():
+                    if any(f.get('md5Checksum') == md5 for f in existing.get(os.path.basename(file_path), [])):
+                        identical.add(file_path)
+                changed = [name for name, files in existing.items() if files and
+                           not any(os.path.basename(p) == name for p in identical)]
+                if identical:
+                    self.console_print(f"↩️ {len(identical)} file(s) already in the destination with the same content, not uploaded again")
+                if changed:
+                    self.console_print(f"⚠️ {len(changed)} file(s) already in the destination with different content, another copy will be added:")
+                    for name in changed[:5]:
+                        self.console_print(f"  📄 {name}")
+            except Exception as e:
+                self.console_print(f"Could not check for existing files: {str(e)}")
+            
+            uploader = self.get_uploader()
+            uploader.reset_stats()
+            quota_before = get_scheduler().totals()
+            self.console_print(f"📤 Using {uploader.max_workers} upload workers")
+            
+            # Queued on disk first, so a closed window or dropped connection leaves a record of what is owed
+            entries = {}
+            for file_path in file_paths:
+                if not os.path.exists(file_path):
+                    self.console_print(f"✗ File not found: {file_path}")
+                    continue
+                if file_path in identical:
+                    continue
+                entries[file_path] = self.outbox.enqueue(file_path, destination_folder_id, local_md5[file_path])
+            outcome = drain_outbox(self.outbox, uploader, entries.values(), hashes, progress=self.console_print)
+            
+            # Results are reported in the original order
+            done = 0
+            for file_path in file_paths:
+                if file_path in identical:
                     results.append(True)
-                    
-                except Exception as e:
-                    self.console_print(f"✗ Upload failed for {os.path.basename(file_path)}: {str(e)}")
+                    continue
+                if file_path not in entries:
+                    results.append(False)
+                    continue
+                result = outcome.get(entries[file_path])
+                done += 1
+                filename = os.path.basename(file_path)
+                if result is None:
+                    self.console_print(f"⏳ ({done}/{len(entries)}) {filename} is queued but already being sent by another upload")
                     results.append(False)
+                    continue
+                if result.ok:
+                    self.console_print(f"✓ ({done}/{len(entries)}) Upload complete: {filename} ({result.seconds:.1f}s)")
+                else:
+                    self.console_print(f"✗ ({done}/{len(entries)}) Upload failed for {filename}: {result.error} (kept in the outbox)")
+                results.append(result.ok)
             
+            self.console_print(uploader.report())
+            quota = get_scheduler().summary(quota_before)
+            if quota:
+                self.console_print(quota)
             successful = sum(results)
             if successful == total_files:
                 self.console_print(f"✅ All {total_files} files uploaded successfully!")
@@ -260,8 +374,9 @@ class GoogleDriveGUIWrapper:
     
     def batch_upload_by_pattern(self, local_folder: str, month: str, year: int, 
                                destination_folder_id: str,
-                               callback: Optional[Callable[[List[str]], None]] = None):
-        """Upload files matching a pattern (month/year)"""
+                               callback: Optional[Callable[[List[str]], None]] = None,
+                               dry_run: bool = False):
+        """Sync files matching a pattern (month/year): new files are uploaded, changed ones updated, identical ones skipped"""
         def _batch_upload():
             service = self.get_service()
             if not service:
@@ -273,43 +388,22 @@ class GoogleDriveGUIWrapper:
             try:
                 self.console_print(f"🔍 Finding files for {month}/{year} in {local_folder}")
                 
-                # Show all files in folder first (human readable)
-                if os.path.exists(local_folder):
-                    all_files = os.listdir(local_folder)
-                    self.console_print(f"📁 Found {len(all_files)} files in {local_folder}:")
-                    if all_files:
-                        for file in all_files:
-                            self.console_print(f"  📄 {file}")
-                    else:
-                        self.console_print("  (folder is empty)")
-                else:
+                if not os.path.exists(local_folder):
                     self.console_print(f"❌ Folder '{local_folder}' does not exist!")
                     if callback:
                         callback([])
                     return
                 
-                # Find matching files (with debug output)
-                self.console_print(f"🔍 Looking for pattern: *__{year}_{month}.csv")
-                matched_files = file_match(local_folder, month, year, debug=False)
+                # The index only re-lists the folder when something in it changed
+                index = get_download_index(local_folder)
+                months = index.months()
+                self.console_print(f"📁 {sum(len(paths) for paths in months.values())} downloads "
+                                   f"across {len(months)} month{'s' if len(months) != 1 else ''} in {local_folder}")
+                for file in index.unrecognized():
+                    self.console_print(f"  ❌ {file} - not a NAME__MM_YYYY.csv or NAME__YYYY_M.csv download")
                 
-                # Show matching logic for each file
-                self.console_print(f"🔍 Checking each file against pattern:")
-                for file in all_files:
-                    if "__" not in file:
-                        self.console_print(f"  ❌ {file} - missing '__'")
-                    elif not file.endswith('.csv'):
-                        self.console_print(f"  ❌ {file} - not a .csv file")
-                    else:
-                        parts = file.split("__")
-                        if len(parts) >= 2:
-                            date_part = parts[1][:-4]  # Remove .csv extension
-                            expected = f"{year}_{month}"
-                            if date_part == expected:
-                                self.console_print(f"  ✅ {file} - MATCH! ({date_part})")
-                            else:
-                                self.console_print(f"  ❌ {file} - date mismatch (got '{date_part}', need '{expected}')")
-                        else:
-                            self.console_print(f"  ❌ {file} - not enough parts after '__' split")
+                self.console_print(f"🔍 Looking for pattern: *__{int(month):02d}_{year}.csv (or older *__{year}_{month}.csv)")
+                matched_files = file_match(local_folder, month, year, debug=False)
                 
                 if not matched_files:
                     self.console_print(f"ℹ️ No files found matching pattern for {month}/{year}")
@@ -326,9 +420,9 @@ class GoogleDriveGUIWrapper:
                         self.console_print(f"  📄 {file}")
                     self.console_print(f"  ... and {len(matched_files) - 3} more files")
                 
-                # Upload each file
+                # Compare against the target folder and only send what differs
                 file_paths = [os.path.join(local_folder, file) for file in matched_files]
-                self.upload_files(file_paths, destination_folder_id, callback)
+                self.sync_files(service, file_paths, destination_folder_id, callback, dry_run)
                 
             except Exception as e:
                 self.console_print(f"✗ Error in batch upload: {str(e)}")
@@ -338,6 +432,111 @@ class GoogleDriveGUIWrapper:
         thread = threading.Thread(target=_batch_upload, daemon=True)
         thread.start()
     
+    def upload_by_month(self, local_folder: str, root_folder_name: str, year: Optional[int] = None,
+                        callback: Optional[Callable[[List[bool]], None]] = None, dry_run: bool = False):
+        """Sync every NAME__MM_YYYY.csv in a folder (optionally one year's) into '<year> PnL/<Month>', creating missing folders"""
+        def _route():
+            service = self.get_service()
+            if not service:
+                self.console_print("✗ No Google Drive connection available")
+                if callback:
+                    callback([])
+                return
+            
+            try:
+                groups = group_by_month(local_folder)
+                if year is not None:
+                    groups = {key: paths for key, paths in groups.items() if key[1] == int(year)}
+                if not groups:
+                    self.console_print(f"ℹ️ No NAME__MM_YYYY.csv files found in {local_folder}")
+                    if callback:
+                        callback([])
+                    return
+                
+                root_id = self.session.call(get_folder, root_folder_name, silent=True)
+                if not root_id:
+                    self.console_print(f"✗ Root folder '{root_folder_name}' not found")
+                    if callback:
+                        callback([])
+                    return
+                
+                months = sorted(groups, key=lambda key: (key[1], key[0]))
+                if dry_run:
+                    # Nothing is created on a dry run, missing months are only reported
+                    folders = {key: self.session.call(get_nested_folder_id, month_folder_path(*key), root_id, silent=True)
+                               for key in months}
+                else:
+                    self.console_print(f"🗂️ Preparing {len(months)} month folder{'s' if len(months) != 1 else ''}...")
+                    folders = self.session.call(ensure_month_folders, root_id, months, silent=True)
+                
+                results = []
+                for key in months:
+                    path = '/'.join(month_folder_path(*key))
+                    paths = groups[key]
+                    if not folders[key]:
+                        if dry_run:
+                            self.console_print(f"🔎 {path}: folder would be created, {len(paths)} file{'s' if len(paths) != 1 else ''} to upload")
+                        else:
+                            self.console_print(f"✗ {path}: folder could not be created, {len(paths)} file{'s' if len(paths) != 1 else ''} skipped")
+                            results.extend([False] * len(paths))
+                        continue
+                    self.console_print(f"📅 {path}: {len(paths)} file{'s' if len(paths) != 1 else ''}")
+                    self.sync_files(service, paths, folders[key], results.extend, dry_run)
+                
+                if callback:
+                    callback(results)
+            except Exception as e:
+                self.console_print(f"✗ Error in upload by month: {str(e)}")
+                if callback:
+                    callback([])
+        
+        thread = threading.Thread(target=_route, daemon=True)
+        thread.start()
+    
+    def start_upload_pipeline(self, root_folder_name: str) -> UploadPipeline:
+        """Streaming uploader for a scrape: emit() each saved NAME__MM_YYYY.csv, close() when the run ends"""
+        return UploadPipeline(self, root_folder_name)
+    
+    def sync_files(self, service, file_paths: List[str], destination_folder_id: str,
+                   callback: Optional[Callable[[List[bool]], None]] = None, dry_run: bool = False):
+        """Plan and (unless dry_run) apply an incremental sync, runs on the calling thread"""
+        hashes = get_hash_cache()
+        # Forced so files uploaded seconds ago are never planned again
+        self.sync_mirror(service, force=True)
+        plan = self.session.call(plan_sync, file_paths, destination_folder_id, hashes)
+        for line in plan.report():
+            self.console_print(line)
+        self.console_print(f"#️⃣ Hashes: {hashes.stats['hits']} cached, {hashes.stats['hashed']} computed")
+        
+        if dry_run:
+            self.console_print("🔎 Dry run, nothing was uploaded")
+            if callback:
+                callback([])
+            return
+        
+        if not plan.of('upload') and not plan.of('update'):
+            self.console_print("✅ Drive folder already up to date")
+            if callback:
+                callback([])
+            return
+        
+        uploader = self.get_uploader()
+        uploader.reset_stats()
+        quota_before = get_scheduler().totals()
+        results = apply_sync(service, plan, uploader, progress=self.console_print)
+        self.console_print(uploader.report())
+        quota = get_scheduler().summary(quota_before)
+        if quota:
+            self.console_print(quota)
+        
+        successful = sum(results)
+        if successful == len(results):
+            self.console_print(f"✅ Sync complete: {successful} file{'s' if successful != 1 else ''} sent")
+        else:
+            self.console_print(f"⚠️ {successful}/{len(results)} files sent")
+        if callback:
+            callback(results)
+    
     def browse_target_folder(self, root_folder_name: str, path_parts: List[str], 
                             callback: Optional[Callable[[Optional[str], List[Dict]], None]] = None):
         """Browse target folder with full path display from root to target"""
@@ -351,10 +550,11 @@ class GoogleDriveGUIWrapper:
             
             try:
                 self.console_print(f"🔍 Browsing target folder with full path...")
+                self.sync_mirror(service, root_folder_name)
                 
                 # Get path and contents using the new function (silent mode)
-                path_array, target_folder_id, contents = get_folder_path_and_contents(
-                    service, root_folder_name, path_parts, silent=True
+                path_array, target_folder_id, contents = self.session.call(
+                    get_folder_path_and_contents, root_folder_name, path_parts, silent=True
                 )
                 
                 # Display user-friendly path info
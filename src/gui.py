@@ -3,6 +3,7 @@ import os
 import threading
 import json
 import asyncio
+import contextlib
 import sys
 from profile_manager import GoogleDriveProfileManager
 from custom_dialogs import ask_string, show_info, show_error, ask_yes_no
@@ -13,7 +14,9 @@ from tkinter import filedialog
 
 # Add scraper profiles to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'scraper_profiles'))
-from chaseBus_monthly import login, csv_d
+from chaseBus_monthly import login, csv_d, page_pool
+from browser_profile import ResourceBlocker, get_browser_profile
+from run_journal import RunJournal
 from playwright.async_api import async_playwright
 from dotenv import load_dotenv
 
@@ -59,6 +62,8 @@ class MainApp(ctk.CTk):
         
         # Initialize Google Drive wrapper
         self.drive_wrapper = GoogleDriveGUIWrapper(console_print=self.console.print)
+        # Finish uploads an earlier session didn't get to
+        self.drive_wrapper.resume_outbox()
         
         # Handle window close event
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -440,7 +445,15 @@ class UploadSection(ctk.CTkFrame):
         self.upload_selected_btn.grid(row=4, column=0, padx=10, pady=5, sticky="ew")
         
         self.batch_upload_btn = ctk.CTkButton(self, text="📤 Batch Upload", command=self.batch_upload_by_pattern)
-        self.batch_upload_btn.grid(row=5, column=0, padx=10, pady=(5, 10), sticky="ew")
+        self.batch_upload_btn.grid(row=5, column=0, padx=10, pady=5, sticky="ew")
+        
+        # Shows what a batch upload would send without touching Drive
+        self.dry_run_btn = ctk.CTkButton(self, text="🔎 Dry Run", command=lambda: self.batch_upload_by_pattern(dry_run=True))
+        self.dry_run_btn.grid(row=6, column=0, padx=10, pady=5, sticky="ew")
+        
+        # Files every month of the year into its own folder under the root, no target needed
+        self.month_upload_btn = ctk.CTkButton(self, text="🗂️ Upload Year by Month", command=self.upload_by_month)
+        self.month_upload_btn.grid(row=7, column=0, padx=10, pady=(5, 10), sticky="ew")
     
     def set_target_folder(self, folder_id: str):
         """Set the target folder ID for uploads"""
@@ -472,8 +485,8 @@ class UploadSection(ctk.CTkFrame):
         
         self.main_app.drive_wrapper.upload_files(self.selected_files, self.target_folder_id)
     
-    def batch_upload_by_pattern(self):
-        """Upload files matching month/year pattern"""
+    def batch_upload_by_pattern(self, dry_run=False):
+        """Sync files matching month/year pattern to the target folder"""
         month = self.month_var.get()
         year = int(self.year_var.get())
         
@@ -488,7 +501,23 @@ class UploadSection(ctk.CTkFrame):
             self.main_app.console.print_error("Please navigate to target folder first")
             return
         
-        self.main_app.drive_wrapper.batch_upload_by_pattern(local_folder, month, year, self.target_folder_id)
+        self.main_app.drive_wrapper.batch_upload_by_pattern(local_folder, month, year, self.target_folder_id, dry_run=dry_run)
+    
+    def upload_by_month(self):
+        """Sync the selected year's downloads into '<year> PnL/<Month>' folders under the root"""
+        year = int(self.year_var.get())
+        local_folder = "downloads"
+        
+        if not os.path.exists(local_folder):
+            self.main_app.console.print_error(f"Local folder not found: {local_folder}")
+            return
+        
+        root_folder = self.main_app.profile_section.get_current_values().get('gdrive_root')
+        if not root_folder:
+            self.main_app.console.print_error("Please specify a root directory in your profile")
+            return
+        
+        self.main_app.drive_wrapper.upload_by_month(local_folder, root_folder, year)
 
 class ScraperSection(ctk.CTkFrame):
     """Bank scraper operations section"""
@@ -502,6 +531,9 @@ class ScraperSection(ctk.CTkFrame):
         self.page = None
         self.login_instance = None
         self.csv_instance = None
+        self.blocker = None
+        # Step-level record of every account-month, so a rerun skips finished downloads
+        self.journal = RunJournal()
         self.is_running = False
         
         self.grid_columnconfigure(0, weight=1)
@@ -539,6 +571,7 @@ class ScraperSection(ctk.CTkFrame):
         scraper_date_frame.grid(row=4, column=0, padx=10, pady=5, sticky="ew")
         scraper_date_frame.grid_columnconfigure(0, weight=1)
         scraper_date_frame.grid_columnconfigure(1, weight=1)
+        scraper_date_frame.grid_columnconfigure(2, weight=1)
         
         self.scraper_month_var = ctk.StringVar(value="01")
         month_menu = ctk.CTkOptionMenu(scraper_date_frame, variable=self.scraper_month_var,
@@ -549,6 +582,12 @@ class ScraperSection(ctk.CTkFrame):
         year_entry = ctk.CTkEntry(scraper_date_frame, textvariable=self.scraper_year_var, placeholder_text="Year")
         year_entry.grid(row=0, column=1, padx=(5, 0), pady=2, sticky="ew")
         
+        # Number of browser tabs used for batch downloads
+        self.scraper_pages_var = ctk.StringVar(value="1")
+        pages_menu = ctk.CTkOptionMenu(scraper_date_frame, variable=self.scraper_pages_var,
+                                      values=["1", "2", "3", "4", "6", "8"])
+        pages_menu.grid(row=0, column=2, padx=(5, 0), pady=2, sticky="ew")
+        
         # Scraper status
         self.status_label = ctk.CTkLabel(self, text="Ready to run scraper", text_color="gray")
         self.status_label.grid(row=5, column=0, padx=10, pady=5, sticky="ew")
@@ -577,6 +616,11 @@ class ScraperSection(ctk.CTkFrame):
         self.norm_download_btn = ctk.CTkButton(func_buttons_frame, text="📊 Download", command=self.run_norm_download, width=70)
         self.norm_download_btn.grid(row=1, column=1, padx=2, pady=2, sticky="ew")
         
+        # Uploads each CSV into its month folder while the other accounts are still downloading
+        self.stream_upload_var = ctk.BooleanVar(value=False)
+        stream_check = ctk.CTkCheckBox(func_buttons_frame, text="☁️ Stream downloads to Drive", variable=self.stream_upload_var)
+        stream_check.grid(row=2, column=0, columnspan=2, padx=2, pady=(6, 2), sticky="w")
+        
         # Full workflow buttons
         workflow_label = ctk.CTkLabel(self, text="Full Workflow:", font=ctk.CTkFont(size=12, weight="bold"))
         workflow_label.grid(row=8, column=0, padx=10, pady=(10, 2), sticky="w")
@@ -706,13 +750,14 @@ class ScraperSection(ctk.CTkFrame):
         
         month = self.scraper_month_var.get()
         year = self.scraper_year_var.get()
+        pages = int(self.scraper_pages_var.get())
         
         self.main_app.console.print_info(f"📊 Running batch download for all accounts: {self.selected_scraper}")
-        self.main_app.console.print_info(f"📅 Date: {month}/{year}")
+        self.main_app.console.print_info(f"📅 Date: {month}/{year} ({pages} page{'s' if pages != 1 else ''})")
         self.status_label.configure(text="Running batch download...", text_color="orange")
         
         # Run norm_download in separate thread
-        threading.Thread(target=self._run_norm_download_async, args=(int(month), int(year)), daemon=True).start()
+        threading.Thread(target=self._run_norm_download_async, args=(int(month), int(year), pages), daemon=True).start()
     
     def run_scraper(self):
         """Run the full scraper workflow (login -> init_download -> norm_download)"""
@@ -762,18 +807,18 @@ class ScraperSection(ctk.CTkFrame):
                 await self._close_browser()
                 
                 # Start new Playwright instance (keep it persistent)
+                profile = get_browser_profile()
                 self.playwright = await async_playwright().start()
                 self.browser_context = await self.playwright.chromium.launch_persistent_context(
                     user_data_dir,
-                    headless=False,
-                    slow_mo=1000,
-                    viewport={"width": 1920, "height": 1040},
-                    accept_downloads=True
+                    **profile.launch_kwargs()
                 )
+                self.blocker = ResourceBlocker.from_profile(profile)
+                await self.blocker.attach(self.browser_context)
                 self.page = await self.browser_context.new_page()
                 
                 # Initialize login instance
-                self.login_instance = login(self.page)
+                self.login_instance = login(self.page, page_input=profile.headless)
                 
                 # Only launch and navigate (no login)
                 await self.login_instance.launch_and_navigate()
@@ -805,12 +850,14 @@ class ScraperSection(ctk.CTkFrame):
                 
                 # Execute login (navigate to sign in and fill credentials)
                 self.main_app.console.print_info("🔐 Starting login process...")
-                await self.login_instance.gotosite()  # Navigate to sign in page
-                await asyncio.sleep(3)
-                await self.login_instance.fill_credentials_only("chaseBus")  # Fill credentials
-                await asyncio.sleep(1)  
-                await self.login_instance.submit_login("chaseBus")  # Submit login
+                # The login form is matched against templates, so nothing is blocked while it renders
+                with self.blocker.paused() if self.blocker else contextlib.nullcontext():
+                    # Reuses the encrypted session snapshot when it is still valid, otherwise
+                    # navigates to sign in, fills credentials and submits
+                    reused = await self.login_instance.login_or_resume("chaseBus")
                 
+                if reused:
+                    self.main_app.console.print_success("✅ Reused saved session, already logged in!")
                 self.main_app.console.print_success("✅ Login completed successfully!")
                 self.status_label.configure(text="Login completed", text_color="green")
                 
@@ -835,7 +882,7 @@ class ScraperSection(ctk.CTkFrame):
                     return
                 
                 if not self.csv_instance:
-                    self.csv_instance = csv_d(self.page)
+                    self.csv_instance = csv_d(self.page, journal=self.journal)
                 
                 # Load bank accounts
                 try:
@@ -875,10 +922,11 @@ class ScraperSection(ctk.CTkFrame):
         # Run the async function
         asyncio.run(run_init())
     
-    def _run_norm_download_async(self, month, year):
+    def _run_norm_download_async(self, month, year, pages=1):
         """Async wrapper for norm_download function"""
         
         async def run_norm():
+            pipeline = None
             try:
                 self.is_running = True
                 
@@ -888,7 +936,7 @@ class ScraperSection(ctk.CTkFrame):
                 
                 if not self.csv_instance:
                     self.main_app.console.print_info("📥 Initializing CSV instance...")
-                    self.csv_instance = csv_d(self.page)
+                    self.csv_instance = csv_d(self.page, journal=self.journal)
                 
                 # Load bank accounts
                 try:
@@ -902,8 +950,33 @@ class ScraperSection(ctk.CTkFrame):
                     self.main_app.console.print_error("❌ No bank accounts found in configuration")
                     return
                 
+                if self.stream_upload_var.get():
+                    root_folder = self.main_app.profile_section.get_current_values().get('gdrive_root')
+                    if not root_folder:
+                        self.main_app.console.print_error("❌ Streaming to Drive needs a root directory in your profile")
+                        return
+                    pipeline = self.main_app.drive_wrapper.start_upload_pipeline(root_folder)
+                    self.csv_instance.on_file = pipeline.emit
+                    self.main_app.console.print_info(f"☁️ Each file goes to '{root_folder}/{year} PnL/<Month>' as soon as it is saved")
+                
+                # Spread accounts across several tabs when more than one page is requested
+                if pages > 1:
+                    self.main_app.console.print_info(f"📊 Starting norm_download for {len(bank_accts)} accounts on {pages} pages...")
+                    pool = page_pool(self.browser_context, pages, page=self.page, journal=self.journal,
+                                     on_file=pipeline.emit if pipeline else None)
+                    results = await pool.run(bank_accts, month, year)
+                    self.show_journal_counts(bank_accts, month, year)
+                    
+                    failed = [name for name, r in results.items() if r['status'] not in ("success", "skipped")]
+                    for name in failed:
+                        self.main_app.console.print_error(f"❌ Failed to download {name}: {results[name]['error']}")
+                    self.main_app.console.print_success(f"✅ Batch download completed: {len(results) - len(failed)}/{len(results)} accounts")
+                    self.status_label.configure(text="Batch download completed", text_color="green")
+                    return
+                
                 # Run norm_download for all accounts
                 self.main_app.console.print_info(f"📊 Starting norm_download for {len(bank_accts)} accounts...")
+                self.show_journal_counts(bank_accts, month, year)
                 
                 for i, account in enumerate(bank_accts):
                     account_name = account['name']
@@ -916,11 +989,17 @@ class ScraperSection(ctk.CTkFrame):
                         self.main_app.account_status.set_current_account(account_name, account_num)
                     
                     try:
-                        await self.csv_instance.norm_download(account_name, account_num, month, year)
-                        self.main_app.console.print_success(f"✅ Downloaded {account_name} for {month}/{year}")
+                        state = await self.csv_instance.norm_download(account_name, account_num, month, year)
+                        if state.status == "skipped":
+                            self.main_app.console.print_info(f"⏭ {account_name} for {month}/{year} already downloaded")
+                        elif state.status == "success":
+                            self.main_app.console.print_success(f"✅ Downloaded {account_name} for {month}/{year}")
+                        else:
+                            self.main_app.console.print_error(f"❌ Failed to download {account_name} at {state.step}: {state.error}")
                     except Exception as e:
                         self.main_app.console.print_error(f"❌ Failed to download {account_name}: {str(e)}")
-                        continue
+                    finally:
+                        self.show_journal_counts(bank_accts, month, year)
                 
                 self.main_app.console.print_success("✅ Batch download completed for all accounts!")
                 self.status_label.configure(text="Batch download completed", text_color="green")
@@ -929,11 +1008,23 @@ class ScraperSection(ctk.CTkFrame):
                 self.main_app.console.print_error(f"❌ Batch download failed: {str(e)}")
                 self.status_label.configure(text="Batch download failed", text_color="red")
             finally:
+                if pipeline:
+                    self.csv_instance.on_file = None
+                    self.main_app.console.print_info("☁️ Waiting for the last uploads...")
+                    await asyncio.to_thread(pipeline.close)
+                    self.main_app.console.print_info(pipeline.report())
                 self.is_running = False
         
         # Run the async function
         asyncio.run(run_norm())
     
+    def show_journal_counts(self, bank_accts, month, year):
+        """Push the journal's done/failed/running/pending counts for a month to the account status section"""
+        counts = self.journal.counts([acct['name'] for acct in bank_accts], year, month)
+        if hasattr(self.main_app, 'account_status'):
+            self.main_app.account_status.set_progress(counts, month, year)
+        return counts
+    
     async def _close_browser(self):
         """Close browser and cleanup resources"""
         try:
@@ -944,6 +1035,11 @@ class ScraperSection(ctk.CTkFrame):
                 self.login_instance = None
                 self.csv_instance = None
                 
+            if self.blocker:
+                for line in self.blocker.report():
+                    self.main_app.console.print(line)
+                self.blocker = None
+                
             if self.playwright:
                 await self.playwright.stop()
                 self.playwright = None
@@ -991,6 +1087,10 @@ class AccountStatusSection(ctk.CTkFrame):
         self.load_accounts_btn = ctk.CTkButton(self, text="🔄 Load Accounts", command=self.load_accounts)
         self.load_accounts_btn.grid(row=5, column=0, padx=10, pady=(0, 10), sticky="ew")
         
+        # Run journal progress for the month being downloaded
+        self.progress_label = ctk.CTkLabel(self, text="Progress: -", text_color="gray")
+        self.progress_label.grid(row=6, column=0, padx=10, pady=(0, 10), sticky="ew")
+        
         # Auto-load accounts on startup
         self.after(1000, self.load_accounts)  # Load after 1 second
     
@@ -1055,6 +1155,13 @@ class AccountStatusSection(ctk.CTkFrame):
         self.update_accounts_display()
         self.main_app.console.print_info(f"📍 Processing: {account_name}")
     
+    def set_progress(self, counts, month, year):
+        """Show the run journal's completion counts for a month"""
+        text = (f"Progress {int(month):02d}/{year}: {counts['done']}/{counts['total']} done, "
+                f"{counts['failed']} failed, {counts['running']} running, {counts['pending']} pending")
+        color = "green" if counts['done'] == counts['total'] else "orange" if counts['failed'] else "gray"
+        self.progress_label.configure(text=text, text_color=color)
+    
     def clear_current_account(self):
         """Clear the current account"""
         self.current_account = None
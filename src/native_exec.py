@@ -0,0 +1,71 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Optional
+
+class NativeExecutor:
+    """
+    Runs blocking native work (pyautogui, OpenCV) off the asyncio event loop.
+    Input/screenshot calls go to a thread pool, template matching to a process pool.
+    """
+
+    def __init__(self, io_workers: int = 1, cpu_workers: Optional[int] = None, use_processes: bool = True):
+        # One io worker keeps mouse clicks and keystrokes in the order they were issued
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.use_processes = use_processes
+        self._io_pool: Optional[ThreadPoolExecutor] = None
+        self._cpu_pool = None
+
+    def _get_io_pool(self) -> ThreadPoolExecutor:
+        if self._io_pool is None:
+            self._io_pool = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="native-io")
+        return self._io_pool
+
+    def _get_cpu_pool(self):
+        if self._cpu_pool is None:
+            if self.use_processes:
+                self._cpu_pool = ProcessPoolExecutor(max_workers=self.cpu_workers)
+            else:
+                self._cpu_pool = ThreadPoolExecutor(max_workers=self.cpu_workers, thread_name_prefix="native-cpu")
+        return self._cpu_pool
+
+    async def run_io(self, func: Callable, *args, **kwargs) -> Any:
+        """Await a blocking pyautogui/screen call on the io thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_io_pool(), partial(func, *args, **kwargs))
+
+    async def run_cpu(self, func: Callable, *args, **kwargs) -> Any:
+        """Await a CPU-bound call (func must be a picklable module-level function)"""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_cpu_pool(), partial(func, *args, **kwargs))
+        except BrokenProcessPool as e:
+            # Fall back to threads for the rest of the session, cv2 releases the GIL anyway
+            print(f"Process pool unavailable ({e}), using threads for CV work")
+            self._shutdown_cpu()
+            self.use_processes = False
+            return await loop.run_in_executor(self._get_cpu_pool(), partial(func, *args, **kwargs))
+
+    def _shutdown_cpu(self):
+        if self._cpu_pool is not None:
+            self._cpu_pool.shutdown(wait=False, cancel_futures=True)
+            self._cpu_pool = None
+
+    def shutdown(self):
+        """Stop both pools"""
+        if self._io_pool is not None:
+            self._io_pool.shutdown(wait=False, cancel_futures=True)
+            self._io_pool = None
+        self._shutdown_cpu()
+
+_default_executor: Optional[NativeExecutor] = None
+
+def get_native_executor() -> NativeExecutor:
+    """Shared executor for the scraper's native operations"""
+    global _default_executor
+    if _default_executor is None:
+        _default_executor = NativeExecutor()
+    return _default_executor
@@ -5,6 +5,7 @@ from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import base64
 import hashlib
+import time
 from typing import Dict, List, Optional, Literal
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
@@ -321,4 +322,85 @@ class ProfitLossProfileManager:
         return self._manager.profile_exists(self._profile_type, profile_name)
     
     def get_schema(self) -> Optional[ProfileSchema]:
-        return self._manager.get_profile_schema(self._profile_type)
\ No newline at end of file
+        return self._manager.get_profile_schema(self._profile_type)
+
+def get_sessions_path() -> str:
+    """Default location of the session snapshots, under the git-ignored cache directory"""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "sessions.enc")
+
+class SessionSnapshotStore:
+    """Encrypted browser storage-state snapshots, kept in the cache directory and never committed"""
+    def __init__(self, profiles_dir: str = None, max_age: float = 12 * 3600, sessions_file: str = None):
+        self._manager = UniversalProfileManager(profiles_dir)
+        self.sessions_file = sessions_file or get_sessions_path()
+        self.max_age = max_age
+        os.makedirs(os.path.dirname(self.sessions_file), exist_ok=True)
+        # Older versions wrote live sessions next to profiles.enc, where git could pick them up
+        legacy_file = os.path.join(self._manager.profiles_dir, "sessions.enc")
+        if os.path.abspath(legacy_file) != os.path.abspath(self.sessions_file) and os.path.exists(legacy_file):
+            os.remove(legacy_file)
+    
+    def _load_all(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.sessions_file):
+            return {}
+        try:
+            with open(self.sessions_file, 'rb') as f:
+                return json.loads(self._manager._decrypt_data(f.read()))
+        except Exception as e:
+            print(f"Error loading sessions: {e}")
+            return {}
+    
+    def _save_all(self, sessions: Dict[str, Dict]) -> bool:
+        try:
+            tmp_file = self.sessions_file + ".tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(self._manager._encrypt_data(json.dumps(sessions)))
+            os.replace(tmp_file, self.sessions_file)
+            return True
+        except Exception as e:
+            print(f"Error saving sessions: {e}")
+            return False
+    
+    def load(self, bank: str) -> Optional[Dict]:
+        """Snapshot for a bank, or None if missing or older than max_age"""
+        snapshot = self._load_all().get(bank)
+        if not snapshot:
+            return None
+        if time.time() - snapshot.get('saved_at', 0) > self.max_age:
+            return None
+        return snapshot
+    
+    def save(self, bank: str, storage_state: Dict, url: str) -> bool:
+        sessions = self._load_all()
+        sessions[bank] = {'storage_state': storage_state, 'url': url, 'saved_at': time.time()}
+        return self._save_all(sessions)
+    
+    def clear(self, bank: str) -> bool:
+        sessions = self._load_all()
+        if sessions.pop(bank, None) is None:
+            return False
+        return self._save_all(sessions)
+    
+    async def snapshot(self, context, bank: str, url: str) -> bool:
+        """Save a browser context's cookies and localStorage after a successful login"""
+        return self.save(bank, await context.storage_state(), url)
+    
+    async def restore(self, context, snapshot: Dict):
+        """Load a snapshot into an already running (persistent) browser context"""
+        state = snapshot.get('storage_state', {})
+        if state.get('cookies'):
+            await context.add_cookies(state['cookies'])
+        origins = state.get('origins') or []
+        if origins:
+            # Persistent contexts can't take storage_state at launch, so localStorage is seeded per origin on load
+            await context.add_init_script(script=f"""
+                (() => {{
+                    const origins = {json.dumps(origins)};
+                    for (const o of origins) {{
+                        if (location.origin !== o.origin) continue;
+                        for (const item of o.localStorage || []) {{
+                            if (localStorage.getItem(item.name) === null) localStorage.setItem(item.name, item.value);
+                        }}
+                    }}
+                }})();
+            """)
@@ -0,0 +1,188 @@
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from drive_client import http_status
+
+# Chunks must be a multiple of 256 KiB
+CHUNK_UNIT = 256 * 1024
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Files at least this big go through a resumable session instead of one request
+RESUMABLE_THRESHOLD = 5 * 1024 * 1024
+
+# Drive keeps an unfinished session for about a week
+SESSION_MAX_AGE = 6 * 24 * 3600
+
+def get_upload_sessions_path() -> str:
+    """Default location of the persisted resumable upload sessions"""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "upload_sessions.json")
+
+def get_chunk_size(chunk_size: Optional[int] = None) -> int:
+    """Chunk size in bytes (argument, else the upload_chunk_mb env var), rounded to 256 KiB"""
+    if chunk_size is None:
+        try:
+            chunk_size = int(float(os.getenv("upload_chunk_mb", DEFAULT_CHUNK_SIZE / (1024 * 1024))) * 1024 * 1024)
+        except ValueError:
+            chunk_size = DEFAULT_CHUNK_SIZE
+    return max(CHUNK_UNIT, (chunk_size // CHUNK_UNIT) * CHUNK_UNIT)
+
+class UploadSessionStore:
+    """Session URI and committed offset of unfinished uploads, keyed by file and folder"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_upload_sessions_path()
+        self._lock = threading.Lock()
+        self.sessions: Dict[str, Dict] = self._load()
+
+    @staticmethod
+    def key(file_path: str, folder_id: str) -> str:
+        return f"{os.path.abspath(file_path)}|{folder_id}"
+
+    def _load(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading upload sessions: {e}")
+            return {}
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.sessions, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error saving upload sessions: {e}")
+
+    def get(self, file_path: str, folder_id: str) -> Optional[Dict]:
+        """Saved session for this file, if the file is unchanged and the session not too old"""
+        with self._lock:
+            session = self.sessions.get(self.key(file_path, folder_id))
+        if not session:
+            return None
+        stat = os.stat(file_path)
+        if (session['size'] != stat.st_size or session['mtime'] != stat.st_mtime
+                or time.time() - session['started_at'] > SESSION_MAX_AGE):
+            self.clear(file_path, folder_id)
+            return None
+        return session
+
+    def put(self, file_path: str, folder_id: str, uri: str, offset: int, started_at: Optional[float] = None):
+        stat = os.stat(file_path)
+        with self._lock:
+            self.sessions[self.key(file_path, folder_id)] = {
+                'uri': uri,
+                'offset': offset,
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'started_at': started_at or time.time(),
+            }
+            self._save()
+
+    def clear(self, file_path: str, folder_id: str):
+        with self._lock:
+            if self.sessions.pop(self.key(file_path, folder_id), None) is not None:
+                self._save()
+
+_session_store: Optional[UploadSessionStore] = None
+
+def get_session_store() -> UploadSessionStore:
+    global _session_store
+    if _session_store is None:
+        _session_store = UploadSessionStore()
+    return _session_store
+
+def _query_offset(request, uri: str, size: int):
+    """
+    Ask Drive how much of a session it already has. Returns the next byte to send,
+    the finished file's metadata if the upload already completed, or None when the
+    session is gone.
+    """
+    resp, content = request.http.request(uri, method='PUT', headers={
+        'Content-Length': '0',
+        'Content-Range': f'bytes */{size}',
+    })
+    status = int(resp.status)
+    if status in (200, 201):
+        return json.loads(content.decode('utf-8') if isinstance(content, bytes) else content)
+    if status == 308:
+        committed = resp.get('range')
+        return int(committed.split('-')[1]) + 1 if committed else 0
+    return None
+
+def resumable_upload(service, file_path: str, folder_id: str, chunk_size: Optional[int] = None,
+                     progress: Optional[Callable[[str], None]] = None,
+                     store: Optional[UploadSessionStore] = None, num_retries: int = 3,
+                     app_properties: Optional[Dict[str, str]] = None) -> str:
+    """
+    Upload a file in chunks through a resumable session, returns the new file ID.
+    The session URI and committed offset are saved after every chunk, so an
+    interrupted upload (even across app restarts) continues from the last chunk.
+    """
+    from googleapiclient.http import MediaFileUpload
+    store = store or get_session_store()
+    chunk_size = get_chunk_size(chunk_size)
+    size = os.path.getsize(file_path)
+    name = os.path.basename(file_path)
+
+    media = MediaFileUpload(file_path, chunksize=chunk_size, resumable=True)
+    body = {'name': name, 'parents': [folder_id]}
+    if app_properties:
+        body['appProperties'] = app_properties
+    request = service.files().create(
+        body=body,
+        media_body=media,
+        fields='id',
+        supportsAllDrives=True
+    )
+
+    started_at = None
+    saved = store.get(file_path, folder_id)
+    if saved:
+        try:
+            offset = _query_offset(request, saved['uri'], size)
+        except Exception as e:
+            print(f"Could not check saved upload session for {name}: {e}")
+            offset = None
+        if isinstance(offset, dict):
+            store.clear(file_path, folder_id)
+            if progress:
+                progress(f"✓ {name} had already finished uploading")
+            return offset.get('id')
+        if offset is not None:
+            request.resumable_uri = saved['uri']
+            request.resumable_progress = offset
+            started_at = saved['started_at']
+            if progress:
+                progress(f"↪️ Resuming {name} at {offset / (1024 * 1024):.1f}/{size / (1024 * 1024):.1f} MiB")
+        else:
+            store.clear(file_path, folder_id)
+
+    started_at = started_at or time.time()
+    response = None
+    while response is None:
+        try:
+            status, response = request.next_chunk(num_retries=num_retries)
+        except Exception as e:
+            # 404/410 mean the session expired, the next attempt starts a new one
+            if http_status(e) in (404, 410):
+                store.clear(file_path, folder_id)
+            raise
+
+        if response is None and request.resumable_uri:
+            store.put(file_path, folder_id, request.resumable_uri, request.resumable_progress, started_at)
+            if progress and status is not None:
+                progress(f"⬆️ {name}: {status.resumable_progress / (1024 * 1024):.1f}/"
+                         f"{size / (1024 * 1024):.1f} MiB ({status.progress() * 100:.0f}%)")
+
+    store.clear(file_path, folder_id)
+    if progress:
+        progress(f"✓ {name}: {size / (1024 * 1024):.1f} MiB uploaded")
+    return response.get('id')
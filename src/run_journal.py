@@ -0,0 +1,142 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional
+
+# Identifies this process, so a resume can tell whether the page a step failed on still exists
+RUN_ID = uuid.uuid4().hex[:12]
+
+# Recorded once an account-month's file is on disk
+DONE_STEP = "done"
+
+def get_run_journal_path() -> str:
+    """Default location of the run journal database"""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "run_journal.sqlite3")
+
+class RunJournal:
+    """Persistent status of every download step, keyed by (bank, account, year, month, step)"""
+
+    def __init__(self, path: Optional[str] = None, bank: str = "chase_bus"):
+        self.path = path or get_run_journal_path()
+        self.bank = bank
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # The GUI runs each action on its own thread, so one connection is shared under a lock
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS steps (
+                bank TEXT NOT NULL,
+                account TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                month INTEGER NOT NULL,
+                step TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                session TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (bank, account, year, month, step)
+            )
+        """)
+
+    def record(self, account: str, year: int, month: int, step: str, status: str,
+               error: Optional[str] = None, session: Optional[str] = None):
+        """Write the latest status of one step, committed immediately"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO steps VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.bank, str(account), int(year), int(month), step, status, error, session, time.time()),
+            )
+
+    def mark_done(self, account: str, year: int, month: int, session: Optional[str] = None):
+        self.record(account, year, month, DONE_STEP, "success", session=session)
+
+    def steps_for(self, account: str, year: int, month: int) -> Dict[str, Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM steps WHERE bank = ? AND account = ? AND year = ? AND month = ?",
+                (self.bank, str(account), int(year), int(month)),
+            ).fetchall()
+        return {row["step"]: dict(row) for row in rows}
+
+    def is_complete(self, account: str, year: int, month: int) -> bool:
+        done = self.steps_for(account, year, month).get(DONE_STEP)
+        return bool(done and done["status"] == "success")
+
+    def resume_index(self, account: str, year: int, month: int, step_names: List[str],
+                     session: Optional[str] = None) -> int:
+        """
+        Index in step_names to restart from. The step that failed (or was still running
+        when the process died) is only resumed on the page it failed on; anywhere else the
+        page state it needs is gone, so the account starts from the first step.
+        """
+        if session is None:
+            return 0
+        unfinished = [row for row in self.steps_for(account, year, month).values()
+                      if row["status"] != "success" and row["step"] in step_names]
+        if not unfinished:
+            return 0
+        last = max(unfinished, key=lambda row: row["updated_at"])
+        if last["session"] != session:
+            return 0
+        return step_names.index(last["step"])
+
+    def counts(self, accounts: Iterable[str], year: int, month: int) -> Dict[str, int]:
+        """
+        Done/failed/running/pending account counts for one month. An account counts as
+        failed only when its latest step failed; one that is partway through its steps
+        (a page pool tab still working on it) is running.
+        """
+        accounts = [str(a) for a in accounts]
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT account, step, status FROM steps WHERE bank = ? AND year = ? AND month = ? "
+                "ORDER BY updated_at",
+                (self.bank, int(year), int(month)),
+            ).fetchall()
+
+        done, latest = set(), {}
+        for row in rows:
+            if row["step"] == DONE_STEP and row["status"] == "success":
+                done.add(row["account"])
+            latest[row["account"]] = row["status"]
+        done &= set(accounts)
+        started = (set(latest) & set(accounts)) - done
+        failed = {account for account in started if latest[account] == "failed"}
+        running = started - failed
+        return {
+            "total": len(accounts),
+            "done": len(done),
+            "failed": len(failed),
+            "running": len(running),
+            "pending": len(accounts) - len(done) - len(failed) - len(running),
+        }
+
+    def failures(self, year: int, month: int) -> Dict[str, Dict]:
+        """Unfinished step of every account that is not done, keyed by account"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM steps WHERE bank = ? AND year = ? AND month = ? ORDER BY updated_at",
+                (self.bank, int(year), int(month)),
+            ).fetchall()
+        done = {row["account"] for row in rows if row["step"] == DONE_STEP and row["status"] == "success"}
+        return {row["account"]: dict(row) for row in rows
+                if row["status"] != "success" and row["account"] not in done}
+
+    def reset(self, year: int, month: int, account: Optional[str] = None):
+        """Forget a month (or one account-month) so it is downloaded again"""
+        query = "DELETE FROM steps WHERE bank = ? AND year = ? AND month = ?"
+        params = [self.bank, int(year), int(month)]
+        if account is not None:
+            query += " AND account = ?"
+            params.append(str(account))
+        with self._lock:
+            self._conn.execute(query, params)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,14 +1,15 @@
 import asyncio
 import calendar
+import contextlib
 import csv
-import cv2
 import datetime
 import gc
+import inspect
 import json
 import logging
-import numpy as np
 import os
 import pyautogui
+import sys
 import time
 from dataclasses import dataclass, field
 from dotenv import load_dotenv
@@ -18,6 +19,19 @@ from typing import Any, Callable, ClassVar, Optional
 # from playwright.sync_api import sync_playwright
 from playwright.async_api import async_playwright
 
+# Shared helpers live one level up in src/
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from csv_split import split_by_month
+from download_index import format_download_name, get_download_index
+from download_replay import DownloadReplay
+from native_exec import get_native_executor
+from profile_manager import SessionSnapshotStore
+from run_journal import RUN_ID, RunJournal
+from browser_profile import ResourceBlocker, get_browser_profile
+from template_match import TemplateCache, TemplateMatcher, frame_from_png
+from selector_race import SelectorResolver, SelectorStats
+from wait_engine import WaitEngine
+
 load_dotenv()
 user = os.getenv("chase_user")
 password = os.getenv("chase_pass")
@@ -84,23 +98,40 @@ class logging:
         """)
 
 class state_track:
-    def __init__(self):
+    def __init__(self, journal=None, year=None, month=None, session=None):
         self.step = None
         self.account = None
         self.status = "Not started"
         self.error = None
+        # With a journal every update is also written to disk, keyed by account-month
+        self.journal = journal
+        self.year = year
+        self.month = month
+        self.session = session
 
     def update(self, account, step, status, error=None):
         self.account = account
         self.step = step
         self.status = status
         self.error = error
+        if self.journal is not None and self.month is not None:
+            self.journal.record(account, self.year, self.month, step, status, error=error, session=self.session)
 
 class login:
-    def __init__(self, page):
+    def __init__(self, page, page_input=False):
         self.page = page
+        self.waits = WaitEngine(page)
+        # Headless runs match templates on page screenshots and type through Playwright instead of the real screen
+        self.page_input = page_input
     
     base_dir = os.path.dirname(os.path.abspath(__file__))
+    overview_selector = 'a[href="#/dashboard/overview"] span:has-text("Overview")'
+    # Templates are read and grayed once per process and shared by every login instance
+    matcher = TemplateMatcher(TemplateCache())
+
+    def preload_templates(self, bank):
+        photos_dir = os.path.join(os.path.dirname(login.base_dir), "photos", "chaseBus", str(bank))
+        return login.matcher.cache.preload(photos_dir)
 
     async def launch_and_navigate(self):
         """Launch browser and navigate to Chase Business site (no login)"""
@@ -115,74 +146,85 @@ class login:
         await self.page.click('text="Sign in"')
         print("🔐 Clicked Sign In button")
 
+    async def settle(self, step, quiet_ms=300):
+        """
+        Briefly wait for network idle, then for a quiet DOM in the page and its frames (the login
+        form is an iframe), all within one short budget. Never fails the login.
+        """
+        budget = self.waits.budgets["login_settle"]
+        start = time.perf_counter()
+        try:
+            await self.waits.for_network_idle(step, budget=min(self.waits.budgets["login_network_idle"], budget))
+        except Exception:
+            # Beacons keep the network busy, the DOM wait below still runs
+            pass
+        remaining = max(quiet_ms + 100, budget - int((time.perf_counter() - start) * 1000))
+        try:
+            await self.waits.for_dom_stable(f"{step}_stable", quiet_ms=quiet_ms, budget=remaining, all_frames=True)
+        except Exception as e:
+            print(f"⏱ {step} did not settle within budget: {e}")
+
+    async def _locate(self, paths: list):
+        native = get_native_executor()
+        frame = None
+        if self.page_input:
+            frame = await native.run_cpu(frame_from_png, await self.page.screenshot())
+        # One screenshot is matched against every candidate template
+        return await login.matcher.find_async(paths, native, frame=frame)
+
+    async def _click(self, x, y):
+        if self.page_input:
+            await self.page.mouse.click(x, y)
+        else:
+            await get_native_executor().run_io(pyautogui.click, x, y)
+
     async def cred_fill(self, paths: list, cred):
-        image_found = False 
-        for path in paths:
-            try:
-                template = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
-                w, h = template.shape[::-1]
-
-                screenshot = pyautogui.screenshot()
-                screenshot_gray = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2GRAY)
-                res = cv2.matchTemplate(screenshot_gray, template, cv2.TM_CCOEFF_NORMED)
-                threshold = 0.8
-                loc = np.where(res >= threshold)
-                if loc[0].size:
-                    pt = (loc[1][0], loc[0][0])  # first detected region
-                    center_x = pt[0] + w // 2
-                    center_y = pt[1] + h // 2
-                    pyautogui.click(center_x, center_y)
-                    print(f"Used {path}")
-                    image_found = True
-                    break
-                else:
-                    pass
-                    print(f"Image not found with {path}")
-            except Exception as e:
-                print(f"Error: {e}")
+        try:
+            match = await self._locate(paths)
+        except Exception as e:
+            print(f"Error: {e}")
+            match = None
 
-        if not image_found:
+        if match is None:
             print("Image not found")
             return
 
-        pyautogui.write(cred, interval=0.08)
+        await self._click(*match.center)
+        print(f"Used {match.path} (score {match.score:.2f}, {match.latency_ms:.1f} ms)")
+
+        if self.page_input:
+            await self.page.keyboard.type(cred, delay=80)
+        else:
+            await get_native_executor().run_io(pyautogui.write, cred, interval=0.08)
 
         return()
 
     async def submit_btn(self, paths: list):
-        image_found = False
-        for path in paths:
-            try:    
-                template = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
-                w, h = template.shape[::-1]
-
-                screenshot = pyautogui.screenshot()
-                screenshot_gray = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2GRAY)
-                res = cv2.matchTemplate(screenshot_gray, template, cv2.TM_CCOEFF_NORMED)
-                threshold = 0.8
-                loc = np.where(res >= threshold)
-                if loc[0].size:
-                    pt = (loc[1][0], loc[0][0])  # first detected region
-                    center_x = pt[0] + w // 2
-                    center_y = pt[1] + h // 2
-                    pyautogui.click(center_x, center_y)
-                    image_found = True
-                else:
-                    print("Image not found with ", path)
-            except Exception as e:
-                print(f"Error: {e}")
+        try:
+            match = await self._locate(paths)
+        except Exception as e:
+            print(f"Error: {e}")
+            return False
+
+        if match is None:
+            print("Image not found")
+            return False
+
+        await self._click(*match.center)
+        return True
 
     async def fill_credentials_only(self, bank):
         """Fill username and password without navigating or submitting"""
         print("📝 Filling credentials...")
-        time.sleep(2)  # Wait for page to stabilize
+        await self.settle("login_page")  # Wait for page to stabilize
         
         # Go up one level from scraper_profiles to src, then to photos/chaseBus/chaseBus
         photos_dir = os.path.join(os.path.dirname(login.base_dir), "photos", "chaseBus", str(bank))
+        self.preload_templates(bank)
         
         # Fill username
         await self.cred_fill([os.path.join(photos_dir, file) for file in os.listdir(photos_dir) if "Username" in file], user)
-        time.sleep(1)
+        await self.settle("login_page", quiet_ms=150)
         
         # Fill password
         await self.cred_fill([os.path.join(photos_dir, file) for file in os.listdir(photos_dir) if "Password" in file], password)
@@ -195,20 +237,85 @@ class login:
         photos_dir = os.path.join(os.path.dirname(login.base_dir), "photos", "chaseBus", str(bank))
         await self.submit_btn([os.path.join(photos_dir, file) for file in os.listdir(photos_dir) if "submit" in file])
         print("✅ Login submitted")
+        for line in login.matcher.report():
+            print(f"  {line}")
+        await self.settle("login_submitted")
+        print(f"⏱ Login {self.waits.summary()}")
         return
 
     async def login(self, bank):
         """Full login process: navigate, fill credentials, and submit"""
         await self.gotosite()
-        time.sleep(3)
         await self.fill_credentials_only(bank)
-        time.sleep(1)
         await self.submit_login(bank)
         return
 
+    async def resume_session(self, store, bank):
+        """Restore the saved session and check it still reaches the dashboard"""
+        snapshot = store.load(bank)
+        if not snapshot:
+            return False
+        try:
+            await store.restore(self.page.context, snapshot)
+            await self.page.goto(snapshot['url'])
+            # Either the dashboard or the logon box shows up, whichever comes first decides
+            await self.waits.for_any_element("session_probe", [login.overview_selector, '#logonbox', 'input[type="password"]'])
+            if await self.page.locator(login.overview_selector).count() > 0:
+                return True
+        except Exception as e:
+            print(f"Saved session could not be restored: {e}")
+        store.clear(bank)
+        return False
+
+    async def login_or_resume(self, bank, store=None):
+        """Reuse the saved session if it is still valid, otherwise log in and save a new one"""
+        store = store or SessionSnapshotStore()
+        start = time.perf_counter()
+        if await self.resume_session(store, bank):
+            print(f"♻️ Reused saved session ({time.perf_counter() - start:.1f}s)")
+            return True
+
+        await self.login(bank)
+        try:
+            await self.waits.for_element("dashboard", login.overview_selector, state='attached')
+            await store.snapshot(self.page.context, bank, self.page.url)
+            print("💾 Session saved for next run")
+        except Exception as e:
+            print(f"Login did not reach the dashboard, session not saved: {e}")
+        return False
+
 class csv_d:
-    def __init__(self, page):
+    # Hit statistics are shared by every page and persisted between runs
+    selector_stats = SelectorStats()
+    # Recorded download requests are shared by every page of the logged-in context
+    replay = DownloadReplay()
+
+    # Once this step succeeds the month's file is on disk and the account-month is done
+    durable_step = "execute_download"
+
+    def __init__(self, page, journal=None, on_file=None):
         self.page = page
+        # Called with the path of every per-month CSV once it is on disk, e.g. UploadPipeline.emit
+        self.on_file = on_file
+        self.waits = WaitEngine(page)
+        self.selectors = SelectorResolver(page, csv_d.selector_stats)
+        # (name, num, start, end) while a UI download should be recorded for replay
+        self.record_download = None
+        self.journal = journal
+        self.session = f"{RUN_ID}:{id(page):x}"
+        # (name, year, month) of the last run on this page, the only one whose failed step can be resumed in place
+        self.last_run = None
+
+    async def file_saved(self, file_path):
+        """Hand a finished per-month file to on_file, a failing listener never fails the download"""
+        if self.on_file is None:
+            return
+        try:
+            result = self.on_file(file_path)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            print(f"Error handing off {os.path.basename(file_path)}: {e}")
 
     async def init_sel_acct(self, name, num):
         account_selectors = [
@@ -220,20 +327,18 @@ class csv_d:
             f'a:has(span:has-text("{num}"))'
         ]
 
-        for selector in account_selectors:
-            try:
-                await self.page.wait_for_selector(selector, state='visible', timeout=2000)
-                # print(f"Found account using selector: {selector}")
-                await self.page.click(selector)
+        try:
+            selector = await self.selectors.click("init_sel_acct", account_selectors, timeout=2000,
+                                                  params={'name': name, 'num': num})
+            if selector:
                 # print(f"Successfully clicked on account: {selector}")
                 await self.page.wait_for_load_state('networkidle', timeout=3000)
                 return True
-                
-            except Exception as e:
-                print(f"Failed to find account with selector '{selector}': {e}")
-                continue
+        except Exception as e:
+            print(f"Failed to select account {name}: {e}")
+            return False
         
-        print(f"Could not find account: {selector}")
+        print(f"Could not find account: {name} ({num})")
         return False
 
     async def init_click_download(self):
@@ -245,18 +350,15 @@ class csv_d:
             '[data-testid="quick-action-download-activity-tooltip-info"]',
             'button:has-text("Download")',
         ]
-        for selector in download_selectors:
-            try:
-                await self.page.wait_for_selector(selector, state='visible', timeout=2000)
+        try:
+            selector = await self.selectors.click("init_click_download", download_selectors, timeout=2000)
+            if selector:
                 # print(f"Found download button: {selector}")
-                await self.page.click(selector)
-                # print("Successfully clicked download button")
                 await self.page.wait_for_load_state('networkidle', timeout=3000)
                 return True
-                
-            except Exception as e:
-                print(f"Failed to find download button with selector '{selector}': {e}")
-                continue
+        except Exception as e:
+            print(f"Failed to click download button: {e}")
+            return False
         
         print("Could not find download button")
         return False
@@ -286,7 +388,7 @@ class csv_d:
                     await self.page.locator('#select-account-selector').click()
                     correct_acct = await self.page.wait_for_selector(f'mds-select-option[label="{name} (...{num})"]', timeout=3000)
                     await correct_acct.click()
-                    await asyncio.sleep(0.3)
+                    await self.waits.for_text("account_switch", '#select-account-selector span', name)
                     print(f"Selected account: {name} (...{num})")
                     return True
                 except Exception as e:
@@ -303,7 +405,6 @@ class csv_d:
             # Click the file type dropdown
             await self.page.wait_for_selector('#select-downloadFileTypeOption', state='visible', timeout=2500)
             await self.page.click('#select-downloadFileTypeOption')
-            await self.page.wait_for_timeout(1000)
             
             # Dropdown options
             csv_selectors = [
@@ -312,13 +413,11 @@ class csv_d:
                 '[role="option"]:has-text("Spreadsheet (Excel, CSV)")',
             ]
             
-            for selector in csv_selectors:
-                try:
-                    await self.page.click(selector)
-                    # print("Successfully selected CSV file type")
-                    return True
-                except:
-                    continue
+            # Race the options as the dropdown renders instead of waiting a fixed delay
+            if await self.selectors.click("set_file_type", csv_selectors,
+                                          timeout=self.waits.budgets["file_type_options"]):
+                # print("Successfully selected CSV file type")
+                return True
             
             print("Could not select CSV file type")
             return False
@@ -329,14 +428,16 @@ class csv_d:
         
     async def set_date_range(self, month, year):
         # timer = Timer(name="choosing range")
+        return await self.set_span(month, year, month, year)
 
-        start_date = datetime.date(year, month, 1).strftime('%m/%d/%Y')
-        end_date = datetime.date(year, month, calendar.monthrange(year, month)[1]).strftime('%m/%d/%Y')
+    async def set_span(self, start_month, start_year, end_month, end_year):
+        """Set the activity range from the first day of the start month to the last day of the end month"""
+        start_date = datetime.date(start_year, start_month, 1).strftime('%m/%d/%Y')
+        end_date = datetime.date(end_year, end_month, calendar.monthrange(end_year, end_month)[1]).strftime('%m/%d/%Y')
         try:
             # Click the timeframe dropdown
             await self.page.wait_for_selector('#select-downloadActivityOptionId', state='visible', timeout=3000)
             await self.page.click('#select-downloadActivityOptionId')
-            await self.page.wait_for_timeout(500)
             
             # Select "Choose a date range" option
             date_range_selectors = [
@@ -346,29 +447,20 @@ class csv_d:
                 '[role="option"]:has-text("Choose a date range")',
             ]
             
-            for selector in date_range_selectors:
-                try:
-                    # timer.start()
-                    await self.page.wait_for_selector(selector, state='visible', timeout=3000)
-                    await self.page.click(selector)
-                    # timer.stop()
-                    # print(f"Selected with {selector}")
-                    break
-                except:
-                    continue
+            await self.selectors.click("set_date_range", date_range_selectors,
+                                       timeout=self.waits.budgets["date_range_options"])
             
             # Wait for date input fields to appear
-            await self.page.wait_for_timeout(3000)
+            start_date_selector = '#accountActivityFromDate-input-input'
+            end_date_selector = '#accountActivityToDate-input-input'
+            await self.waits.for_element("date_inputs", start_date_selector, state='visible')
             
             # Fill start date
-            start_date_selector = '#accountActivityFromDate-input-input'
-            await self.page.wait_for_selector(start_date_selector, state='visible', timeout=3000)
             await self.page.fill(start_date_selector, start_date)
             # print(f"Set start date: {start_date}")
             
             # Fill end date
-            end_date_selector = '#accountActivityToDate-input-input'
-            await self.page.wait_for_selector(end_date_selector, state='visible', timeout=3000)
+            await self.waits.for_element("date_inputs", end_date_selector, state='visible')
             await self.page.fill(end_date_selector, end_date)
             # print(f"Set end date: {end_date}")
             
@@ -378,9 +470,11 @@ class csv_d:
             # print(f"Error setting date range: {e}")
             raise RuntimeError("Error") from e
 
-    async def execute_download(self, path, name, year, month):
-        if month < 10:
-            month = "0" + str(month)
+    async def execute_download(self, path, name, year, month, filename=None):
+        # A custom filename (a range download) is split into month files before anyone sees it
+        per_month = filename is None
+        if filename is None:
+            filename = format_download_name(name, month, year)
         try:
             # Download button possiblities
             download_button_selectors = [
@@ -391,24 +485,39 @@ class csv_d:
                 'mds-button:has-text("Download")'
             ]
             
-            for selector in download_button_selectors:
-                try:
-                    await self.page.wait_for_selector(selector, state='visible', timeout=3000)
-                    async with self.page.expect_download(timeout=3000) as download_info:
-                        await self.page.click(selector)
-                    # print("Successfully clicked Download button")
-                    
-                    # Wait for download to initiate
-                    # page.wait_for_timeout(3000)
-                    download = await download_info.value
-                    await download.save_as(f"{path}{name}__{month}_{year}.csv")
-                    return True
-                    
-                except:
-                    continue
+            # Wait for the dialog, but only credit a selector once its click really starts a download
+            start = time.perf_counter()
+            first = await self.selectors.resolve("execute_download", download_button_selectors, timeout=3000, record=False)
+            if first is None:
+                self.selectors.record("execute_download", None, download_button_selectors, start)
+                print("Could not find Download button")
+                raise RuntimeError("Could not find download button")
+            
+            candidates = [first] + [s for s in self.selectors.ranked("execute_download", download_button_selectors) if s != first]
+            download = None
+            recorder = csv_d.replay.recording(self.page) if self.record_download else contextlib.nullcontext([])
+            async with recorder as captured:
+                for selector in candidates:
+                    # A broad selector can match a visible button that isn't the download
+                    if selector != first and not await self.page.is_visible(selector):
+                        continue
+                    try:
+                        async with self.waits.expect_download("download") as download_info:
+                            await self.page.click(selector, timeout=3000)
+                        download = await download_info.value
+                        break
+                    except Exception as e:
+                        print(f"No download from {selector}: {e}")
+                self.selectors.record("execute_download", selector if download else None, download_button_selectors, start)
+                if download is None:
+                    raise RuntimeError("No download button started a download")
+                await download.save_as(f"{path}{filename}")
             
-            print("Could not find Download button")
-            raise RuntimeError("Could not find download button")
+            if self.record_download:
+                csv_d.replay.learn(captured, *self.record_download)
+            if per_month:
+                await self.file_saved(f"{path}{filename}")
+            return True
             
         except Exception as e:
             # print(f"Error executing download: {e}")
@@ -422,32 +531,24 @@ class csv_d:
             'button:has-text("Download other activity")',
         ]
         
-        last_exception = None
-
-        for selector in other_activity_selectors:
-            try:
-                await self.page.wait_for_selector(selector, state='visible', timeout=3000)
-                await self.page.click(selector)
-                print(f"Successfully clicked {selector}")
-                
-                # Wait for page to load
-                await self.page.wait_for_load_state('networkidle', timeout=3000)
-                
-                
-                # perform another check overview
-                if await self.check_overview():
-                    overview_success = await self.init_click_download()
-                    if not overview_success:
-                        raise RuntimeError("Failed to click out of overview")
+        try:
+            selector = await self.selectors.click("click_download_other_activity", other_activity_selectors, timeout=3000)
+            if selector is None:
+                raise RuntimeError("No button found")
+            print(f"Successfully clicked {selector}")
+            
+            # Wait for page to load
+            await self.page.wait_for_load_state('networkidle', timeout=3000)
+            
+            # perform another check overview
+            if await self.check_overview():
+                overview_success = await self.init_click_download()
+                if not overview_success:
+                    raise RuntimeError("Failed to click out of overview")
 
-                return True
-            except Exception as e:
-                last_exception = e
-                continue
-        if last_exception:
-            raise RuntimeError("No button found") from last_exception
-        else:
-            raise RuntimeError("No button found")
+            return True
+        except Exception as e:
+            raise RuntimeError("No button found") from e
 
     async def init_download(self, name, num, month, year):
         """Initial download setup - select account and set up download parameters"""
@@ -457,23 +558,125 @@ class csv_d:
             await self.verify_acct(name, num)
             await self.set_file_type()
             await self.set_date_range(month, year)
-            await self.execute_download("downloads/", name, month, year)
+            await self.execute_download("downloads/", name, year, month)
             await self.click_download_other_activity()
         except Exception as e:
             print(f"Error: {e}")
         return
     
+    def journal_skip(self, name, month, year, path="downloads/"):
+        """Finished state when the journal already has this account-month and its file is still there, else None"""
+        if self.journal is None or not self.journal.is_complete(name, year, month):
+            return None
+        if get_download_index(path).get(name, year, month) is None:
+            # Deleted or moved since it was journaled, so the account-month starts over
+            print(f"↩️ {name} {month:02d}/{year} is journaled but its file is gone, downloading again")
+            self.journal.reset(year, month, account=name)
+            return None
+        state = state_track()
+        state.update(account=name, step="journal", status="skipped")
+        print(f"⏭ {name} {month:02d}/{year} already downloaded")
+        return state
+
     async def norm_download(self, name, num, month, year):
+        skipped = self.journal_skip(name, month, year)
+        if skipped:
+            return skipped
+
         steps = [
             ("check_overview", self.check_overview),
             ("verify_acct", partial(self.verify_acct, name, num)),
             ("set_file_type", self.set_file_type),
             ("set_date_range", partial(self.set_date_range, month, year)),
-            ("execute_download", partial(self.execute_download, "downloads/", name, month, year)),
+            ("execute_download", partial(self.execute_download, "downloads/", name, year, month)),
             ("click_download_other_activity", self.click_download_other_activity),
         ]
 
-        state = state_track()
+        return await self.run_steps(name, steps, month, year)
+
+    async def fast_download(self, name, num, month, year, path="downloads/"):
+        """Replay the recorded download request over HTTP, falling back to the dialog steps"""
+        skipped = self.journal_skip(name, month, year, path)
+        if skipped:
+            return skipped
+
+        start = datetime.date(year, month, 1)
+        end = datetime.date(year, month, calendar.monthrange(year, month)[1])
+
+        if csv_d.replay.has_template(num):
+            if await csv_d.replay.replay(self.page, name, num, start, end, f"{path}{format_download_name(name, month, year)}"):
+                state = state_track()
+                state.update(account=name, step="replay", status="success")
+                if self.journal is not None:
+                    self.journal.mark_done(name, year, month, session=self.session)
+                await self.file_saved(f"{path}{format_download_name(name, month, year)}")
+                return state
+            print(f"↩️ Falling back to the download dialog for {name}")
+
+        # Drive the UI once and record the request behind the download for next time
+        self.record_download = (name, num, start, end)
+        try:
+            return await self.norm_download(name, num, month, year)
+        finally:
+            self.record_download = None
+
+    async def range_download(self, name, num, start_month, start_year, end_month, end_year, path="downloads/"):
+        """One download covering a span of months, split locally into the per-month files"""
+        range_file = f"{name}__range_{start_month:02d}_{start_year}-{end_month:02d}_{end_year}.csv"
+        range_path = os.path.join(path, range_file)
+        # A file left by an earlier run must never be split as if this run had downloaded it
+        if os.path.exists(range_path):
+            os.remove(range_path)
+
+        downloaded = False
+        async def download_range():
+            nonlocal downloaded
+            await self.execute_download(path, name, start_year, start_month, filename=range_file)
+            downloaded = True
+
+        steps = [
+            ("check_overview", self.check_overview),
+            ("verify_acct", partial(self.verify_acct, name, num)),
+            ("set_file_type", self.set_file_type),
+            ("set_date_range", partial(self.set_span, start_month, start_year, end_month, end_year)),
+            ("execute_download", download_range),
+            ("click_download_other_activity", self.click_download_other_activity),
+        ]
+
+        state = await self.run_steps(name, steps)
+
+        # The split only needs the file, so run it even if returning to the dialog failed
+        if downloaded and os.path.exists(range_path):
+            try:
+                months = split_by_month(range_path, path, name, start_month, start_year, end_month, end_year)
+                os.remove(range_path)
+                rows = sum(count for _, count in months.values())
+                print(f"Split {name}: {rows} rows into {len(months)} monthly files")
+                for month_path, _ in months.values():
+                    await self.file_saved(month_path)
+            except Exception as e:
+                state.update(step="split_by_month", account=name, status="failed", error=str(e))
+                print(f"Error splitting {range_file}: {e}")
+        return state
+
+    async def run_steps(self, name, steps, month=None, year=None):
+        """
+        Run (step_name, func) pairs in order, stopping at the first failure.
+        With a journal and a month every step is recorded, and an account that failed
+        on this same page resumes at the step it failed on.
+        """
+        journaled = self.journal is not None and month is not None
+        state = state_track(self.journal, year, month, self.session) if journaled else state_track()
+        self.waits.reset()
+
+        start_at = 0
+        if journaled:
+            same_page = self.last_run == (name, year, month)
+            start_at = self.journal.resume_index(name, year, month, [step for step, _ in steps],
+                                                 self.session if same_page else None)
+            if start_at:
+                print(f"↪️ Resuming {name} at {steps[start_at][0]}")
+        self.last_run = (name, year, month)
 
         # try:
         #     if await self.check_overview():
@@ -494,7 +697,7 @@ class csv_d:
         # except Exception as e:
         #     print(f"Error: {e}")
 
-        for i, (step_name, func) in enumerate(steps):
+        for i, (step_name, func) in enumerate(steps[start_at:], start_at):
             state.update(step=step_name, account=name, status="running")
             try:
                 if step_name == "check_overview":
@@ -511,20 +714,113 @@ class csv_d:
                 break
             else:
                 state.update(step=step_name, account=name, status="success")
+                if journaled and step_name == csv_d.durable_step:
+                    self.journal.mark_done(name, year, month, session=self.session)
+
+        print(f"⏱ {name} {self.waits.summary()}")
+        return state
+
+class page_pool:
+    """Download many accounts at once using several tabs of one logged-in context"""
+    def __init__(self, context, concurrency=3, page=None, start_url=None, stagger=1.0, fast=False, journal=None,
+                 on_file=None):
+        self.context = context
+        self.fast = fast
+        self.journal = journal
+        self.on_file = on_file
+        self.concurrency = max(1, int(concurrency))
+        self.page = page
+        self.start_url = start_url if start_url else (page.url if page else None)
+        self.stagger = stagger
+        self.results = {}
+
+    async def _open_page(self, worker_id):
+        """Worker 0 reuses the existing page, the others open a new tab on the same site"""
+        if worker_id == 0 and self.page is not None:
+            return self.page, False
+        page = await self.context.new_page()
+        if self.start_url:
+            await page.goto(self.start_url)
+            await page.wait_for_load_state('networkidle', timeout=10000)
+        return page, True
+
+    async def _worker(self, worker_id, queue, month, year):
+        # Spread out the tab openings so the bank doesn't see a burst of sessions
+        await asyncio.sleep(worker_id * self.stagger)
+        try:
+            page, owned = await self._open_page(worker_id)
+        except Exception as e:
+            print(f"[page {worker_id}] Could not open tab: {e}")
+            return
+
+        downloader = csv_d(page, journal=self.journal, on_file=self.on_file)
+        try:
+            while True:
+                try:
+                    acct = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+
+                start = time.perf_counter()
+                try:
+                    download = downloader.fast_download if self.fast else downloader.norm_download
+                    state = await download(acct['name'], acct['num'], month, year)
+                    self.results[acct['name']] = {
+                        'account': acct,
+                        'status': state.status if state.status in ("success", "skipped") else "error",
+                        'step': state.step,
+                        'error': state.error,
+                        'page': worker_id,
+                        'elapsed': time.perf_counter() - start,
+                    }
+                except Exception as e:
+                    self.results[acct['name']] = {
+                        'account': acct,
+                        'status': "error",
+                        'step': None,
+                        'error': str(e),
+                        'page': worker_id,
+                        'elapsed': time.perf_counter() - start,
+                    }
+                finally:
+                    queue.task_done()
+                print(f"[page {worker_id}] {acct['name']}({acct['num']}): {self.results[acct['name']]['status']}")
+        finally:
+            if owned:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+
+    async def run(self, bank_accts, month, year):
+        """Feed every account through the work queue and return the results table keyed by account name"""
+        queue = asyncio.Queue()
+        for acct in bank_accts:
+            queue.put_nowait(acct)
+
+        self.results = {}
+        workers = min(self.concurrency, len(bank_accts))
+        await asyncio.gather(*(self._worker(i, queue, month, year) for i in range(workers)))
+
+        # Anything left means every tab failed to open
+        while not queue.empty():
+            acct = queue.get_nowait()
+            self.results[acct['name']] = {'account': acct, 'status': "error", 'step': None,
+                                          'error': "No page available", 'page': None, 'elapsed': 0.0}
+        return self.results
 
 class null_handle:
     def __init__(self, bank_accts, page):
         self.page = page
         self.bank_accts = bank_accts
     
-    def get_missing_downloads(self, downloads_path):
-        """Check which accounts are missing downloads"""
-        try:
-            downloads = [name[:-12] for name in os.listdir(str(downloads_path)) if name.endswith('.csv')]
-            n_found = set([acct['name'] for acct in self.bank_accts]) - set(downloads)
-            return n_found
-        except Exception:
-            return set([acct['name'] for acct in self.bank_accts])
+    def get_missing_downloads(self, downloads_path, year=None, month=None):
+        """Accounts with no download for a month, or with none at all when no month is given"""
+        index = get_download_index(str(downloads_path))
+        accounts = {acct['name'] for acct in self.bank_accts}
+        if year is None or month is None:
+            return accounts - index.accounts()
+        return index.missing(accounts, year, month)
 
     # async def check_downloads(self, d_path, bank_accts):
     #     downloads = [name[:-12] for name in os.listdir(str(d_path))]
@@ -539,24 +835,29 @@ class null_handle:
 
 
 async def main():
+    # browser_profile=lean runs headless with images, fonts, media and trackers blocked
+    profile = get_browser_profile()
     async with async_playwright() as p:
         context = await p.chromium.launch_persistent_context(
             user_data_dir,
-            headless=False,
-            slow_mo=1000,
-            viewport={"width": 1920, "height": 1040},
-            accept_downloads=True
+            **profile.launch_kwargs()
         )
+        blocker = ResourceBlocker.from_profile(profile)
+        await blocker.attach(context)
         page = await context.new_page()
 
         # Initialize logger and start tracking clicks
         click_logger = logging(page)
         await click_logger.track_clicks()
 
-        login_instance = login(page)
-        await login_instance.login("chase_bus")
+        # The login form is matched against templates, so it renders with nothing blocked
+        login_instance = login(page, page_input=profile.headless)
+        sessions = SessionSnapshotStore()
+        with blocker.paused():
+            await login_instance.login_or_resume("chase_bus", sessions)
 
-        csv_instance = csv_d(page)
+        journal = RunJournal(bank="chase_bus")
+        csv_instance = csv_d(page, journal=journal)
 
         # Example of async command loop (simplified)
         cont = True
@@ -593,7 +894,45 @@ async def main():
                             continue
                     for r in results:
                         print(r)
+                    print(journal.counts([acct['name'] for acct in bank_accts], 2025, 4))
+                case "pool":
+                    concurrency = await asyncio.to_thread(input, "Number of pages: ")
+                    pool = page_pool(context, int(concurrency or 3), page=page, journal=journal)
+                    results = await pool.run(bank_accts, 4, 2025)
+                    for name, r in results.items():
+                        print(f"{name}: {r['status']} ({r['elapsed']:.1f}s on page {r['page']}) {r['error'] or ''}")
+                case "range":
+                    span = await asyncio.to_thread(input, "Range (MM/YYYY-MM/YYYY): ")
+                    start, end = [part.strip() for part in span.split("-")]
+                    start_month, start_year = [int(x) for x in start.split("/")]
+                    end_month, end_year = [int(x) for x in end.split("/")]
+                    for acct in bank_accts:
+                        state = await csv_instance.range_download(acct['name'], acct['num'], start_month, start_year, end_month, end_year)
+                        print(f"{acct['name']}({acct['num']}): {state.status} {state.error or ''}")
+                case "fast":
+                    for acct in bank_accts:
+                        state = await csv_instance.fast_download(acct['name'], acct['num'], 4, 2025)
+                        print(f"{acct['name']}({acct['num']}): {state.status} via {state.step}")
+                    print(csv_d.replay.stats)
+                case "selectors":
+                    for line in csv_d.selector_stats.report():
+                        print(line)
+                case "journal":
+                    print(journal.counts([acct['name'] for acct in bank_accts], 2025, 4))
+                    for name, row in journal.failures(2025, 4).items():
+                        print(f"  {name}: {row['status']} at {row['step']} {row['error'] or ''}")
+                case "journal_reset":
+                    journal.reset(2025, 4)
+                    print("Journal cleared for 04/2025")
+                case "forget_session":
+                    sessions.clear("chase_bus")
+                    print("Saved session removed")
+                case "blocked":
+                    for line in blocker.report():
+                        print(line)
                 case "exit":
+                    for line in blocker.report():
+                        print(line)
                     await context.close()
                     cont = False
 
@@ -0,0 +1,177 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+def get_selector_stats_path() -> str:
+    """Default location of the persisted selector hit statistics"""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "selector_stats.json")
+
+class SelectorStats:
+    """Per-step selector hit counts, persisted to disk between runs"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_selector_stats_path()
+        self._lock = threading.Lock()
+        self.steps: Dict[str, Dict[str, Dict]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Dict]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading selector stats: {e}")
+            return {}
+
+    def save(self):
+        """Write stats atomically so a crash never leaves a half-written file"""
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(self.steps, f, indent=2)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                print(f"Error saving selector stats: {e}")
+
+    def rank(self, step: str, keys: List[str]) -> List[str]:
+        """Order selector keys by historical hits, keeping the declared order for ties"""
+        step_stats = self.steps.get(step, {})
+        return sorted(keys, key=lambda k: -step_stats.get(k, {}).get('hits', 0))
+
+    def leader(self, step: str, min_hits: int = 5, min_share: float = 0.9) -> Optional[str]:
+        """Selector key that has won almost every time for this step, if any"""
+        step_stats = self.steps.get(step, {})
+        total = sum(s.get('hits', 0) for s in step_stats.values())
+        if not total:
+            return None
+        key, best = max(step_stats.items(), key=lambda item: item[1].get('hits', 0))
+        if best.get('hits', 0) >= min_hits and best['hits'] / total >= min_share:
+            return key
+        return None
+
+    def record(self, step: str, key: Optional[str], elapsed_ms: float, candidates: List[str]):
+        """Record the winner of a step (None when no candidate matched)"""
+        with self._lock:
+            step_stats = self.steps.setdefault(step, {})
+            previous = self.leader(step, min_hits=3, min_share=0.0)
+            if key is None:
+                misses = step_stats.setdefault('__none__', {'hits': 0, 'misses': 0})
+                misses['misses'] = misses.get('misses', 0) + 1
+                misses['last_miss'] = time.time()
+            else:
+                entry = step_stats.setdefault(key, {'hits': 0, 'avg_ms': 0.0})
+                entry['hits'] += 1
+                entry['avg_ms'] += (elapsed_ms - entry.get('avg_ms', 0.0)) / entry['hits']
+                entry['last_hit'] = time.time()
+                for other in candidates:
+                    if other != key and other in step_stats:
+                        step_stats[other]['misses'] = step_stats[other].get('misses', 0) + 1
+        if key is not None and previous is not None and previous != key and previous != '__none__':
+            print(f"⚠️ Selector change for {step}: '{previous}' lost to '{key}' (bank page may have changed)")
+        self.save()
+
+    def report(self) -> List[str]:
+        """Readable per-step hit table"""
+        lines = []
+        for step, step_stats in self.steps.items():
+            total = sum(s.get('hits', 0) for s in step_stats.values()) or 1
+            lines.append(f"{step}:")
+            for key, s in sorted(step_stats.items(), key=lambda item: -item[1].get('hits', 0)):
+                lines.append(
+                    f"  {s.get('hits', 0):4d} hits ({100 * s.get('hits', 0) / total:3.0f}%) "
+                    f"{s.get('misses', 0):4d} misses  {s.get('avg_ms', 0.0):6.0f} ms  {key}"
+                )
+        return lines
+
+class SelectorResolver:
+    """Races fallback selectors against each other and learns which one usually wins"""
+
+    def __init__(self, page, stats: SelectorStats):
+        self.page = page
+        self.stats = stats
+
+    @staticmethod
+    def _key(selector: str, params: Optional[Dict[str, str]]) -> str:
+        # Account names/numbers are replaced by placeholders so stats are shared between accounts
+        key = selector
+        for name, value in (params or {}).items():
+            if value:
+                key = key.replace(str(value), "{" + name + "}")
+        return key
+
+    async def _race(self, selectors: List[str], state: str, timeout: int) -> Optional[str]:
+        tasks = {
+            asyncio.ensure_future(self.page.wait_for_selector(selector, state=state, timeout=timeout)): selector
+            for selector in selectors
+        }
+        winner = None
+        pending = set(tasks)
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Among tasks finishing together prefer the best ranked selector
+                for task in sorted(done, key=lambda t: selectors.index(tasks[t])):
+                    if not task.cancelled() and task.exception() is None:
+                        winner = tasks[task]
+                        break
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        return winner
+
+    def ranked(self, step: str, selectors: List[str], params: Optional[Dict[str, str]] = None) -> List[str]:
+        """Selectors in the order they should be tried: the usual winner first, then by past hits"""
+        keys = {self._key(selector, params): selector for selector in selectors}
+        ranked = [keys[key] for key in self.stats.rank(step, list(keys))]
+        leader = self.stats.leader(step)
+        if leader in keys:
+            ranked.remove(keys[leader])
+            ranked.insert(0, keys[leader])
+        return ranked
+
+    def record(self, step: str, selector: Optional[str], selectors: List[str], start: float,
+               params: Optional[Dict[str, str]] = None):
+        """Credit the selector that actually did the job (None for a miss), for callers that verify the outcome"""
+        keys = [self._key(candidate, params) for candidate in selectors]
+        winner_key = self._key(selector, params) if selector else None
+        self.stats.record(step, winner_key, (time.perf_counter() - start) * 1000, keys)
+
+    async def resolve(self, step: str, selectors: List[str], state: str = 'visible', timeout: int = 3000,
+                      params: Optional[Dict[str, str]] = None, record: bool = True) -> Optional[str]:
+        """
+        Return the first selector to reach state, or None if none did within timeout.
+        With record=False the caller credits the selector itself once it knows it worked.
+        """
+        keys = {self._key(selector, params): selector for selector in selectors}
+        ranked = [keys[key] for key in self.stats.rank(step, list(keys))]
+        start = time.perf_counter()
+
+        winner = None
+        leader = self.stats.leader(step)
+        if leader in keys:
+            # The historical winner gets a short solo attempt before racing everything
+            winner = await self._race([keys[leader]], state, min(timeout, 1500))
+        if winner is None:
+            winner = await self._race(ranked, state, timeout)
+
+        if record:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            winner_key = self._key(winner, params) if winner else None
+            self.stats.record(step, winner_key, elapsed_ms, list(keys))
+        return winner
+
+    async def click(self, step: str, selectors: List[str], timeout: int = 3000,
+                    params: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """Resolve a step's selector and click it, returns the selector used"""
+        winner = await self.resolve(step, selectors, timeout=timeout, params=params)
+        if winner is not None:
+            await self.page.click(winner)
+        return winner
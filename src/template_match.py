@@ -0,0 +1,262 @@
+import asyncio
+import cv2
+import numpy as np
+import os
+import pyautogui
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+@dataclass
+class TemplateMatch:
+    """Result of locating a template on screen"""
+    path: str
+    score: float
+    top_left: Tuple[int, int]
+    size: Tuple[int, int]
+    latency_ms: float
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        return (self.top_left[0] + self.size[0] // 2, self.top_left[1] + self.size[1] // 2)
+
+@dataclass
+class TemplateStats:
+    """Running per-template match scores and latencies"""
+    lookups: int = 0
+    hits: int = 0
+    last_score: float = 0.0
+    best_score: float = 0.0
+    total_ms: float = 0.0
+    last_ms: float = 0.0
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_ms / self.lookups if self.lookups else 0.0
+
+def build_pyramid(image: np.ndarray, levels: int) -> List[np.ndarray]:
+    """Return [full, 1/2, 1/4, ...] copies of a grayscale image"""
+    pyramid = [image]
+    for _ in range(levels):
+        prev = pyramid[-1]
+        if min(prev.shape[:2]) < 16:
+            break
+        pyramid.append(cv2.pyrDown(prev))
+    return pyramid
+
+def match_template(frame: np.ndarray, template: np.ndarray, threshold: float = 0.8, levels: int = 2,
+                   roi: Optional[Tuple[int, int, int, int]] = None, candidates_k: int = 5) -> Tuple[float, Optional[Tuple[int, int]]]:
+    """
+    Coarse-to-fine template match of a grayscale template on a grayscale frame.
+    roi is (x, y, w, h) in frame coordinates. Returns (score, top_left) with top_left None below threshold.
+    Kept at module level so it can be shipped to a process pool.
+    """
+    off_x, off_y = 0, 0
+    if roi is not None:
+        x, y, w, h = roi
+        x, y = max(0, x), max(0, y)
+        frame = frame[y:y + h, x:x + w]
+        off_x, off_y = x, y
+
+    th, tw = template.shape[:2]
+    fh, fw = frame.shape[:2]
+    if fh < th or fw < tw:
+        return 0.0, None
+
+    # Only search coarse levels where the template still has enough detail to match
+    levels = min(levels, max(0, int(np.log2(max(1, min(th, tw) // 8)))))
+    frame_pyr = build_pyramid(frame, levels)
+    tmpl_pyr = build_pyramid(template, levels)
+    levels = min(len(frame_pyr), len(tmpl_pyr)) - 1
+
+    if levels == 0:
+        res = cv2.matchTemplate(frame, template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, loc = cv2.minMaxLoc(res)
+        if score < threshold:
+            return float(score), None
+        return float(score), (loc[0] + off_x, loc[1] + off_y)
+
+    # Coarse pass over the whole (downscaled) search area, keeping the few strongest peaks
+    coarse = cv2.matchTemplate(frame_pyr[levels], tmpl_pyr[levels], cv2.TM_CCOEFF_NORMED)
+    ctw, cth = tmpl_pyr[levels].shape[1], tmpl_pyr[levels].shape[0]
+    candidates = []
+    for _ in range(candidates_k):
+        _, coarse_score, _, coarse_loc = cv2.minMaxLoc(coarse)
+        if coarse_score < threshold - 0.3:
+            break
+        candidates.append(coarse_loc)
+        cx, cy = coarse_loc
+        coarse[max(0, cy - cth // 2):cy + cth // 2 + 1, max(0, cx - ctw // 2):cx + ctw // 2 + 1] = -1.0
+    if not candidates:
+        return 0.0, None
+
+    # Fine pass in a small window around each coarse peak
+    scale = 2 ** levels
+    margin = scale * 2
+    best_score, best_loc = 0.0, None
+    for cx, cy in candidates:
+        x0 = max(0, cx * scale - margin)
+        y0 = max(0, cy * scale - margin)
+        x1 = min(fw, cx * scale + tw + margin)
+        y1 = min(fh, cy * scale + th + margin)
+        window = frame[y0:y1, x0:x1]
+        if window.shape[0] < th or window.shape[1] < tw:
+            continue
+        fine = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, loc = cv2.minMaxLoc(fine)
+        if score > best_score:
+            best_score, best_loc = score, (x0 + loc[0] + off_x, y0 + loc[1] + off_y)
+
+    if best_score < threshold:
+        return float(best_score), None
+    return float(best_score), best_loc
+
+def frame_from_png(data: bytes) -> np.ndarray:
+    """Grayscale frame from PNG bytes, e.g. a Playwright page.screenshot()"""
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+
+class TemplateCache:
+    """Loads every template image once and keeps a grayscale copy in memory"""
+
+    def __init__(self, photos_dir: Optional[str] = None):
+        self.photos_dir = photos_dir
+        self._templates: Dict[str, np.ndarray] = {}
+        if photos_dir and os.path.isdir(photos_dir):
+            self.preload(photos_dir)
+
+    def preload(self, photos_dir: str) -> int:
+        """Load all PNG templates in a directory, returns the number loaded"""
+        count = 0
+        for file in sorted(os.listdir(photos_dir)):
+            if file.lower().endswith('.png'):
+                if self.get(os.path.join(photos_dir, file)) is not None:
+                    count += 1
+        return count
+
+    def get(self, path: str) -> Optional[np.ndarray]:
+        """Grayscale template for a path, loading it on first use"""
+        path = os.path.abspath(path)
+        template = self._templates.get(path)
+        if template is None:
+            template = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if template is None:
+                print(f"Could not load template: {path}")
+                return None
+            self._templates[path] = template
+        return template
+
+    def paths(self, keyword: str = "") -> List[str]:
+        """Cached template paths whose filename contains keyword"""
+        return [path for path in self._templates if keyword in os.path.basename(path)]
+
+class TemplateMatcher:
+    """Finds templates on screen using one screenshot per lookup and remembered regions of interest"""
+
+    def __init__(self, cache: TemplateCache, threshold: float = 0.8, levels: int = 2, roi_margin: int = 60):
+        self.cache = cache
+        self.threshold = threshold
+        self.levels = levels
+        self.roi_margin = roi_margin
+        self.regions: Dict[str, Tuple[int, int, int, int]] = {}
+        self.stats: Dict[str, TemplateStats] = {}
+
+    def grab_frame(self) -> np.ndarray:
+        """Take a single grayscale screenshot"""
+        screenshot = pyautogui.screenshot()
+        return cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2GRAY)
+
+    def _remember(self, path: str, match: TemplateMatch):
+        x, y = match.top_left
+        w, h = match.size
+        m = self.roi_margin
+        self.regions[path] = (max(0, x - m), max(0, y - m), w + 2 * m, h + 2 * m)
+
+    def _record(self, path: str, score: float, hit: bool, elapsed_ms: float):
+        stats = self.stats.setdefault(path, TemplateStats())
+        stats.lookups += 1
+        stats.hits += int(hit)
+        stats.last_score = score
+        stats.best_score = max(stats.best_score, score)
+        stats.last_ms = elapsed_ms
+        stats.total_ms += elapsed_ms
+
+    def _finish(self, path: str, template: np.ndarray, score: float, loc, elapsed_ms: float) -> Tuple[float, Optional[TemplateMatch]]:
+        self._record(path, score, loc is not None, elapsed_ms)
+        if loc is None:
+            return score, None
+        h, w = template.shape[:2]
+        result = TemplateMatch(path, score, (int(loc[0]), int(loc[1])), (w, h), elapsed_ms)
+        self._remember(path, result)
+        return score, result
+
+    def _ordered(self, paths: List[str]) -> List[str]:
+        # Templates that have hit before are the most likely to hit again
+        return sorted(paths, key=lambda p: -self.stats.get(os.path.abspath(p), TemplateStats()).hits)
+
+    def match(self, path: str, frame: np.ndarray) -> Tuple[float, Optional[TemplateMatch]]:
+        """Match one template against an already captured frame, trying its remembered region first"""
+        template = self.cache.get(path)
+        if template is None:
+            return 0.0, None
+        path = os.path.abspath(path)
+
+        start = time.perf_counter()
+        score, loc = 0.0, None
+        roi = self.regions.get(path)
+        if roi is not None:
+            score, loc = match_template(frame, template, self.threshold, self.levels, roi)
+        if loc is None:
+            score, loc = match_template(frame, template, self.threshold, self.levels)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        return self._finish(path, template, score, loc, elapsed_ms)
+
+    def find(self, paths: List[str], frame: Optional[np.ndarray] = None) -> Optional[TemplateMatch]:
+        """Return the first of several candidate templates found on a single screenshot"""
+        if frame is None:
+            frame = self.grab_frame()
+        for path in self._ordered(paths):
+            score, result = self.match(path, frame)
+            if result is not None:
+                return result
+            print(f"Image not found with {path} (score {score:.2f})")
+        return None
+
+    async def match_async(self, path: str, frame: np.ndarray, executor) -> Tuple[float, Optional[TemplateMatch]]:
+        """Same as match, but the matchTemplate work runs on the executor's CPU pool"""
+        template = self.cache.get(path)
+        if template is None:
+            return 0.0, None
+        path = os.path.abspath(path)
+
+        start = time.perf_counter()
+        score, loc = 0.0, None
+        roi = self.regions.get(path)
+        if roi is not None:
+            score, loc = await executor.run_cpu(match_template, frame, template, self.threshold, self.levels, roi)
+        if loc is None:
+            score, loc = await executor.run_cpu(match_template, frame, template, self.threshold, self.levels)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        return self._finish(path, template, score, loc, elapsed_ms)
+
+    async def find_async(self, paths: List[str], executor, frame: Optional[np.ndarray] = None) -> Optional[TemplateMatch]:
+        """Screenshot on the io pool, then match every candidate concurrently on the CPU pool"""
+        if frame is None:
+            frame = await executor.run_io(self.grab_frame)
+        ordered = self._ordered(paths)
+        results = await asyncio.gather(*(self.match_async(path, frame, executor) for path in ordered))
+        for path, (score, result) in zip(ordered, results):
+            if result is not None:
+                return result
+            print(f"Image not found with {path} (score {score:.2f})")
+        return None
+
+    def report(self) -> List[str]:
+        """Per-template match score and latency lines"""
+        lines = []
+        for path, s in self.stats.items():
+            lines.append(
+                f"{os.path.basename(path)}: {s.hits}/{s.lookups} hits, "
+                f"last score {s.last_score:.2f}, best {s.best_score:.2f}, "
+                f"last {s.last_ms:.1f} ms, avg {s.avg_ms:.1f} ms"
+            )
+        return lines
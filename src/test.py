@@ -1,6 +1,8 @@
 import os
 import json
 import csv
+
+from download_index import get_download_index
 # photo_dir = "src/photos/"
 # bank = "chase_bus"
 # test = photo_dir + bank
@@ -25,9 +27,10 @@ class test:
 # n_found = set([acct['name'] for acct in bank_accts]) - set(downloads)
 # print(n_found)
 
-def check_downloads(d_path, bank_accts):
-    downloads = [name[:-12] for name in os.listdir(str(d_path))]
-    n_found = set([acct['name'] for acct in bank_accts]) - set(downloads)
+def check_downloads(d_path, bank_accts, year=None, month=None):
+    index = get_download_index(str(d_path))
+    names = set([acct['name'] for acct in bank_accts])
+    n_found = names - index.accounts() if year is None or month is None else index.missing(names, year, month)
     result = []
     for acct_name in n_found:
         matches = [acct for acct in bank_accts if acct['name'] == acct_name]
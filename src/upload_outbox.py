@@ -0,0 +1,222 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+# appProperties key carrying the idempotency key of an outbox upload
+OUTBOX_KEY = "outbox_key"
+
+# Attempts before an entry is parked as failed instead of retried on the next drain
+MAX_ATTEMPTS = 5
+
+# An entry claimed longer ago than this is assumed abandoned by a process that died mid-upload;
+# anything younger may still be in flight in another window sharing the database
+LEASE_SECONDS = 30 * 60
+
+def get_outbox_path() -> str:
+    """Default location of the upload outbox database"""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "upload_outbox.sqlite3")
+
+def idempotency_key(folder_id: str, name: str, md5: str) -> str:
+    """Same content, name and destination always give the same key"""
+    return hashlib.sha1(f"{folder_id}/{name}/{md5}".encode('utf-8')).hexdigest()
+
+class UploadOutbox:
+    """
+    Persistent queue of uploads (local path, md5, destination folder). Entries stay
+    until Drive has the file, so uploads cut short by a crash or a closed window are
+    sent on the next drain without creating duplicates.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or get_outbox_path()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS uploads (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL UNIQUE,
+                path TEXT NOT NULL,
+                md5 TEXT NOT NULL,
+                folder_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                file_id TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        with self._lock:
+            self._requeue_stale()
+
+    def _requeue_stale(self):
+        """Put uploads whose lease ran out back in the queue, caller holds the lock"""
+        self._conn.execute(
+            "UPDATE uploads SET status = 'pending' WHERE status = 'uploading' AND updated_at < ?",
+            (time.time() - LEASE_SECONDS,),
+        )
+
+    def enqueue(self, file_path: str, folder_id: str, md5: str) -> int:
+        """Add an upload (or re-open an earlier one with the same key), returns its entry ID"""
+        file_path = os.path.abspath(file_path)
+        key = idempotency_key(folder_id, os.path.basename(file_path), md5)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT id, status FROM uploads WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                cursor = self._conn.execute(
+                    "INSERT INTO uploads (key, path, md5, folder_id, status, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, 'pending', ?, ?)",
+                    (key, file_path, md5, folder_id, now, now),
+                )
+                return cursor.lastrowid
+            # A finished entry sent again is checked against Drive before anything is uploaded
+            if row["status"] in ("done", "failed"):
+                self._conn.execute(
+                    "UPDATE uploads SET status = 'pending', path = ?, error = NULL, "
+                    "attempts = MAX(attempts, 1), updated_at = ? WHERE id = ?",
+                    (file_path, now, row["id"]),
+                )
+            return row["id"]
+
+    def claim(self, ids: Optional[Iterable[int]] = None) -> List[Dict]:
+        """Mark pending entries (all, or just ids) as uploading and return them"""
+        with self._lock:
+            self._requeue_stale()
+            if ids is None:
+                rows = self._conn.execute("SELECT * FROM uploads WHERE status = 'pending' ORDER BY id").fetchall()
+            else:
+                ids = list(ids)
+                rows = self._conn.execute(
+                    f"SELECT * FROM uploads WHERE status = 'pending' AND id IN ({','.join('?' * len(ids))}) ORDER BY id",
+                    ids,
+                ).fetchall() if ids else []
+            now = time.time()
+            for row in rows:
+                self._conn.execute(
+                    "UPDATE uploads SET status = 'uploading', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (now, row["id"]),
+                )
+        return [dict(row, status='uploading', attempts=row["attempts"] + 1) for row in rows]
+
+    def rekey(self, entry_id: int, md5: str) -> Optional[str]:
+        """
+        The local file changed since it was queued, so it is a different upload now.
+        Returns the new key, or None when another entry already has it (this one is dropped).
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT path, folder_id FROM uploads WHERE id = ?", (entry_id,)).fetchone()
+            key = idempotency_key(row["folder_id"], os.path.basename(row["path"]), md5)
+            if self._conn.execute("SELECT 1 FROM uploads WHERE key = ? AND id != ?", (key, entry_id)).fetchone():
+                self._conn.execute("DELETE FROM uploads WHERE id = ?", (entry_id,))
+                return None
+            self._conn.execute(
+                "UPDATE uploads SET key = ?, md5 = ?, attempts = 1, updated_at = ? WHERE id = ?",
+                (key, md5, time.time(), entry_id),
+            )
+        return key
+
+    def mark_done(self, entry_id: int, file_id: Optional[str]):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE uploads SET status = 'done', file_id = ?, error = NULL, updated_at = ? WHERE id = ?",
+                (file_id, time.time(), entry_id),
+            )
+
+    def mark_failed(self, entry_id: int, error: str, final: bool = False):
+        """Back to pending for the next drain, or parked as failed once out of attempts"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE uploads SET status = CASE WHEN ? OR attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, updated_at = ? WHERE id = ?",
+                (final, MAX_ATTEMPTS, error, time.time(), entry_id),
+            )
+
+    def get(self, ids: Iterable[int]) -> Dict[int, Dict]:
+        ids = list(ids)
+        if not ids:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM uploads WHERE id IN ({','.join('?' * len(ids))})", ids
+            ).fetchall()
+        return {row["id"]: dict(row) for row in rows}
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM uploads GROUP BY status").fetchall()
+        counts = {"pending": 0, "uploading": 0, "done": 0, "failed": 0}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def retry_failed(self) -> int:
+        """Give parked entries another round of attempts"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE uploads SET status = 'pending', attempts = 1, updated_at = ? WHERE status = 'failed'",
+                (time.time(),),
+            )
+        return cursor.rowcount
+
+    def prune(self, older_than: float = 30 * 24 * 3600) -> int:
+        """Forget finished entries older than this many seconds"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM uploads WHERE status = 'done' AND updated_at < ?", (time.time() - older_than,)
+            )
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def drain_outbox(outbox: UploadOutbox, uploader, ids: Optional[Iterable[int]] = None, hashes=None,
+                 progress: Optional[Callable[[str], None]] = print) -> Dict[int, object]:
+    """
+    Send pending entries (all, or just ids) through a ParallelUploader and record the
+    outcome. Every file is tagged with its idempotency key; an entry that was attempted
+    before is first looked up by that key, so a retry never adds a second copy.
+    Returns {entry_id: UploadResult}.
+    """
+    if hashes is None:
+        from drive_sync import get_hash_cache
+        hashes = get_hash_cache()
+
+    futures = {}
+    for entry in outbox.claim(ids):
+        if not os.path.exists(entry["path"]):
+            outbox.mark_failed(entry["id"], "local file missing", final=True)
+            if progress:
+                progress(f"✗ {os.path.basename(entry['path'])}: local file missing, dropped from the outbox")
+            continue
+        key = entry["key"]
+        md5 = hashes.md5(entry["path"])
+        if md5 != entry["md5"]:
+            key = outbox.rekey(entry["id"], md5)
+            if key is None:
+                if progress:
+                    progress(f"↩️ {os.path.basename(entry['path'])}: this content is already queued")
+                continue
+        futures[entry["id"]] = uploader.submit(entry["path"], entry["folder_id"],
+                                               app_properties={OUTBOX_KEY: key}, dedupe=entry["attempts"] > 1)
+    hashes.save()
+
+    results = {}
+    for entry_id, future in futures.items():
+        result = future.result()
+        results[entry_id] = result
+        name = os.path.basename(result.path)
+        if result.ok:
+            outbox.mark_done(entry_id, result.file_id)
+            if result.existing and progress:
+                progress(f"↩️ {name} was already in Drive from an earlier attempt, not uploaded again")
+        else:
+            outbox.mark_failed(entry_id, result.error)
+    return results
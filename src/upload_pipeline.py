@@ -0,0 +1,145 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from download_index import parse_download_name
+from drive_sync import apply_sync, get_hash_cache, plan_sync
+from google_conn import ensure_month_folders, get_folder, month_folder_path
+
+# Saved files waiting for Drive before the scraper is held back
+DEFAULT_QUEUE_SIZE = 32
+
+class UploadPipeline:
+    """
+    Uploads each scraped CSV as soon as it is saved. The scraper emits file paths into
+    a bounded queue; a dispatcher thread files whatever has arrived into its month
+    folder and syncs it in one go, so uploads overlap with the remaining downloads.
+    """
+
+    _CLOSE = object()
+
+    def __init__(self, wrapper, root_folder_name: str, maxsize: int = DEFAULT_QUEUE_SIZE):
+        self.wrapper = wrapper
+        self.root_folder_name = root_folder_name
+        self.queue = queue.Queue(maxsize)
+        self.hashes = get_hash_cache()
+        # Success flag per local path, for files that were uploaded, updated or already identical
+        self.results: Dict[str, bool] = {}
+        self.stats = {'files': 0, 'sent': 0, 'unchanged': 0, 'failed': 0, 'batches': 0,
+                      'upload_seconds': 0.0, 'queue_wait': 0.0}
+        self._root_id: Optional[str] = None
+        self._started = time.perf_counter()
+        self._last_emit = self._started
+        self._finished: Optional[float] = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, file_path: str):
+        """Queue a saved file, blocks while the queue is full"""
+        start = time.perf_counter()
+        self.queue.put(os.path.abspath(file_path))
+        self.stats['queue_wait'] += time.perf_counter() - start
+        self._last_emit = time.perf_counter()
+
+    async def emit(self, file_path: str):
+        """submit() for the scraper's event loop, waits for queue space without stalling other pages"""
+        await asyncio.to_thread(self.submit, file_path)
+
+    def close(self, timeout: Optional[float] = None) -> Dict[str, bool]:
+        """No more files are coming: wait for the queued ones to reach Drive and return the results"""
+        self.queue.put(self._CLOSE)
+        self._thread.join(timeout)
+        return self.results
+
+    def _next_batch(self) -> List:
+        """Block for one item, then take everything else already waiting"""
+        batch = [self.queue.get()]
+        while batch[-1] is not self._CLOSE:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        closing = False
+        while not closing:
+            batch = self._next_batch()
+            closing = batch[-1] is self._CLOSE
+            paths = [path for path in batch if path is not self._CLOSE]
+            if paths:
+                try:
+                    self._send(paths)
+                except Exception as e:
+                    self.wrapper.console_print(f"✗ Streaming upload failed for {len(paths)} file(s): {e}")
+                    for path in paths:
+                        self.results[path] = False
+                    self.stats['failed'] += len(paths)
+        self._finished = time.perf_counter()
+
+    def _send(self, paths: List[str]):
+        start = time.perf_counter()
+        self.stats['batches'] += 1
+        self.stats['files'] += len(paths)
+
+        groups = {}
+        for path in paths:
+            parsed = parse_download_name(path)
+            if parsed is None:
+                self.wrapper.console_print(f"⏭ {os.path.basename(path)} is not a NAME__MM_YYYY.csv file, not streamed")
+                self.results[path] = False
+                self.stats['failed'] += 1
+                continue
+            groups.setdefault((parsed.month, parsed.year), []).append(path)
+        if not groups:
+            return
+
+        service = self.wrapper.get_service()
+        if not service:
+            raise RuntimeError("no Google Drive connection available")
+        session = self.wrapper.session
+        if self._root_id is None:
+            self._root_id = session.call(get_folder, self.root_folder_name, silent=True)
+            if not self._root_id:
+                raise RuntimeError(f"root folder '{self.root_folder_name}' not found")
+        # Cached after the first file of each month, so later batches cost no lookups
+        folders = session.call(ensure_month_folders, self._root_id, list(groups), silent=True)
+
+        # Same as sync_files: a stale mirror would plan files already in Drive as new
+        self.wrapper.sync_mirror(service, force=True)
+        uploader = self.wrapper.get_uploader()
+        for key, group in groups.items():
+            if not folders.get(key):
+                self.wrapper.console_print(f"✗ {'/'.join(month_folder_path(*key))}: folder could not be created")
+                for path in group:
+                    self.results[path] = False
+                self.stats['failed'] += len(group)
+                continue
+            plan = session.call(plan_sync, group, folders[key], self.hashes)
+            for op in plan.of('skip'):
+                self.results[op.path] = True
+            self.stats['unchanged'] += len(plan.of('skip'))
+            ops = plan.of('upload') + plan.of('update')
+            for op, ok in zip(ops, apply_sync(service, plan, uploader, progress=None)):
+                self.results[op.path] = ok
+                self.stats['sent' if ok else 'failed'] += 1
+                if ok:
+                    self.wrapper.console_print(f"☁️ {op.name} → {'/'.join(month_folder_path(*key))}")
+                else:
+                    self.wrapper.console_print(f"✗ Streaming {op.action} failed for {op.name}")
+        self.stats['upload_seconds'] += time.perf_counter() - start
+
+    def report(self) -> str:
+        """One line: what was sent, and how much of the upload work the downloads hid"""
+        end = self._finished or time.perf_counter()
+        total = end - self._started
+        # Upload time left after the last file arrived is what the run actually waited for
+        tail = max(0.0, end - self._last_emit)
+        return (f"☁️ Streamed {self.stats['files']} file{'s' if self.stats['files'] != 1 else ''}: "
+                f"{self.stats['sent']} sent, {self.stats['unchanged']} unchanged, {self.stats['failed']} failed "
+                f"in {self.stats['batches']} batch{'es' if self.stats['batches'] != 1 else ''}; "
+                f"{self.stats['upload_seconds']:.1f}s uploading, {tail:.1f}s after the last download "
+                f"({total:.1f}s total, {self.stats['queue_wait']:.1f}s scraper held back)")
@@ -0,0 +1,168 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+# Timeout budget (ms) for each named wait in the scraper
+DEFAULT_BUDGETS: Dict[str, int] = {
+    "login_page": 15000,
+    "login_form_stable": 5000,
+    "login_submitted": 15000,
+    # Whole budget of one login settle; networkidle only gets a short slice of it,
+    # since analytics beacons on the bank's pages often keep it from ever happening
+    "login_settle": 2300,
+    "login_network_idle": 800,
+    "dashboard": 60000,
+    "session_probe": 8000,
+    "account_switch": 3000,
+    "file_type_options": 3000,
+    "date_range_options": 3000,
+    "date_inputs": 5000,
+    "download": 10000,
+}
+
+# Resolves once no DOM mutation has happened for quiet_ms
+_DOM_STABLE_JS = """
+(quietMs) => new Promise(resolve => {
+    let timer;
+    const done = () => { observer.disconnect(); resolve(true); };
+    const observer = new MutationObserver(() => {
+        clearTimeout(timer);
+        timer = setTimeout(done, quietMs);
+    });
+    observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    timer = setTimeout(done, quietMs);
+})
+"""
+
+_TEXT_CONTAINS_JS = """
+([selector, text]) => {
+    const el = document.querySelector(selector);
+    return !!el && el.textContent.includes(text);
+}
+"""
+
+@dataclass
+class WaitResult:
+    """How long a single named wait took against its budget"""
+    step: str
+    strategy: str
+    budget_ms: int
+    waited_ms: float
+    ok: bool
+    error: Optional[str] = None
+
+class WaitEngine:
+    """Condition-based waits with a declared timeout budget per step"""
+
+    def __init__(self, page, budgets: Optional[Dict[str, int]] = None,
+                 logger: Optional[Callable[[str], None]] = None):
+        self.page = page
+        self.budgets = dict(DEFAULT_BUDGETS)
+        if budgets:
+            self.budgets.update(budgets)
+        self.logger = logger
+        self.results: List[WaitResult] = []
+
+    def _budget(self, step: str, budget: Optional[int]) -> int:
+        if budget is not None:
+            return budget
+        return self.budgets.get(step, 5000)
+
+    def _record(self, step: str, strategy: str, budget: int, start: float, ok: bool, error=None):
+        result = WaitResult(step, strategy, budget, (time.perf_counter() - start) * 1000, ok,
+                            str(error) if error else None)
+        self.results.append(result)
+        if self.logger:
+            mark = "✓" if ok else "✗"
+            self.logger(f"⏱ {mark} {step} ({strategy}): {result.waited_ms:.0f}/{budget} ms")
+        return result
+
+    async def for_element(self, step: str, selector: str, state: str = 'visible', budget: Optional[int] = None):
+        """Wait until a selector reaches a state, returns the element handle"""
+        budget = self._budget(step, budget)
+        start = time.perf_counter()
+        try:
+            handle = await self.page.wait_for_selector(selector, state=state, timeout=budget)
+        except Exception as e:
+            self._record(step, f"element:{state}", budget, start, False, e)
+            raise
+        self._record(step, f"element:{state}", budget, start, True)
+        return handle
+
+    async def for_any_element(self, step: str, selectors: List[str], state: str = 'visible', budget: Optional[int] = None):
+        """Wait until any one of several selectors reaches a state"""
+        return await self.for_element(step, ", ".join(selectors), state, budget)
+
+    async def for_text(self, step: str, selector: str, text: str, budget: Optional[int] = None) -> bool:
+        """Wait until an element's text contains a value"""
+        budget = self._budget(step, budget)
+        start = time.perf_counter()
+        try:
+            await self.page.wait_for_function(_TEXT_CONTAINS_JS, arg=[selector, text], timeout=budget)
+        except Exception as e:
+            self._record(step, "text", budget, start, False, e)
+            raise
+        self._record(step, "text", budget, start, True)
+        return True
+
+    async def for_network_idle(self, step: str, budget: Optional[int] = None) -> bool:
+        """Wait for the page to stop making network requests"""
+        budget = self._budget(step, budget)
+        start = time.perf_counter()
+        try:
+            await self.page.wait_for_load_state('networkidle', timeout=budget)
+        except Exception as e:
+            self._record(step, "networkidle", budget, start, False, e)
+            raise
+        self._record(step, "networkidle", budget, start, True)
+        return True
+
+    async def for_dom_stable(self, step: str, quiet_ms: int = 300, budget: Optional[int] = None,
+                             all_frames: bool = False) -> bool:
+        """Wait until the DOM (of every frame, with all_frames, e.g. a login iframe) has stopped changing for quiet_ms"""
+        budget = self._budget(step, budget)
+        start = time.perf_counter()
+        main = self.page.main_frame
+
+        async def frame_stable(frame):
+            try:
+                await frame.evaluate(_DOM_STABLE_JS, quiet_ms)
+            except Exception:
+                # A child frame detaching or navigating mid-wait doesn't make the page unstable
+                if frame is main:
+                    raise
+
+        frames = self.page.frames if all_frames else [main]
+        try:
+            await asyncio.wait_for(asyncio.gather(*(frame_stable(frame) for frame in frames)), timeout=budget / 1000)
+        except Exception as e:
+            self._record(step, "dom-stable", budget, start, False, e)
+            raise
+        self._record(step, "dom-stable", budget, start, True)
+        return True
+
+    @asynccontextmanager
+    async def expect_download(self, step: str = "download", budget: Optional[int] = None):
+        """Async context manager around page.expect_download that records the wait"""
+        budget = self._budget(step, budget)
+        start = time.perf_counter()
+        try:
+            async with self.page.expect_download(timeout=budget) as download_info:
+                yield download_info
+        except Exception as e:
+            self._record(step, "download", budget, start, False, e)
+            raise
+        self._record(step, "download", budget, start, True)
+
+    def total_ms(self) -> float:
+        return sum(r.waited_ms for r in self.results)
+
+    def summary(self) -> str:
+        """One line with the time spent in each wait since the last reset"""
+        parts = [f"{r.step} {r.waited_ms:.0f}ms{'' if r.ok else ' (timeout)'}" for r in self.results]
+        return f"waited {self.total_ms():.0f} ms: " + ", ".join(parts) if parts else "no waits"
+
+    def reset(self):
+        self.results = []